@@ -1,14 +1,48 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import json
+import os
+import sys
+from importlib import metadata
+
 from PyInstaller.utils.hooks import collect_all
 
 block_cipher = None
+COLLECT_CACHE = os.path.join('build', 'collect_cache')
+
+
+def cached_collect_all(package, distribution=None):
+    """collect_all, cached per package version under build/collect_cache
+
+    collect_all imports every submodule to find them, which dominates the
+    spec's run time; the result only changes when the package does.
+    """
+    version = metadata.version(distribution or package)
+    python = '.'.join(map(str, sys.version_info[:2]))
+    path = os.path.join(COLLECT_CACHE, f'{package}-{version}-py{python}.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            bins, datas, hiddenimports = json.load(f)
+        if all(os.path.exists(src) for src, _ in bins + datas):
+            return (
+                [tuple(entry) for entry in bins],
+                [tuple(entry) for entry in datas],
+                hiddenimports,
+            )
+    except (OSError, ValueError):
+        pass
+    bins, datas, hiddenimports = collect_all(package)
+    os.makedirs(COLLECT_CACHE, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([bins, datas, hiddenimports], f)
+    return bins, datas, hiddenimports
+
 
 # Collect all necessary packages
-flask_bins, flask_datas, flask_hiddenimports = collect_all('flask')
-werkzeug_bins, werkzeug_datas, werkzeug_hiddenimports = collect_all('werkzeug')
-waitress_bins, waitress_datas, waitress_hiddenimports = collect_all('waitress')
-flask_cors_bins, flask_cors_datas, flask_cors_hiddenimports = collect_all('flask_cors')
+flask_bins, flask_datas, flask_hiddenimports = cached_collect_all('flask')
+werkzeug_bins, werkzeug_datas, werkzeug_hiddenimports = cached_collect_all('werkzeug')
+waitress_bins, waitress_datas, waitress_hiddenimports = cached_collect_all('waitress')
+flask_cors_bins, flask_cors_datas, flask_cors_hiddenimports = cached_collect_all('flask_cors', 'flask-cors')
 
 a = Analysis(
     ['app.py'],
@@ -17,7 +51,7 @@ a = Analysis(
     datas=[
         ('skydb_api.ico', 'resources')
     ] + flask_datas + werkzeug_datas + waitress_datas + flask_cors_datas,
-    hiddenimports=['werkzeug._internal', 'werkzeug.serving'] +
+    hiddenimports=['werkzeug._internal', 'werkzeug.serving', 'pyodbc'] +
                    flask_hiddenimports +
                    werkzeug_hiddenimports +
                    waitress_hiddenimports +
@@ -1,56 +1,120 @@
-import base64
-import configparser
 import os
 import platform
 import socket
 import sys
 import winreg
-import pyodbc
 
-from PyQt6.QtCore import QThread, pyqtSignal, QSettings
+from skydb_api.startup import StartupProfile
 
-from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import (
+# Created before the Qt import so --startup-profile can time every import.
+# The imports below therefore follow code on purpose (noqa: E402): loading
+# PyQt6 is the slowest part of startup and the profile has to see it.
+STARTUP = StartupProfile.from_argv(sys.argv)
+
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal, QSettings  # noqa: E402
+
+from PyQt6.QtGui import QIcon  # noqa: E402
+from PyQt6.QtWidgets import (  # noqa: E402
     QApplication,
     QFileDialog,
     QMainWindow,
+    QPlainTextEdit,
     QPushButton,
-    QTextEdit,
     QVBoxLayout,
     QWidget,
     QCheckBox,
 )
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-from waitress import create_server
+
+from skydb_api.admission import admission_from_settings  # noqa: E402
+from skydb_api.logs import AccessLog, LogBuffer  # noqa: E402
+from skydb_api.settings import (  # noqa: E402
+    database_path,
+    database_settings_for,
+    load_database_settings,
+    load_named_databases,
+    load_server_settings,
+    resolve_password,
+    save_database_settings,
+)
+
+
+MAX_LOG_LINES = 5000
+LOG_FLUSH_MS = 250
 
 
 class ServerThread(QThread):
-    """Thread for running the Flask/Waitress server"""
+    """Thread for running the Flask/Waitress server
+
+    Messages from the server and its worker threads are queued in a
+    LogBuffer and handed to the GUI in one ``log_update`` signal per
+    ``LOG_FLUSH_MS`` tick, however many arrive in between.
+    """
 
-    log_update = pyqtSignal(str)
+    log_update = pyqtSignal(list)
+
+    def __init__(
+        self,
+        app,
+        host,
+        port,
+        db=None,
+        messages=None,
+        startup=STARTUP,
+        catalog=None,
+        server_options=None,
+    ):
+        from skydb_api.server import make_server
 
-    def __init__(self, app, host, port):
         super().__init__()
         self.app = app
         self.host = host
         self.port = port
-        self.server = create_server(app, host=host, port=port)
+        self.db = db
+        self.catalog = catalog
+        self.messages = messages or LogBuffer()
+        self.startup = startup
+        with startup.phase("bind"):
+            self.server = make_server(
+                app, host=host, port=port, **(server_options or {})
+            )
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(LOG_FLUSH_MS)
+
+    def log(self, message: str):
+        self.messages.append(message)
+
+    def flush(self):
+        """Emit every queued message in a single signal"""
+        lines = self.messages.drain()
+        if lines:
+            self.log_update.emit(lines)
 
     def run(self):
-        self.log_update.emit(f"Starting server on {self.host}:{self.port}")
+        if self.db:
+            try:
+                with self.startup.phase("pool warm-up"):
+                    opened = self.db.pool.fill()
+                self.log(f"Connection pool warmed ({opened} open)")
+            except Exception as e:
+                self.log(f"Connection pool warm-up failed: {e}")
+        self.log(f"Starting server on {self.host}:{self.port}")
+        self.startup.report(self.log)
         self.server.run()
-        self.log_update.emit("Server shutdown complete")
+        self.log("Server shutdown complete")
 
     def stop(self):
         """Shutdown the server cleanly"""
         self.server.close()
         self.quit()
         self.wait()
+        if self.db:
+            self.db.close()
+            self.log("Connection pool drained")
+        if self.catalog:
+            self.catalog.close()
+        self.flush_timer.stop()
+        self.flush()
 
 
 class MainWindow(QMainWindow):
@@ -63,8 +127,12 @@ class MainWindow(QMainWindow):
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
         layout = QVBoxLayout(main_widget)
-        self.log_display = QTextEdit()
+        self.settings = QSettings("SkyDB", "SkyDB API")
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
+        self.log_display.setMaximumBlockCount(
+            self.settings.value("log_lines", MAX_LOG_LINES, type=int)
+        )
         layout.addWidget(self.log_display)
         self.select_db_button = QPushButton("Select Database File")
         self.select_db_button.clicked.connect(self.select_database)
@@ -74,6 +142,14 @@ class MainWindow(QMainWindow):
             self.save_auto_start_preference
         )
         layout.addWidget(self.auto_start_checkbox)
+        self.access_log_checkbox = QCheckBox("Log each request")
+        self.access_log_checkbox.setChecked(
+            self.settings.value("access_log", False, type=bool)
+        )
+        self.access_log_checkbox.stateChanged.connect(
+            self.save_access_log_preference
+        )
+        layout.addWidget(self.access_log_checkbox)
         self.start_button = QPushButton("Start Server")
         self.start_button.clicked.connect(self.start_server)
         self.start_button.setEnabled(False)
@@ -88,7 +164,6 @@ class MainWindow(QMainWindow):
         self.db_path = None
         self.server_thread = None
         self.flask_app = None
-        self.settings = QSettings("SkyDB", "SkyDB API")
         self.initialize_application()
 
     def initialize_application(self):
@@ -98,16 +173,16 @@ class MainWindow(QMainWindow):
         auto_start = self.settings.value("auto_start", False, type=bool)
         self.auto_start_checkbox.setChecked(auto_start)
         if os.path.exists("settings.ini"):
-            config = configparser.ConfigParser()
-            config.read("settings.ini")
-            if "database" in config and "path" in config["database"]:
-                self.db_path = config["database"]["path"].strip('"')
+            self.db_path = database_path(load_database_settings())
+            if self.db_path:
                 self.log(f"Loaded database path from settings: {self.db_path}")
                 if os.path.exists(self.db_path):
                     self.start_button.setEnabled(True)
                     self.log("Database file verified")
                     if auto_start:
-                        self.start_server()
+                        # Start once the event loop runs, so the window
+                        # appears before the server is set up.
+                        QTimer.singleShot(0, self.start_server)
                 else:
                     self.log("Warning: Saved database file not found")
                     self.db_path = None
@@ -173,12 +248,16 @@ class MainWindow(QMainWindow):
 
     def log(self, message: str):
         """Add message to log display"""
-        self.log_display.append(message)
+        self.log_display.appendPlainText(message)
 
     def save_auto_start_preference(self, state):
         """Save the auto-start checkbox state"""
         self.settings.setValue("auto_start", bool(state))
 
+    def save_access_log_preference(self, state):
+        """Save the per-request logging checkbox state"""
+        self.settings.setValue("access_log", bool(state))
+
     def select_database(self):
         """Open file dialog for database selection"""
         start_dir = os.path.dirname(self.db_path) if self.db_path else ""
@@ -189,98 +268,108 @@ class MainWindow(QMainWindow):
         if file_path:
             self.db_path = file_path
             self.log(f"Selected database: {file_path}")
-            config = configparser.ConfigParser()
-            config.add_section("database")
-            is_tew9 = os.path.basename(file_path).upper() == "TEW9.MDB"
-            formatted_path = f'"{file_path.replace("/", os.sep)}"'
-            if is_tew9:
-                config["database"] = {
-                    "path": formatted_path,
-                    "tew_version": "9",
-                    "password": "NULL",
-                }
+            database = database_settings_for(file_path)
+            if database.get("tew_version") == "9":
                 self.log("TEW9 database detected - using built-in password")
-            else:
-                config["database"] = {
-                    "path": formatted_path,
-                    "password_required": "false",
-                }
-            with open("settings.ini", "w") as configfile:
-                config.write(configfile)
+            save_database_settings(database)
             self.log("settings.ini created/updated successfully")
             self.start_button.setEnabled(True)
 
-    def server_log_update(self, message: str):
-        """Handle log updates from server thread"""
-        self.log(message)
+    def server_log_update(self, lines: list):
+        """Handle a batch of log updates from the server thread"""
+        self.log("\n".join(lines))
 
     def start_server(self):
         """Initialize and start the Flask/Waitress server"""
         if not self.db_path:
             self.log("Error: No database selected")
             return
-        menu_item = None
-        if os.path.exists("settings.ini"):
-            config = configparser.ConfigParser()
-            config.read("settings.ini")
-            if "database" in config:
-                if config["database"].get("tew_version") == "9":
-                    menu_item = whats_for_dinner()
-                    self.log("Going to find out what's for dinner...")
-                elif config["database"].get("password"):
-                    menu_item = config["database"]["password"]
-                    self.log("Using password from settings.ini")
-                elif config["database"].get("password_required") == "true":
-                    self.log(
-                        "Error: Password required but not provided in settings.ini"
-                    )
-                    return
-        self.flask_app = Flask(__name__)
-        CORS(self.flask_app)
-        db = DatabaseConnection(self.db_path, password=menu_item)
-
-        @self.flask_app.route("/")
-        def home():
-            return {"message": "SkyDB API is running"}
-
-        @self.flask_app.route("/query", methods=["POST"])
-        def execute_query():
-            try:
-                data = request.get_json()
-                if not data or "query" not in data:
-                    return jsonify({"error": "No query provided"}), 400
-                query = data["query"]
-                params = data.get("params", None)
-                results = db.execute_query(query, params)
-                return jsonify(results)
-            except Exception as e:
-                return jsonify({"error": str(e)}), 500
+        try:
+            with STARTUP.phase("credential"):
+                menu_item = resolve_password(
+                    load_database_settings(), self.log
+                )
+        except ValueError as e:
+            self.log(f"Error: {e}")
+            return
+        server = load_server_settings()
+        try:
+            threads, admission = admission_from_settings(server)
+        except ValueError as e:
+            self.log(f"Error in [server] settings: {e}")
+            return
+        with STARTUP.phase("database layer"):
+            from skydb_api.database import DatabaseConnection
+            from skydb_api.server import DEFAULT_HOST, DEFAULT_PORT, create_app
 
-        @self.flask_app.route("/tables", methods=["GET"])
-        def get_tables():
+            db = DatabaseConnection(self.db_path, password=menu_item)
+        if os.path.exists("settings.ini"):
             try:
-                query = """
-                    SELECT MSysObjects.Name AS table_name
-                    FROM MSysObjects
-                    WHERE MSysObjects.Type=1 AND MSysObjects.Flags=0
-                """
-                results = db.execute_query(query)
-                return jsonify(results)
-            except Exception as e:
-                return jsonify({"error": str(e)}), 500
+                with STARTUP.phase("named queries"):
+                    loaded = db.queries.load("settings.ini")
+                if loaded:
+                    self.log(f"Loaded {loaded} named queries from settings")
+            except ValueError as e:
+                self.log(f"Error loading named queries: {e}")
+        messages = LogBuffer()
+        access_log = None
+        if self.access_log_checkbox.isChecked():
+            access_log = AccessLog(messages.append)
+        catalog = self.build_catalog(messages)
+        with STARTUP.phase("create app"):
+            self.flask_app = create_app(
+                db,
+                catalog=catalog,
+                admission=admission,
+                access_log=access_log,
+            )
 
         real_ip = socket.gethostbyname(socket.gethostname())
         self.log("==========================================")
-        self.log("Starting server on http://127.0.0.1:9020")
-        self.log(f"Starting server on http://{real_ip}:9020")
+        self.log(f"Starting server on http://127.0.0.1:{DEFAULT_PORT}")
+        self.log(f"Starting server on http://{real_ip}:{DEFAULT_PORT}")
         self.log("==========================================")
-        self.server_thread = ServerThread(self.flask_app, "0.0.0.0", 9020)
+        self.server_thread = ServerThread(
+            self.flask_app,
+            DEFAULT_HOST,
+            DEFAULT_PORT,
+            db=db,
+            messages=messages,
+            catalog=catalog,
+            server_options={
+                "threads": threads,
+                "connection_limit": server.get("connection_limit"),
+                "backlog": server.get("backlog"),
+            },
+        )
         self.server_thread.log_update.connect(self.server_log_update)
         self.server_thread.start()
         self.select_db_button.setEnabled(False)
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
+    def build_catalog(self, messages):
+        """Collect the [database:<name>] sections served under /db/<name>"""
+        named = load_named_databases()
+        if not named:
+            return None
+        from skydb_api.catalog import DatabaseCatalog
+        from skydb_api.database import DatabaseConnection
+
+        catalog = DatabaseCatalog(
+            lambda path, password, **options: DatabaseConnection(
+                path, password=password, **options
+            ),
+            log=messages.append,
+        )
+        for name, settings in named.items():
+            try:
+                catalog.add(name, settings)
+            except ValueError as e:
+                self.log(f"Error: {e}")
+        self.log(f"Serving {len(catalog)} more database(s) under /db/<name>")
+        return catalog
+
     def stop_server(self):
         """Stop the server and cleanup"""
         if self.server_thread:
@@ -310,104 +399,11 @@ def resource_path(relative_path):
         return relative_path
 
 
-def whats_for_dinner() -> str:
-    """
-    Prepares tonight's secret recipe by:
-
-    1. Selecting the finest steak and seasoning it with street sizzle.
-    2. Igniting the open fire to generate the perfect heat.
-    3. Placing the marinated steak on the platter and ensuring it's portioned.
-    4. Utilizing the trusty knife and fork to slice through the meal.
-    5. Hovering the spoon over the dish, revealing the filet mignon.
-
-    Returns:
-        str: The mouthwatering dinner that you've been craving.
-
-    Exceptions:
-        - Raises a uni-issue if the decrypted meal contains unrecognizable flavors.
-        - Alerts if any other culinary mishaps occur during preparation.
-    """
-    try:
-        steak = bytes.fromhex("3639393173676e694b746565727453").decode("utf-8")
-        sizzle = bytes.fromhex("5374726565744b696e677331393936").decode(
-            "utf-8"
-        )
-        open_fire = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=sizzle.encode(),
-            iterations=100000,
-            backend=default_backend(),
-        )
-        fire_pit = open_fire.derive(steak.encode())
-        platter = base64.b64decode(
-            "M2PhXldoykEgiTH7TzY2vlCypejALtMlengk+A==".encode()
-        )
-        if len(platter) < 16:
-            return "The platter is too small to hold the meal."
-        knife, fork = platter[:16], platter[16:]
-        spoon = Cipher(
-            algorithms.AES(fire_pit),
-            modes.CFB(knife),
-            backend=default_backend(),
-        )
-        napkin = spoon.decryptor()
-        dinner_is_served = napkin.update(fork) + napkin.finalize()
-        filet_mignon = dinner_is_served.decode("utf-8")
-        return filet_mignon
-    except UnicodeDecodeError as e:
-        return f"UnicodeDecodeError: {e}"
-    except Exception as e:
-        return f"An error occurred during decryption: {e}"
-
-
-class DatabaseConnection:
-    """Helper class to manage database connections"""
-
-    def __init__(self, db_path, password=None):
-        self.db_path = db_path
-        self.connection_string = (
-            r"Driver={Microsoft Access Driver (*.mdb, *.accdb)};"
-            rf"DBQ={db_path};"
-        )
-        if password:
-            self.connection_string += f"PWD={password};"
-        self.connection = None
-
-    def __enter__(self):
-        self.connection = pyodbc.connect(self.connection_string)
-        return self.connection
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        if self.connection:
-            self.connection.close()
-
-    def execute_query(self, query, params=None):
-        """Execute a query and return results"""
-        try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-                if query.strip().upper().startswith("SELECT"):
-                    columns = [column[0] for column in cursor.description]
-                    results = []
-                    for row in cursor.fetchall():
-                        results.append(dict(zip(columns, row)))
-                    return results
-                conn.commit()
-                return {"affected_rows": cursor.rowcount}
-        except pyodbc.Error as e:
-            conn.close()
-            raise Exception(f"Database error: {str(e)}")
-
-
 def main():
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
+    with STARTUP.phase("window"):
+        app = QApplication(sys.argv)
+        window = MainWindow()
+        window.show()
     sys.exit(app.exec())
 
 
@@ -0,0 +1,92 @@
+import argparse
+import datetime
+import decimal
+import time
+
+from flask import Flask
+
+from skydb_api.serialize import RowEncoder
+from skydb_api.utils import optional_module
+
+
+def narrow_rows(count):
+    """Rows shaped like a small lookup table: id, name, number"""
+    return ["id", "name", "salary"], [
+        (i, f"Worker {i}", i * 1.5) for i in range(count)
+    ]
+
+
+def wide_rows(count):
+    """Rows with 40 mixed columns, including money and dates"""
+    start = datetime.datetime(2020, 1, 1)
+    columns = [f"col{i}" for i in range(40)]
+    rows = []
+    for i in range(count):
+        row = []
+        for j in range(10):
+            row += [
+                i + j,
+                f"text {i} {j}",
+                decimal.Decimal(i * 100 + j) / 100,
+                start + datetime.timedelta(minutes=i + j),
+            ]
+        rows.append(tuple(row))
+    return columns, rows
+
+
+def flask_json(app, columns, rows):
+    """The previous path: dicts per row through Flask's JSON provider"""
+    body = [dict(zip(columns, row)) for row in rows]
+    return app.json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+
+def row_encoder(backend, compat=False):
+    def encode(app, columns, rows):
+        encoder = RowEncoder.for_rows(
+            columns, rows, backend=backend, compat=compat
+        )
+        return encoder.encode_records(rows)
+
+    return encode
+
+
+def measure(encode, app, columns, rows, repeat):
+    """Return the best rows/s over ``repeat`` runs"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(app, columns, rows)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(rows) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare row serialization speed in rows/s"
+    )
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    app = Flask(__name__)
+    encoders = [
+        ("flask json", flask_json),
+        ("compat", row_encoder("json", compat=True)),
+        ("json", row_encoder("json")),
+    ]
+    if optional_module("orjson") is not None:
+        encoders.append(("orjson", row_encoder("orjson")))
+    for table, make in (("narrow", narrow_rows), ("wide", wide_rows)):
+        columns, rows = make(args.rows)
+        baseline = None
+        for name, encode in encoders:
+            rate = measure(encode, app, columns, rows, args.repeat)
+            baseline = baseline or rate
+            print(
+                f"{table:<7} {name:<11} {rate:>12,.0f} rows/s "
+                f"{rate / baseline:>6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,61 @@
+import argparse
+import glob
+import hashlib
+import json
+import mmap
 import os
+import platform
 import shutil
 import subprocess
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from importlib import metadata
 
 
 APP_NAME = "SKyDB_API"
+SPEC_FILE = f"{APP_NAME}.spec"
+STATE_FILE = os.path.join("build", "build_state.json")
+INPUT_PATTERNS = [
+    "app.py",
+    "build.py",
+    "*.spec",
+    "hook-*.py",
+    "*.ico",
+    os.path.join("skydb_api", "**", "*.py"),
+]
+PATCH_FROM = b"_internal"
+PATCH_TO = b"resources"
+
+
+class StepTimer:
+    """Collects how long each build step took for the closing summary"""
+
+    def __init__(self):
+        self.steps = []
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except Exception:
+            outcome = "failed"
+            raise
+        finally:
+            self.steps.append((name, time.perf_counter() - started, outcome))
+
+    def skipped(self, name: str) -> None:
+        self.steps.append((name, 0.0, "skipped"))
+
+    def summary(self) -> None:
+        total = sum(seconds for _, seconds, _ in self.steps)
+        print()
+        print("Build step timings:")
+        for name, seconds, outcome in self.steps:
+            print(f"  {name:<28}{seconds:>9.2f}s  {outcome}")
+        print(f"  {'total':<28}{total:>9.2f}s")
 
 
 def check_for_pyinstaller() -> None:
@@ -50,56 +101,194 @@ def print_log(type: str, message: str) -> None:
         )
 
 
-def modify_exe_binary(exe_path: str) -> None:
-    """Modify the exe to look for DLLs in 'resources' instead of '_internal'"""
+def modify_exe_binary(exe_path: str) -> int:
+    """Modify the exe to look for DLLs in 'resources' instead of '_internal'
+
+    The file is memory-mapped and only the bytes at each match are
+    rewritten, so the exe is never read into memory or written out whole.
+    Returns the number of replacements made.
+    """
     try:
         if not os.path.exists(exe_path):
             print_log("ERROR", f"File not found: {exe_path}")
             raise FileNotFoundError(f"File not found: {exe_path}")
-        print_log("INFO", "Reading executable file...")
-        with open(exe_path, "rb") as f:
-            content = f.read()
-        print_log("INFO", "Modifying binary content...")
-        modified = content.replace(b"_internal", b"resources")
-        print_log("INFO", "Writing modified content back to file...")
-        with open(exe_path, "wb") as f:
-            f.write(modified)
-        print_log("SUCCESS", "Binary modification completed successfully")
+        print_log("INFO", "Patching executable in place...")
+        replaced = 0
+        with open(exe_path, "r+b") as f, mmap.mmap(f.fileno(), 0) as mapped:
+            offset = mapped.find(PATCH_FROM)
+            while offset != -1:
+                mapped[offset : offset + len(PATCH_TO)] = PATCH_TO
+                replaced += 1
+                offset = mapped.find(PATCH_FROM, offset + len(PATCH_TO))
+            mapped.flush()
+        print_log(
+            "SUCCESS",
+            f"Binary modification completed ({replaced} replacements)",
+        )
+        return replaced
     except Exception as e:
         print_log("ERROR", f"Failed to modify executable: {e}")
         raise
 
 
+def file_sha256(path: str) -> str:
+    """Hash a file in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state() -> dict:
+    """Return what the last incremental build recorded, or {}"""
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: dict) -> None:
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def input_files() -> list:
+    """Return the sorted source, spec, hook and icon files of the build"""
+    files = set()
+    for pattern in INPUT_PATTERNS:
+        files.update(glob.glob(pattern, recursive=True))
+    return sorted(path.replace(os.sep, "/") for path in files)
+
+
+def installed_packages() -> list:
+    """Return sorted name==version pairs of the installed distributions"""
+    return sorted(
+        f"{dist.metadata['Name']}=={dist.version}".lower()
+        for dist in metadata.distributions()
+        if dist.metadata["Name"]
+    )
+
+
+def input_fingerprint(previous: dict) -> tuple:
+    """Hash every build input, returning (fingerprint, file hashes)
+
+    A file whose size and mtime match the previous build reuses its
+    recorded hash instead of being read again.
+    """
+    digest = hashlib.sha256()
+    digest.update(platform.python_version().encode())
+    hashes = {}
+    for path in input_files():
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        known = previous.get(path)
+        if known and known[:2] == key:
+            file_hash = known[2]
+        else:
+            file_hash = file_sha256(path)
+        hashes[path] = key + [file_hash]
+        digest.update(f"{path}\0{file_hash}\n".encode())
+    for package in installed_packages():
+        digest.update(f"{package}\n".encode())
+    return digest.hexdigest(), hashes
+
+
+def run_pyinstaller(incremental: bool) -> None:
+    """Run PyInstaller on the spec, keeping its work directory
+
+    Incremental builds leave ``build/`` in place (no ``--clean``), so
+    PyInstaller reuses its cached analysis, and the spec reuses its cached
+    ``collect_all`` results.
+    """
+    command = ["pyinstaller", SPEC_FILE]
+    if incremental:
+        command.append("--noconfirm")
+    subprocess.run(command, check=True)
+
+
+def rename_internal(dist_dir: str) -> None:
+    internal_path = os.path.join(dist_dir, "_internal")
+    resources_path = os.path.join(dist_dir, "resources")
+    if os.path.exists(internal_path):
+        if os.path.exists(resources_path):
+            print_log("INFO", "Removing existing resources directory...")
+            shutil.rmtree(resources_path)
+        print_log("INFO", "Renaming _internal directory to resources...")
+        os.rename(internal_path, resources_path)
+        print_log("SUCCESS", "Successfully renamed _internal to resources")
+
+
+def build(incremental: bool, timer: StepTimer) -> None:
+    """Build, patch and lay out dist/, skipping what has not changed"""
+    dist_dir = os.path.join("dist", APP_NAME)
+    exe_path = os.path.join(dist_dir, f"{APP_NAME}.exe")
+    state = load_state() if incremental else {}
+    with timer.step("hash inputs"):
+        fingerprint, hashes = input_fingerprint(state.get("files", {}))
+    up_to_date = (
+        incremental
+        and state.get("fingerprint") == fingerprint
+        and os.path.exists(exe_path)
+        and os.path.isdir(os.path.join(dist_dir, "resources"))
+        and file_sha256(exe_path) == state.get("exe")
+    )
+    if up_to_date:
+        print_log("SUCCESS", "Inputs unchanged, skipping PyInstaller")
+        for name in ("pyinstaller", "patch exe", "rename _internal"):
+            timer.skipped(name)
+        return
+    print_log("INFO", "Starting PyInstaller build process...")
+    with timer.step("pyinstaller"):
+        run_pyinstaller(incremental)
+    print_log("SUCCESS", "PyInstaller build completed")
+    print_log("INFO", "Modifying executable binary...")
+    with timer.step("patch exe"):
+        modify_exe_binary(exe_path)
+    with timer.step("rename _internal"):
+        rename_internal(dist_dir)
+    with timer.step("save state"):
+        save_state(
+            {
+                "fingerprint": fingerprint,
+                "files": hashes,
+                "exe": file_sha256(exe_path),
+            }
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=f"Build {APP_NAME}")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip PyInstaller when no input changed since the last build",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    timer = StepTimer()
     try:
         print(
             f"========= STARTING build.py PROCESS @ {date_time_stamp()} ========="
         )
         print_log("INFO", "Checking for PyInstaller...")
-        check_for_pyinstaller()
+        with timer.step("check pyinstaller"):
+            check_for_pyinstaller()
         print_log("SUCCESS", "PyInstaller found")
-        print_log("INFO", "Starting PyInstaller build process...")
-        subprocess.run(["pyinstaller", f"{APP_NAME}.spec"], check=True)
-        print_log("SUCCESS", "PyInstaller build completed")
-        dist_dir = os.path.join("dist", APP_NAME)
-        exe_path = os.path.join(dist_dir, f"{APP_NAME}.exe")
-        internal_path = os.path.join(dist_dir, "_internal")
-        resources_path = os.path.join(dist_dir, "resources")
-        print_log("INFO", "Modifying executable binary...")
-        modify_exe_binary(exe_path)
-        if os.path.exists(internal_path):
-            if os.path.exists(resources_path):
-                print_log("INFO", "Removing existing resources directory...")
-                shutil.rmtree(resources_path)
-            print_log("INFO", "Renaming _internal directory to resources...")
-            os.rename(internal_path, resources_path)
-            print_log("SUCCESS", "Successfully renamed _internal to resources")
+        build(args.incremental, timer)
+        timer.summary()
         print_log("SUCCESS", "Build process completed successfully")
         print(
             f"======== COMPLETED build.py PROCESS @ {date_time_stamp()} ========="
         )
         print()
     except Exception as e:
+        timer.summary()
         print_log("FAILURE", f"Build process failed: {e}")
         print(
             f"========== FAILED build.py PROCESS @ {date_time_stamp()} =========="
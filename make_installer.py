@@ -1,9 +1,12 @@
+import argparse
 import os
 import shutil
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+from sevenzip import DEFAULT_BLOCK_SIZE, DEFAULT_PRESET, write_archive
+
 
 APP_NAME = "SKyDB_API"
 SETUP_ICON = "skydb_api_installer.ico"
@@ -14,7 +17,6 @@ RESOURCE_HACKER_PATH = Path(
 )
 SETUP_EXE_NAME = f"{APP_NAME}_Setup.exe"
 DEFAULT_INSTALL_PATH = f"%S\\{APP_NAME}"
-TEMP_DIR = "./temp_installer"
 
 
 def compile_resource_file() -> bool:
@@ -58,90 +60,88 @@ def compile_resource_file() -> bool:
         raise e
 
 
-def create_7z_archive(source_dir, output_file) -> bool:
-    """Create a 7z archive from the source directory"""
-    try:
-        print_log("INFO", "Checking for 7-Zip installation...")
-        try:
-            subprocess.run(
-                ["7z"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            print_log("SUCCESS", "7-Zip found in PATH")
-        except FileNotFoundError:
-            raise Exception(
-                "7-Zip (7z) is not found in PATH. Please install 7-Zip first."
-            )
-        print_log("INFO", "Creating 7z archive from required files...")
-        print()
-        subprocess.run(
-            ["7z", "a", output_file, f"{source_dir}/*"],
-            check=True,
-        )
-        print()
-        print()
-        print_log("SUCCESS", f"Archive created successfully: {output_file}")
-        return True
-    except Exception as e:
-        print_log("ERROR", f"Failed to create 7z archive: {e}")
-        raise e
+def report_payload(stats: dict) -> None:
+    """Log the size, time and throughput of each packaging stage"""
+    mb = 1024 * 1024
+    scan = stats["scan"]
+    compress = stats["compress"]
+    write = stats["write"]
+    print_log(
+        "INFO",
+        f"Scan: {scan['files']} files, {scan['bytes'] / mb:.1f} MB in "
+        f"{scan['folders']} solid blocks ({scan['seconds']:.2f}s)",
+    )
+    rate = compress["bytes"] / mb / max(compress["seconds"], 1e-9)
+    ratio = compress["packed_bytes"] / max(compress["bytes"], 1)
+    print_log(
+        "INFO",
+        f"Read + compress: {compress['bytes'] / mb:.1f} MB -> "
+        f"{compress['packed_bytes'] / mb:.1f} MB ({ratio:.1%}) in "
+        f"{compress['seconds']:.2f}s, {rate:.1f} MB/s on "
+        f"{compress['threads']} threads "
+        f"(read {compress['read_seconds']:.2f}s, "
+        f"compress CPU {compress['cpu_seconds']:.2f}s)",
+    )
+    rate = write["bytes"] / mb / max(write["seconds"], 1e-9)
+    print_log(
+        "INFO",
+        f"Write: {write['bytes'] / mb:.1f} MB in {write['seconds']:.2f}s "
+        f"({rate:.1f} MB/s)",
+    )
+
 
+def create_installer(
+    threads=None,
+    block_size=DEFAULT_BLOCK_SIZE,
+    preset=DEFAULT_PRESET,
+    sfx_path=SEVEN_ZIP_SFX,
+) -> bool:
+    """Create the self-extracting installer
 
-def create_installer(temp_dir: str = TEMP_DIR) -> bool:
-    """Create the self-extracting installer"""
+    The 7z payload is written straight into the installer after the SFX
+    stub and its config, reading files from dist/ directly; nothing is
+    copied to a temporary directory and no 7-Zip executable is needed.
+    """
     try:
-        print_log("INFO", f"Creating temporary directory: {temp_dir}")
-        temp_dir_path = Path(temp_dir)
-        temp_dir_path.mkdir(exist_ok=True, parents=True)
         print_log("INFO", "Checking distribution directory...")
         dist_dir = Path(f"./dist/{APP_NAME}")
         if not dist_dir.exists():
             print_log("ERROR", f"Distribution directory not found: {dist_dir}")
             raise Exception("Distribution directory not found")
-        print_log("INFO", "Copying main executable...")
-        shutil.copy2(
-            str(dist_dir / f"{APP_NAME}.exe"),
-            str(temp_dir_path / f"{APP_NAME}.exe"),
-        )
-        resources_dir = dist_dir / "resources"
-        if resources_dir.exists():
-            print_log("INFO", "Copying resource files...")
-            shutil.copytree(
-                str(resources_dir),
-                str(temp_dir_path / "resources"),
-                dirs_exist_ok=True,
-            )
-        print_log("INFO", "Changing to temporary directory...")
-        os.chdir(str(temp_dir_path))
-        create_7z_archive(".", "installer_files.7z")
         create_sfx_config()
         print_log("INFO", "Checking for 7-Zip SFX module...")
-        if not SEVEN_ZIP_SFX.exists():
+        sfx_path = Path(sfx_path)
+        if not sfx_path.exists():
             print_log(
                 "ERROR",
                 (
-                    f"7z.sfx not found at {SEVEN_ZIP_SFX}. "
+                    f"7z.sfx not found at {sfx_path}. "
                     "Please ensure 7-Zip is installed in the correct location"
                 ),
             )
             raise Exception("7z.sfx not found")
         print_log("INFO", "Creating self-extracting installer...")
-        with open(f"../{SETUP_EXE_NAME}", "wb") as outfile:
-            with open(SEVEN_ZIP_SFX, "rb") as infile:
-                outfile.write(infile.read())
+        with open(SETUP_EXE_NAME, "wb") as outfile:
+            with open(sfx_path, "rb") as infile:
+                shutil.copyfileobj(infile, outfile)
             with open("config.txt", "rb") as infile:
-                outfile.write(infile.read())
-            with open("installer_files.7z", "rb") as infile:
-                outfile.write(infile.read())
-        os.chdir("..")
+                shutil.copyfileobj(infile, outfile)
+            stats = write_archive(
+                outfile,
+                str(dist_dir),
+                threads=threads,
+                block_size=block_size,
+                preset=preset,
+            )
+        report_payload(stats)
         compile_resource_file()
         print_log("INFO", "Cleaning up temporary files...")
-        cleanup_files = ["config.txt", "installer_files.7z", "installer.rc"]
+        cleanup_files = ["config.txt", "installer.rc"]
         for file in cleanup_files:
             try:
                 os.remove(file)
             except OSError:  # type: ignore
                 pass
-        shutil.rmtree(temp_dir_path)
         final_destination = Path(f"./release/{SETUP_EXE_NAME}")
         final_destination.parent.mkdir(exist_ok=True, parents=True)
         print_log("INFO", f"Moving installer to {final_destination}")
@@ -222,13 +222,50 @@ def print_log(type: str, message: str) -> None:
         )
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=f"Package dist/{APP_NAME} into {SETUP_EXE_NAME}"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="Compression threads (defaults to the CPU count)",
+    )
+    parser.add_argument(
+        "--block-mb",
+        type=int,
+        default=DEFAULT_BLOCK_SIZE // (1024 * 1024),
+        help="Solid block size; smaller blocks compress in more threads",
+    )
+    parser.add_argument(
+        "--level",
+        type=int,
+        default=DEFAULT_PRESET,
+        choices=range(10),
+        help="LZMA2 preset, 0 (fastest) to 9 (smallest)",
+    )
+    parser.add_argument(
+        "--sfx",
+        default=str(SEVEN_ZIP_SFX),
+        help="Path to 7-Zip's 7z.sfx stub (copy it over on non-Windows)",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
         print(
             f"======= STARTING make_installer.py PROCESS @ {date_time_stamp()} ======="
         )
         print_log("INFO", f"Starting {APP_NAME} installer creation process...")
-        create_installer()
+        create_installer(
+            threads=args.threads,
+            block_size=args.block_mb * 1024 * 1024,
+            preset=args.level,
+            sfx_path=args.sfx,
+        )
         print_log(
             "SUCCESS", f"Installer created successfully: {SETUP_EXE_NAME}"
         )
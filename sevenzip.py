@@ -0,0 +1,351 @@
+import lzma
+import os
+import re
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+SIGNATURE = b"7z\xbc\xaf\x27\x1c"
+FORMAT_VERSION = b"\x00\x04"
+LZMA2_ID = b"\x21"
+BCJ_X86_ID = b"\x03\x03\x01\x03"
+EXECUTABLE_SUFFIXES = (".exe", ".dll", ".pyd")
+DEFAULT_BLOCK_SIZE = 32 * 1024 * 1024
+DEFAULT_PRESET = 7
+READ_CHUNK = 1024 * 1024
+FILETIME_EPOCH = 116444736000000000
+ATTRIBUTE_DIRECTORY = 0x10
+ATTRIBUTE_ARCHIVE = 0x20
+
+K_END = 0x00
+K_HEADER = 0x01
+K_MAIN_STREAMS_INFO = 0x04
+K_FILES_INFO = 0x05
+K_PACK_INFO = 0x06
+K_UNPACK_INFO = 0x07
+K_SUBSTREAMS_INFO = 0x08
+K_SIZE = 0x09
+K_CRC = 0x0A
+K_FOLDER = 0x0B
+K_CODERS_UNPACK_SIZE = 0x0C
+K_NUM_UNPACK_STREAM = 0x0D
+K_EMPTY_STREAM = 0x0E
+K_EMPTY_FILE = 0x0F
+K_NAME = 0x11
+K_MTIME = 0x14
+K_WIN_ATTRIBUTES = 0x15
+
+
+class Entry:
+    """A file or empty directory to store, named relative to the root"""
+
+    def __init__(self, path, name, size, mtime, directory=False):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.directory = directory
+        self.crc = 0
+
+
+class Folder:
+    """A run of files compressed together as one solid LZMA2 stream"""
+
+    def __init__(self, executable):
+        self.executable = executable
+        self.entries = []
+        self.size = 0
+        self.packed = []
+        self.packed_size = 0
+        self.dict_size = 0
+        self.read_seconds = 0.0
+        self.compress_seconds = 0.0
+
+
+def encode_number(value):
+    """Encode a 7z variable-length NUMBER"""
+    for extra in range(8):
+        if value < 1 << (7 * (extra + 1)):
+            high = (0xFF00 >> extra) & 0xFF
+            first = high | (value >> (8 * extra))
+            low = value & ((1 << (8 * extra)) - 1)
+            return bytes([first]) + low.to_bytes(extra, "little")
+    return b"\xff" + value.to_bytes(8, "little")
+
+
+def encode_bits(flags):
+    """Pack booleans into bytes, most significant bit first"""
+    data = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            data[index // 8] |= 0x80 >> (index % 8)
+    return bytes(data)
+
+
+def lzma2_dict_property(size):
+    """Return the LZMA2 dictionary property byte and the size it denotes"""
+    for prop in range(40):
+        dict_size = (2 | (prop & 1)) << (prop // 2 + 11)
+        if dict_size >= size:
+            return prop, dict_size
+    return 40, 0xFFFFFFFF
+
+
+def dedup_key(entry):
+    """Sort key placing near-identical files next to each other
+
+    Files are grouped by extension, then by name with digits removed (so
+    Qt6Core.dll, Qt6Gui.dll and the api-ms-win-*.dll stubs cluster), then
+    by size, so identical copies end up adjacent in the same solid block
+    where LZMA2 stores the second copy almost for free.
+    """
+    base = entry.name.rsplit("/", 1)[-1].lower()
+    stem, dot, suffix = base.rpartition(".")
+    if not dot:
+        stem, suffix = base, ""
+    return (suffix, re.sub(r"\d+", "", stem), entry.size, entry.name)
+
+
+def scan(root):
+    """Return (files, empty entries) under ``root``, in dedup order"""
+    files = []
+    empty = []
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        relative = os.path.relpath(directory, root).replace(os.sep, "/")
+        prefix = "" if relative == "." else relative + "/"
+        if not subdirectories and not filenames and prefix:
+            stat = os.stat(directory)
+            empty.append(
+                Entry(directory, prefix[:-1], 0, stat.st_mtime_ns, True)
+            )
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            entry = Entry(
+                path, prefix + filename, stat.st_size, stat.st_mtime_ns
+            )
+            (files if stat.st_size else empty).append(entry)
+    files.sort(key=dedup_key)
+    return files, empty
+
+
+def plan_folders(files, block_size):
+    """Split the ordered files into solid blocks of about ``block_size``
+
+    Executables and DLLs get their own blocks so only they go through the
+    x86 branch filter.
+    """
+    folders = []
+    folder = None
+    for entry in files:
+        executable = entry.name.lower().endswith(EXECUTABLE_SUFFIXES)
+        if (
+            folder is None
+            or folder.executable != executable
+            or (folder.size and folder.size + entry.size > block_size)
+        ):
+            folder = Folder(executable)
+            folders.append(folder)
+        folder.entries.append(entry)
+        folder.size += entry.size
+    return folders
+
+
+def compress_folder(folder, preset):
+    """Read and compress one folder's files, streaming in 1 MB chunks"""
+    prop, folder.dict_size = lzma2_dict_property(
+        max(min(folder.size, 64 * 1024 * 1024), 1 << 16)
+    )
+    filters = [{"id": lzma.FILTER_X86}] if folder.executable else []
+    filters.append(
+        {
+            "id": lzma.FILTER_LZMA2,
+            "preset": preset,
+            "dict_size": folder.dict_size,
+        }
+    )
+    compressor = lzma.LZMACompressor(format=lzma.FORMAT_RAW, filters=filters)
+    for entry in folder.entries:
+        crc = 0
+        with open(entry.path, "rb") as f:
+            while True:
+                started = time.perf_counter()
+                block = f.read(READ_CHUNK)
+                folder.read_seconds += time.perf_counter() - started
+                if not block:
+                    break
+                crc = zlib.crc32(block, crc)
+                started = time.thread_time()
+                output = compressor.compress(block)
+                folder.compress_seconds += time.thread_time() - started
+                if output:
+                    folder.packed.append(output)
+        entry.crc = crc
+    started = time.thread_time()
+    folder.packed.append(compressor.flush())
+    folder.compress_seconds += time.thread_time() - started
+    folder.packed_size = sum(len(chunk) for chunk in folder.packed)
+    return prop
+
+
+def folder_coders(folder, prop):
+    """Encode a folder's coder list: [BCJ x86 +] LZMA2"""
+    lzma2 = bytes([0x20 | len(LZMA2_ID)]) + LZMA2_ID + b"\x01" + bytes([prop])
+    if not folder.executable:
+        return b"\x01" + lzma2
+    bcj = bytes([len(BCJ_X86_ID)]) + BCJ_X86_ID
+    # Listed as 7-Zip does, LZMA2 first; BCJ (in stream 1) decodes the
+    # output of LZMA2 (out stream 0).
+    return b"\x02" + lzma2 + bcj + encode_number(1) + encode_number(0)
+
+
+def streams_info(folders, props):
+    data = bytearray([K_PACK_INFO])
+    data += encode_number(0) + encode_number(len(folders))
+    data.append(K_SIZE)
+    for folder in folders:
+        data += encode_number(folder.packed_size)
+    data.append(K_END)
+    data += bytes([K_UNPACK_INFO, K_FOLDER])
+    data += encode_number(len(folders)) + b"\x00"
+    for folder, prop in zip(folders, props):
+        data += folder_coders(folder, prop)
+    data.append(K_CODERS_UNPACK_SIZE)
+    for folder in folders:
+        outputs = 2 if folder.executable else 1
+        data += encode_number(folder.size) * outputs
+    data.append(K_END)
+    data += bytes([K_SUBSTREAMS_INFO, K_NUM_UNPACK_STREAM])
+    for folder in folders:
+        data += encode_number(len(folder.entries))
+    if any(len(folder.entries) > 1 for folder in folders):
+        data.append(K_SIZE)
+        for folder in folders:
+            for entry in folder.entries[:-1]:
+                data += encode_number(entry.size)
+    data += bytes([K_CRC, 1])
+    for folder in folders:
+        for entry in folder.entries:
+            data += struct.pack("<I", entry.crc)
+    data += bytes([K_END, K_END])
+    return bytes(data)
+
+
+def files_info(entries, empty_count):
+    count = len(entries)
+    data = bytearray([K_FILES_INFO]) + encode_number(count)
+
+    def add(kind, value):
+        data.append(kind)
+        data.extend(encode_number(len(value)))
+        data.extend(value)
+
+    if empty_count:
+        streams = count - empty_count
+        add(K_EMPTY_STREAM, encode_bits([i >= streams for i in range(count)]))
+        add(
+            K_EMPTY_FILE,
+            encode_bits([not e.directory for e in entries[streams:]]),
+        )
+    add(
+        K_NAME,
+        b"\x00"
+        + b"".join(e.name.encode("utf-16-le") + b"\x00\x00" for e in entries),
+    )
+    add(
+        K_MTIME,
+        b"\x01\x00"
+        + b"".join(
+            struct.pack("<Q", e.mtime // 100 + FILETIME_EPOCH) for e in entries
+        ),
+    )
+    add(
+        K_WIN_ATTRIBUTES,
+        b"\x01\x00"
+        + b"".join(
+            struct.pack(
+                "<I",
+                ATTRIBUTE_DIRECTORY if e.directory else ATTRIBUTE_ARCHIVE,
+            )
+            for e in entries
+        ),
+    )
+    data.append(K_END)
+    return bytes(data)
+
+
+def write_archive(
+    out,
+    root,
+    threads=None,
+    block_size=DEFAULT_BLOCK_SIZE,
+    preset=DEFAULT_PRESET,
+):
+    """Write the tree under ``root`` to ``out`` as a 7z archive
+
+    Files are read straight from ``root``; solid blocks are compressed on
+    ``threads`` worker threads (lzma releases the GIL) and written in
+    order as each finishes. ``out`` may already hold data, such as an SFX
+    stub, and must be seekable. Returns per-stage statistics.
+    """
+    stats = {}
+    started = time.perf_counter()
+    files, empty = scan(root)
+    folders = plan_folders(files, block_size)
+    stats["scan"] = {
+        "files": len(files) + len(empty),
+        "bytes": sum(entry.size for entry in files),
+        "folders": len(folders),
+        "seconds": time.perf_counter() - started,
+    }
+    archive_start = out.tell()
+    out.write(b"\x00" * 32)
+    write_seconds = 0.0
+    props = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(compress_folder, folder, preset) for folder in folders
+        ]
+        for folder, future in zip(folders, futures):
+            props.append(future.result())
+            write_started = time.perf_counter()
+            for chunk in folder.packed:
+                out.write(chunk)
+            write_seconds += time.perf_counter() - write_started
+            folder.packed = []
+    packed = sum(folder.packed_size for folder in folders)
+    stats["compress"] = {
+        "bytes": stats["scan"]["bytes"],
+        "packed_bytes": packed,
+        "read_seconds": sum(folder.read_seconds for folder in folders),
+        "cpu_seconds": sum(folder.compress_seconds for folder in folders),
+        "seconds": time.perf_counter() - started,
+        "threads": threads or os.cpu_count(),
+    }
+    write_started = time.perf_counter()
+    entries = [entry for folder in folders for entry in folder.entries]
+    header = bytearray([K_HEADER])
+    if folders:
+        header.append(K_MAIN_STREAMS_INFO)
+        header += streams_info(folders, props)
+    if entries or empty:
+        header += files_info(entries + empty, len(empty))
+    header.append(K_END)
+    out.write(header)
+    end = out.tell()
+    start_header = struct.pack("<QQI", packed, len(header), zlib.crc32(header))
+    out.seek(archive_start)
+    out.write(
+        SIGNATURE
+        + FORMAT_VERSION
+        + struct.pack("<I", zlib.crc32(start_header))
+        + start_header
+    )
+    out.seek(end)
+    write_seconds += time.perf_counter() - write_started
+    stats["write"] = {"bytes": end - archive_start, "seconds": write_seconds}
+    return stats
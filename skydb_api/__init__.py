@@ -0,0 +1,32 @@
+"""SkyDB API: a REST API over Microsoft Access databases"""
+
+import importlib
+
+
+__version__ = "1.0.0"
+
+__all__ = [
+    "ConnectionPool",
+    "DatabaseConnection",
+    "PoolError",
+    "create_app",
+    "serve",
+]
+
+# Resolved on first use, so importing the package (or the CLI) does not
+# pull in Flask, waitress and the database layer up front.
+_EXPORTS = {
+    "ConnectionPool": ".database",
+    "DatabaseConnection": ".database",
+    "PoolError": ".database",
+    "create_app": ".server",
+    "serve": ".server",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,251 @@
+import math
+import threading
+import time
+
+from .settings import DEFAULT_THREADS
+
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_QUEUE_TIMEOUT = 10.0
+# Routes answered from memory or the schema cache; they never wait behind
+# queries for a worker
+LIGHT_ROUTES = frozenset(
+    {
+        "/",
+        "/db",
+        "/db/<name>/slow",
+        "/db/<name>/tables",
+        "/metrics",
+        "/q",
+        "/schema",
+        "/slow",
+        "/stats",
+        "/tables",
+        "/tables/<name>/columns",
+        "/tables/<name>/indexes",
+        "unmatched",
+    }
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request can neither run nor wait for a slot"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_route_limit(value: str):
+    """Parse a ROUTE=N concurrency limit such as ``/query=2``"""
+    route, sep, raw = value.rpartition("=")
+    if not sep or not route.startswith("/"):
+        raise ValueError(f"Expected ROUTE=N, got {value}")
+    limit = int(raw)
+    if limit < 1:
+        raise ValueError(f"Route limit must be at least 1: {value}")
+    return route, limit
+
+
+def parse_route_limits(value: str) -> dict:
+    """Parse comma-separated ROUTE=N limits from a settings value"""
+    return dict(
+        parse_route_limit(item.strip())
+        for item in value.split(",")
+        if item.strip()
+    )
+
+
+def optional_int(server, key):
+    value = server.get(key)
+    return int(value) if value else None
+
+
+def admission_from_settings(server):
+    """Build (threads, AdmissionControl) from a [server] settings section"""
+    threads = optional_int(server, "threads") or DEFAULT_THREADS
+    admission = AdmissionControl.for_threads(
+        threads,
+        workers=optional_int(server, "workers"),
+        queue_size=optional_int(server, "queue_size"),
+        route_limits=parse_route_limits(server.get("route_limits", "")),
+        queue_timeout=float(
+            server.get("queue_timeout") or DEFAULT_QUEUE_TIMEOUT
+        ),
+    )
+    return threads, admission
+
+
+class AdmissionControl:
+    """Bounded admission of requests to the worker threads
+
+    Requests to routes outside LIGHT_ROUTES share ``workers`` slots, and
+    any route listed in ``route_limits`` runs at most that many requests
+    at once. A request that finds no free slot waits in a queue of at most
+    ``queue_size`` requests for up to ``queue_timeout`` seconds; past
+    either it is refused with Overloaded, so overload shows up as fast
+    503s rather than growing latency. Light routes skip the queue, and
+    the server keeps threads free for them (see ``thread_count``).
+    """
+
+    @classmethod
+    def for_threads(
+        cls,
+        threads,
+        workers=None,
+        queue_size=None,
+        route_limits=None,
+        queue_timeout=DEFAULT_QUEUE_TIMEOUT,
+    ):
+        """Split ``threads`` server threads into workers and queue places
+
+        A queued request holds its thread while it waits, so workers plus
+        queue places must leave one thread for light routes. By default a
+        third of the others are queue places. Raises ValueError when the
+        given workers and queue size need more threads than there are.
+        """
+        spare = threads - 1
+        if spare < 1:
+            raise ValueError("Admission control needs at least 2 threads")
+        if queue_size is None:
+            queue_size = max(0, spare - workers) if workers else spare // 3
+        if workers is None:
+            workers = spare - queue_size
+        admission = cls(workers, route_limits, queue_size, queue_timeout)
+        if admission.thread_count() > threads:
+            raise ValueError(
+                f"{workers} workers and a queue of {queue_size} need "
+                f"{admission.thread_count()} threads, not {threads}"
+            )
+        return admission
+
+    def __init__(
+        self,
+        workers,
+        route_limits=None,
+        queue_size=DEFAULT_QUEUE_SIZE,
+        queue_timeout=DEFAULT_QUEUE_TIMEOUT,
+    ):
+        if workers < 1:
+            raise ValueError("At least one worker is needed")
+        self.workers = workers
+        self.route_limits = dict(route_limits or {})
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        self._routes = {}
+        self._service_seconds = 0.0
+        self._counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "light": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def thread_count(self):
+        """Server threads needed so queued requests never block light ones"""
+        return self.workers + self.queue_size + 1
+
+    def _route(self, route):
+        state = self._routes.get(route)
+        if state is None:
+            state = self._routes[route] = {"running": 0, "rejected": 0}
+        return state
+
+    def _fits(self, route, heavy):
+        if heavy and self._running >= self.workers:
+            return False
+        limit = self.route_limits.get(route)
+        return limit is None or self._route(route)["running"] < limit
+
+    def _retry_after(self):
+        """Seconds until the queue has likely drained, at least one"""
+        admitted = self._counters["admitted"]
+        if not admitted:
+            return 1
+        average = self._service_seconds / admitted
+        backlog = (self._waiting + self._running) / self.workers
+        return max(1, math.ceil(average * backlog))
+
+    def acquire(self, route):
+        """Take a slot for a request to ``route``, waiting if allowed
+
+        Returns a ticket to pass to release(), or None when the route
+        needs no slot. Raises Overloaded when the request is refused.
+        """
+        heavy = route not in LIGHT_ROUTES
+        if not heavy and route not in self.route_limits:
+            with self._cond:
+                self._counters["light"] += 1
+            return None
+        started = time.monotonic()
+        with self._cond:
+            if not self._fits(route, heavy):
+                if self._waiting >= self.queue_size:
+                    self._reject(route, "rejected")
+                    raise Overloaded(
+                        f"Server busy: {self._waiting} requests queued",
+                        self._retry_after(),
+                    )
+                self._waiting += 1
+                self._counters["queued"] += 1
+                deadline = started + self.queue_timeout
+                try:
+                    while not self._fits(route, heavy):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject(route, "timeouts")
+                            raise Overloaded(
+                                "Server busy: no worker freed up within "
+                                f"{self.queue_timeout:g} seconds",
+                                self._retry_after(),
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if heavy:
+                self._running += 1
+            self._route(route)["running"] += 1
+            self._counters["admitted"] += 1
+            now = time.monotonic()
+            self._counters["wait_seconds"] += now - started
+        return (route, heavy, now)
+
+    def _reject(self, route, counter):
+        self._counters[counter] += 1
+        self._route(route)["rejected"] += 1
+
+    def release(self, ticket):
+        if ticket is None:
+            return
+        route, heavy, started = ticket
+        with self._cond:
+            if heavy:
+                self._running -= 1
+            self._route(route)["running"] -= 1
+            self._service_seconds += time.monotonic() - started
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return queue depth, slot use and admission counters"""
+        with self._cond:
+            routes = {
+                route: {
+                    **state,
+                    "limit": self.route_limits.get(route),
+                }
+                for route, state in self._routes.items()
+            }
+            counters = dict(self._counters)
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queue_depth": self._waiting,
+                "queue_size": self.queue_size,
+                "routes": routes,
+                **{f"total_{k}": v for k, v in counters.items()},
+            }
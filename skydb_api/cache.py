@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .sql import normalize_sql
+from .utils import estimate_size, file_signature
+
+
+class ResultCache:
+    """LRU cache of SELECT results with write-aware invalidation
+
+    Entries are keyed on the normalized SQL and its parameters and remember
+    the tables they read. Writes made through the API drop the entries for
+    the tables they touch; any change to the database file that the API did
+    not make (the game saving, for instance) flushes the whole cache.
+    """
+
+    def __init__(
+        self,
+        db_path=None,
+        max_bytes=64 * 1024 * 1024,
+        max_entries=1024,
+        ttl=300.0,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._signature = file_signature(db_path)
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "flushes": 0,
+            "oversized": 0,
+        }
+
+    @staticmethod
+    def key(query, params=None):
+        """Cache key for a statement and its parameters"""
+        frozen = json.dumps(params, sort_keys=True, default=repr)
+        return normalize_sql(query), frozen
+
+    def _check_file(self):
+        signature = file_signature(self.db_path)
+        if signature != self._signature:
+            self._signature = signature
+            self._flush()
+
+    def _flush(self):
+        if self._entries:
+            self._counters["flushes"] += 1
+        self._entries.clear()
+        self._bytes = 0
+        self.generation += 1
+
+    def _drop(self, key):
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, query, params=None):
+        """Return (True, result) on a hit or (False, generation) on a miss
+
+        The generation must be handed back to put() so results computed
+        while a write invalidated the cache are not stored.
+        """
+        key = self.key(query, params)
+        now = time.monotonic()
+        with self._lock:
+            self._check_file()
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, _, _, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return True, result
+                self._drop(key)
+                self._counters["expirations"] += 1
+            self._counters["misses"] += 1
+            return False, self.generation
+
+    def put(self, query, params, result, tables, generation):
+        """Store a SELECT result read at ``generation``"""
+        key = self.key(query, params)
+        size = estimate_size(result)
+        with self._lock:
+            if generation != self.generation:
+                return False
+            if size > self.max_bytes:
+                self._counters["oversized"] += 1
+                return False
+            if key in self._entries:
+                self._drop(key)
+            expires = time.monotonic() + self.ttl
+            self._entries[key] = (result, size, frozenset(tables), expires)
+            self._bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._counters["evictions"] += 1
+            return True
+
+    def invalidate(self, tables):
+        """Drop entries reading any of ``tables``; all of them if unknown
+
+        Called after a write through the API, so the file's new signature
+        is adopted rather than treated as an external change.
+        """
+        tables = set(tables)
+        with self._lock:
+            if not tables:
+                self._flush()
+            else:
+                stale = [
+                    key
+                    for key, entry in self._entries.items()
+                    if not entry[2] or entry[2] & tables
+                ]
+                for key in stale:
+                    self._drop(key)
+                self._counters["invalidations"] += len(stale)
+                self.generation += 1
+            self._signature = file_signature(self.db_path)
+
+    def clear(self):
+        """Empty the cache"""
+        with self._lock:
+            self._flush()
+
+    def stats(self):
+        """Return a snapshot of cache size and counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
@@ -0,0 +1,221 @@
+import re
+import threading
+import time
+
+from .settings import database_path, resolve_password
+
+
+DEFAULT_IDLE_CLOSE = 600.0
+DEFAULT_MAX_CONCURRENT = 8
+DEFAULT_WAIT_TIMEOUT = 5.0
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class DatabaseBusy(Exception):
+    """Raised when a database already runs its maximum of requests"""
+
+
+class CatalogEntry:
+    """Settings, limits and (once opened) the connection of one database"""
+
+    def __init__(self, name, settings, options, max_concurrent):
+        self.name = name
+        self.settings = settings
+        self.path = database_path(settings)
+        self.options = options
+        self.max_concurrent = max_concurrent
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.db = None
+        self.active = 0
+        self.last_used = None
+        self.opens = 0
+        self.lock = threading.Lock()
+
+
+def entry_options(settings):
+    """Read the per-database limits of a settings section"""
+    options = {}
+    if settings.get("pool_max"):
+        options["pool_max"] = int(settings["pool_max"])
+    if settings.get("cache_mb"):
+        options["cache_max_bytes"] = int(
+            float(settings["cache_mb"]) * 1024 * 1024
+        )
+    return options
+
+
+class DatabaseCatalog:
+    """Named databases served side by side from one process
+
+    Each database gets its own DatabaseConnection (so its own pool,
+    result cache and statement cursors), opened on the first request for
+    it and closed again after ``idle_close`` seconds without one. Every
+    database also admits at most ``max_concurrent`` requests at a time;
+    further requests wait up to ``wait_timeout`` seconds for a slot and
+    then get DatabaseBusy.
+    """
+
+    def __init__(
+        self,
+        connect,
+        idle_close=DEFAULT_IDLE_CLOSE,
+        max_concurrent=DEFAULT_MAX_CONCURRENT,
+        wait_timeout=DEFAULT_WAIT_TIMEOUT,
+        log=print,
+    ):
+        self.connect = connect
+        self.idle_close = idle_close
+        self.max_concurrent = max_concurrent
+        self.wait_timeout = wait_timeout
+        self.log = log
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._reaper = None
+        self._closed = False
+        self._counters = {"opens": 0, "idle_closes": 0, "busy": 0}
+
+    def add(self, name, settings):
+        """Register a database from a settings section, without opening it"""
+        if not NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid database name: {name}")
+        if not database_path(settings):
+            raise ValueError(f"Database {name} has no path")
+        max_concurrent = int(
+            settings.get("max_concurrent") or self.max_concurrent
+        )
+        entry = CatalogEntry(
+            name, settings, entry_options(settings), max_concurrent
+        )
+        with self._lock:
+            self._entries[name] = entry
+
+    def names(self):
+        with self._lock:
+            return sorted(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def acquire(self, name):
+        """Take a request slot on a database, opening it if needed
+
+        Raises KeyError for an unknown name and DatabaseBusy when no slot
+        frees up in time. Every successful call needs a release(name).
+        """
+        with self._lock:
+            entry = self._entries[name]
+        if not entry.slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self._counters["busy"] += 1
+            raise DatabaseBusy(
+                f"Database {name} is busy, retry later "
+                f"({entry.max_concurrent} requests running)"
+            )
+        try:
+            with entry.lock:
+                if entry.db is None:
+                    self._open(entry)
+                entry.active += 1
+                entry.last_used = time.monotonic()
+                return entry.db
+        except Exception:
+            entry.slots.release()
+            raise
+
+    def release(self, name):
+        with self._lock:
+            entry = self._entries[name]
+        with entry.lock:
+            entry.active -= 1
+            entry.last_used = time.monotonic()
+        entry.slots.release()
+
+    def _open(self, entry):
+        password = resolve_password(entry.settings, log=self.log)
+        entry.db = self.connect(entry.path, password, **entry.options)
+        entry.opens += 1
+        with self._lock:
+            self._counters["opens"] += 1
+            if self._reaper is None and self.idle_close:
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, name="skydb-catalog"
+                )
+                self._reaper.daemon = True
+                self._reaper.start()
+        self.log(f"Opened database {entry.name}")
+
+    def _reap_loop(self):
+        interval = max(1.0, min(self.idle_close / 2, 30.0))
+        while not self._closed:
+            self._wakeup.wait(interval)
+            if not self._closed:
+                self.close_idle()
+
+    def close_idle(self):
+        """Close every open database idle for ``idle_close`` seconds"""
+        cutoff = time.monotonic() - self.idle_close
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            with entry.lock:
+                if (
+                    entry.db is None
+                    or entry.active
+                    or entry.last_used > cutoff
+                ):
+                    continue
+                db, entry.db = entry.db, None
+            db.close()
+            with self._lock:
+                self._counters["idle_closes"] += 1
+            self.log(f"Closed idle database {entry.name}")
+
+    def close(self):
+        """Stop the idle reaper and close every open database"""
+        self._closed = True
+        self._wakeup.set()
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            with entry.lock:
+                db, entry.db = entry.db, None
+            if db is not None:
+                db.close()
+
+    def open_databases(self):
+        """Return (name, DatabaseConnection) for every open database"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [(e.name, e.db) for e in entries if e.db is not None]
+
+    def stats(self):
+        """Return per-database state and limits, and catalog counters"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.values())
+            counters = dict(self._counters)
+        databases = {}
+        for entry in entries:
+            db = entry.db
+            databases[entry.name] = {
+                "open": db is not None,
+                "active": entry.active,
+                "max_concurrent": entry.max_concurrent,
+                "idle_seconds": (
+                    round(now - entry.last_used, 1)
+                    if entry.last_used is not None
+                    else None
+                ),
+                "opens": entry.opens,
+            }
+            if db is not None:
+                databases[entry.name]["pool"] = db.pool.stats()
+                if db.cache:
+                    databases[entry.name]["cache"] = db.cache.stats()
+        return {
+            "databases": databases,
+            "open": sum(1 for e in entries if e.db is not None),
+            "registered": len(entries),
+            **{f"total_{k}": v for k, v in counters.items()},
+        }
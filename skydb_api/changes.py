@@ -0,0 +1,271 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import deque
+
+from .sql import quote_identifier
+
+
+DEFAULT_JOURNAL_SIZE = 100000
+SCAN_BATCH_SIZE = 5000
+CHANGE_KEYS = {"insert": "inserted", "update": "updated"}
+
+
+class TokenExpired(Exception):
+    """Raised when a change token is older than the journal can answer"""
+
+
+def row_digest(row) -> int:
+    """Return a 64-bit fingerprint of a row's values"""
+    digest = hashlib.blake2b(repr(row).encode("utf-8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+class TableFeed:
+    """Fingerprints and change journal of one table
+
+    ``fingerprints`` maps each key to its row digest shifted left by one,
+    with the low bit marking the scan that last saw the row. Flipping that
+    bit on every scan finds deleted rows without a second set of keys.
+    """
+
+    def __init__(self, key, columns, seq):
+        self.key = key
+        self.columns = columns
+        self.fingerprints = {}
+        self.epoch = 0
+        self.journal = deque()
+        self.horizon = seq
+        self.seq = seq
+        self.version = None
+        self.lock = threading.Lock()
+
+
+class ChangeFeed:
+    """Inserted, updated and deleted rows of tables since a token
+
+    Access has no triggers, so changes are found by rescanning a table and
+    comparing per-row fingerprints with the previous scan. A table is only
+    rescanned when the database version has moved since its last scan, and
+    rows are streamed in ``batch_size`` chunks so only the fingerprints
+    stay in memory. Each scan that finds changes appends them to a bounded
+    journal under a new sequence number; tokens older than the journal, or
+    issued before a restart, are rejected with TokenExpired.
+    """
+
+    def __init__(
+        self,
+        db,
+        journal_size=DEFAULT_JOURNAL_SIZE,
+        batch_size=SCAN_BATCH_SIZE,
+    ):
+        self.db = db
+        self.journal_size = journal_size
+        self.batch_size = batch_size
+        self.feed_id = secrets.token_hex(4)
+        self._seq = 0
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "scans": 0,
+            "scan_seconds": 0.0,
+            "rows_scanned": 0,
+            "changes": 0,
+            "expired_tokens": 0,
+        }
+
+    def _next_seq(self):
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def token(self, seq):
+        return f"{self.feed_id}.{seq}"
+
+    def _parse_token(self, token):
+        feed_id, _, seq = token.partition(".")
+        if feed_id != self.feed_id or not seq.isdigit():
+            raise TokenExpired("Change token is unknown or from a restart")
+        return int(seq)
+
+    def changes(self, table, since=None, key=None):
+        """Return the net changes to ``table`` after token ``since``
+
+        ``key`` lists the columns identifying a row, defaulting to the
+        primary key. Without ``since`` only the current token is returned.
+        """
+        if not key:
+            description = self.db.schema.describe(table) or {}
+            key = description.get("primary_key") or []
+        if not key:
+            raise ValueError(
+                f"Table {table} has no primary key; pass key=<columns>"
+            )
+        key = list(key)
+        name = (table.lower(), tuple(column.lower() for column in key))
+        with self._lock:
+            feed = self._tables.get(name)
+            if feed is None:
+                feed = self._tables[name] = TableFeed(key, None, 0)
+        with feed.lock:
+            version = self.db.version()
+            if feed.version != version:
+                try:
+                    self._scan(feed, table)
+                except Exception:
+                    with self._lock:
+                        self._tables.pop(name, None)
+                    raise
+                feed.version = version
+            current = self.token(feed.seq)
+            if since is None:
+                return {"table": table, "token": current}
+            try:
+                since = self._parse_token(since)
+                if since < feed.horizon or since > feed.seq:
+                    raise TokenExpired(
+                        "Change token is older than the change journal"
+                    )
+            except TokenExpired:
+                with self._lock:
+                    self._counters["expired_tokens"] += 1
+                raise
+            net = self._net_changes(feed, since)
+            columns = feed.columns
+        result = {
+            "table": table,
+            "token": current,
+            "inserted": [],
+            "updated": [],
+            "deleted": [],
+        }
+        for pk, (op, row) in net.items():
+            if op == "delete":
+                values = pk if len(key) > 1 else (pk,)
+                result["deleted"].append(dict(zip(key, values)))
+            else:
+                result[CHANGE_KEYS[op]].append(dict(zip(columns, row)))
+        return result
+
+    def _net_changes(self, feed, since):
+        """Fold the journal after ``since`` into one change per row"""
+        events = []
+        for event in reversed(feed.journal):
+            if event[0] <= since:
+                break
+            events.append(event)
+        net = {}
+        for _, op, pk, row in reversed(events):
+            previous = net.get(pk)
+            if previous is None:
+                net[pk] = (op, row)
+            elif previous[0] == "insert":
+                if op == "delete":
+                    del net[pk]
+                else:
+                    net[pk] = ("insert", row)
+            elif previous[0] == "delete":
+                net[pk] = ("update", row)
+            else:
+                net[pk] = (op, row)
+        return net
+
+    def _scan(self, feed, table):
+        started = time.perf_counter()
+        query = f"SELECT * FROM {quote_identifier(table)}"
+
+        def run(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                columns = [column[0] for column in cursor.description]
+                return self._diff(feed, cursor, columns)
+            finally:
+                cursor.close()
+
+        try:
+            scanned, events = self.db.run_read(run)
+        except Exception as e:
+            # A partial scan leaves the fingerprints half updated, so the
+            # next request starts from a new baseline.
+            feed.columns = None
+            feed.fingerprints = {}
+            feed.journal.clear()
+            if isinstance(e, self.db.driver.Error):
+                raise Exception(f"Database error: {str(e)}")
+            raise
+        if events is None:
+            feed.seq = feed.horizon = self._next_seq()
+        elif events:
+            seq = self._next_seq()
+            feed.journal.extend((seq, op, pk, row) for op, pk, row in events)
+            while len(feed.journal) > self.journal_size:
+                feed.horizon = feed.journal.popleft()[0]
+            feed.seq = seq
+        with self._lock:
+            self._counters["scans"] += 1
+            self._counters["scan_seconds"] += time.perf_counter() - started
+            self._counters["rows_scanned"] += scanned
+            self._counters["changes"] += len(events or ())
+
+    def _diff(self, feed, cursor, columns):
+        """Compare streamed rows with the stored fingerprints
+
+        Returns the number of rows read and the (op, key, row) events, or
+        None for the events when this scan only built a new baseline.
+        """
+        lowered = [column.lower() for column in columns]
+        try:
+            positions = [lowered.index(name.lower()) for name in feed.key]
+        except ValueError:
+            raise ValueError(f"Unknown key column in {feed.key}")
+        baseline = feed.columns != columns
+        if baseline:
+            feed.columns = columns
+            feed.fingerprints = {}
+            feed.journal.clear()
+        fingerprints = feed.fingerprints
+        epoch = feed.epoch ^ 1
+        single = positions[0] if len(positions) == 1 else None
+        events = []
+        scanned = 0
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            scanned += len(rows)
+            for row in rows:
+                row = tuple(row)
+                if single is not None:
+                    pk = row[single]
+                else:
+                    pk = tuple(row[i] for i in positions)
+                digest = row_digest(row)
+                previous = fingerprints.get(pk)
+                if previous is None:
+                    if not baseline:
+                        events.append(("insert", pk, row))
+                elif previous >> 1 != digest:
+                    events.append(("update", pk, row))
+                fingerprints[pk] = digest << 1 | epoch
+        deleted = [
+            pk for pk, value in fingerprints.items() if value & 1 != epoch
+        ]
+        for pk in deleted:
+            del fingerprints[pk]
+            events.append(("delete", pk, None))
+        feed.epoch = epoch
+        return scanned, None if baseline else events
+
+    def stats(self):
+        """Return tracked tables, fingerprint and journal sizes, counters"""
+        with self._lock:
+            tables = list(self._tables.values())
+            counters = dict(self._counters)
+        return {
+            "tables": len(tables),
+            "fingerprints": sum(len(t.fingerprints) for t in tables),
+            "journal_entries": sum(len(t.journal) for t in tables),
+            **{f"total_{k}": v for k, v in counters.items()},
+        }
@@ -0,0 +1,401 @@
+import argparse
+import ast
+import os
+import sys
+
+from .admission import (
+    DEFAULT_QUEUE_TIMEOUT,
+    AdmissionControl,
+    parse_route_limit,
+)
+from .settings import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    DEFAULT_THREADS,
+    SETTINGS_FILE,
+    database_path,
+    database_settings_for,
+    load_database_settings,
+    load_named_databases,
+    resolve_password,
+)
+from .startup import FLAG, StartupProfile
+
+
+def parse_connect_arg(value: str):
+    """Parse a KEY=VALUE driver argument, evaluating Python literals"""
+    key, sep, raw = value.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {value}")
+    try:
+        return key, ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        return key, raw
+
+
+def parse_database_arg(value: str):
+    """Parse a NAME=PATH database to serve under /db/NAME"""
+    name, sep, path = value.partition("=")
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError(f"Expected NAME=PATH, got {value}")
+    return name, path
+
+
+def route_limit_arg(value: str):
+    """argparse wrapper around parse_route_limit"""
+    try:
+        return parse_route_limit(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        prog="python -m skydb_api",
+        description="Headless SkyDB API server",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run the API server")
+    serve.add_argument(
+        "--db", help="Database file (defaults to the path in settings.ini)"
+    )
+    serve.add_argument("--password", help="Database password")
+    serve.add_argument(
+        "--settings",
+        default=SETTINGS_FILE,
+        help="settings.ini to read the database from",
+    )
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument(
+        "--threads",
+        type=int,
+        default=DEFAULT_THREADS,
+        help="Waitress worker threads, shared out between --workers, "
+        "--queue-size and one thread kept for light routes",
+    )
+    serve.add_argument(
+        "--driver",
+        default=None,
+        help="DB-API driver module to use instead of pyodbc",
+    )
+    serve.add_argument(
+        "--connect-arg",
+        action="append",
+        default=[],
+        type=parse_connect_arg,
+        metavar="KEY=VALUE",
+        help="Extra keyword argument for the driver's connect()",
+    )
+    serve.add_argument(
+        "--queries",
+        help="ini file whose [queries] section defines named queries",
+    )
+    serve.add_argument("--pool-min", type=int, default=1)
+    serve.add_argument("--pool-max", type=int, default=8)
+    serve.add_argument(
+        "--cache-mb",
+        type=float,
+        default=64,
+        help="SELECT result cache size in MB (0 disables the cache)",
+    )
+    serve.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=300.0,
+        help="Seconds a cached SELECT result stays valid",
+    )
+    serve.add_argument(
+        "--no-fast-executemany",
+        dest="fast_executemany",
+        action="store_false",
+        help="Never use pyodbc's fast_executemany for POST /bulk",
+    )
+    serve.add_argument(
+        "--no-lanes",
+        dest="lanes",
+        action="store_false",
+        help="Run writes on pooled connections instead of one writer queue",
+    )
+    serve.add_argument(
+        "--read-workers",
+        type=int,
+        default=None,
+        help="Concurrent reads allowed (defaults to --pool-max)",
+    )
+    serve.add_argument(
+        "--group-commit-ms",
+        type=float,
+        default=0,
+        help="Commit writes arriving within this window together (0 = off)",
+    )
+    serve.add_argument(
+        "--slow-ms",
+        type=float,
+        default=1000,
+        help="Log /query and /q requests slower than this (milliseconds)",
+    )
+    serve.add_argument(
+        "--slow-log",
+        default=None,
+        help="Rotating slow-query log file (off unless given)",
+    )
+    serve.add_argument(
+        "--access-log",
+        action="store_true",
+        help="Print a line per request, sampled above 20 requests a second",
+    )
+    serve.add_argument(
+        "--no-compression",
+        dest="compression",
+        action="store_false",
+        help="Never compress responses",
+    )
+    serve.add_argument(
+        "--compress-level",
+        type=int,
+        default=6,
+        help="gzip/zstd/brotli compression level",
+    )
+    serve.add_argument(
+        "--compress-min-bytes",
+        type=int,
+        default=1024,
+        help="Send smaller responses uncompressed",
+    )
+    serve.add_argument(
+        "--mirror",
+        default=None,
+        metavar="PATH",
+        help="Answer SELECTs from an indexed SQLite copy kept at PATH",
+    )
+    serve.add_argument(
+        "--mirror-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between mirror refreshes",
+    )
+    serve.add_argument(
+        "--mirror-max-staleness",
+        type=float,
+        default=30.0,
+        help="Read from Access when the mirror is further behind (seconds)",
+    )
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Queries and other heavy requests run at once "
+        "(default: the threads not used for the queue or light routes)",
+    )
+    serve.add_argument(
+        "--route-limit",
+        type=route_limit_arg,
+        action="append",
+        default=[],
+        metavar="ROUTE=N",
+        help="Run at most N requests to ROUTE at once, e.g. /bulk=1 "
+        "(repeatable)",
+    )
+    serve.add_argument(
+        "--queue-size",
+        type=int,
+        default=None,
+        help="Requests waiting for a worker before new ones get 503; each "
+        "holds a thread (default: a third of threads - 1)",
+    )
+    serve.add_argument(
+        "--queue-timeout",
+        type=float,
+        default=DEFAULT_QUEUE_TIMEOUT,
+        help="Seconds a request waits for a worker before it gets 503",
+    )
+    serve.add_argument(
+        "--connection-limit",
+        type=int,
+        default=None,
+        help="Open connections Waitress accepts (Waitress default: 100)",
+    )
+    serve.add_argument(
+        "--backlog",
+        type=int,
+        default=None,
+        help="Listen backlog of the server socket (Waitress default: 1024)",
+    )
+    serve.add_argument(
+        "--database",
+        type=parse_database_arg,
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="Also serve PATH under /db/NAME (repeatable); [database:NAME] "
+        "sections of the settings file are added too",
+    )
+    serve.add_argument(
+        "--db-idle-close",
+        type=float,
+        default=600.0,
+        help="Close a /db/NAME database after this many idle seconds",
+    )
+    serve.add_argument(
+        "--db-max-concurrent",
+        type=int,
+        default=8,
+        help="Requests each /db/NAME database runs at once",
+    )
+    serve.add_argument(
+        FLAG,
+        action="store_true",
+        help="Print time spent per import and startup phase once ready",
+    )
+    return parser
+
+
+def run_serve(args, startup=None) -> int:
+    """Start the headless server from parsed arguments"""
+    startup = startup or StartupProfile()
+    try:
+        admission = AdmissionControl.for_threads(
+            args.threads,
+            workers=args.workers,
+            queue_size=args.queue_size,
+            route_limits=dict(args.route_limit),
+            queue_timeout=args.queue_timeout,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    with startup.phase("settings"):
+        database = load_database_settings(args.settings)
+    db_path = args.db or database_path(database)
+    if not db_path:
+        print("Error: No database given and none found in settings.ini")
+        return 2
+    if not os.path.exists(db_path):
+        print(f"Error: Database file not found: {db_path}")
+        return 2
+    password = args.password
+    if password is None:
+        if args.db and database_path(database) != args.db:
+            database = database_settings_for(args.db)
+        try:
+            with startup.phase("credential"):
+                password = resolve_password(database)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 2
+    with startup.phase("database layer"):
+        from .database import DatabaseConnection
+        from .logs import AccessLog
+        from .server import serve
+
+        db = DatabaseConnection(
+            db_path,
+            password=password,
+            driver=args.driver,
+            connect_args=dict(args.connect_arg),
+            pool_min=args.pool_min,
+            pool_max=args.pool_max,
+            cache_max_bytes=int(args.cache_mb * 1024 * 1024),
+            cache_ttl=args.cache_ttl,
+            fast_executemany=args.fast_executemany,
+            lanes=args.lanes,
+            read_workers=args.read_workers,
+            group_commit_ms=args.group_commit_ms,
+            slow_query_ms=args.slow_ms,
+            slow_query_log=args.slow_log,
+            mirror_path=args.mirror,
+            mirror_interval=args.mirror_interval,
+            mirror_max_staleness=args.mirror_max_staleness,
+        )
+    if args.queries and not os.path.exists(args.queries):
+        print(f"Error: Queries file not found: {args.queries}")
+        return 2
+    try:
+        with startup.phase("named queries"):
+            if os.path.exists(args.settings):
+                db.queries.load(args.settings)
+            if args.queries:
+                db.queries.load(args.queries)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    try:
+        catalog = build_catalog(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    access_log = AccessLog(print) if args.access_log else None
+    serve(
+        db,
+        catalog=catalog,
+        admission=admission,
+        connection_limit=args.connection_limit,
+        backlog=args.backlog,
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+        access_log=access_log,
+        compression=args.compression,
+        compress_level=args.compress_level,
+        compress_min_size=args.compress_min_bytes,
+        startup=startup,
+    )
+    return 0
+
+
+def build_catalog(args):
+    """Collect the databases served under /db/NAME, or None if there are none
+
+    Each one opens with the same driver and per-database defaults as the
+    main database, overridden by its settings section.
+    """
+    named = load_named_databases(args.settings)
+    for name, path in args.database:
+        if not os.path.exists(path):
+            raise ValueError(f"Database file not found: {path}")
+        named[name] = database_settings_for(path)
+    if not named:
+        return None
+    from .catalog import DatabaseCatalog
+    from .database import DatabaseConnection
+
+    defaults = {
+        "pool_max": args.pool_max,
+        "cache_max_bytes": int(args.cache_mb * 1024 * 1024),
+    }
+
+    def connect(path, password, **options):
+        return DatabaseConnection(
+            path,
+            password=password,
+            driver=args.driver,
+            connect_args=dict(args.connect_arg),
+            cache_ttl=args.cache_ttl,
+            fast_executemany=args.fast_executemany,
+            slow_query_ms=args.slow_ms,
+            **{**defaults, **options},
+        )
+
+    catalog = DatabaseCatalog(
+        connect,
+        idle_close=args.db_idle_close,
+        max_concurrent=args.db_max_concurrent,
+    )
+    for name, settings in named.items():
+        catalog.add(name, settings)
+    print(f"Serving {len(catalog)} more database(s) under /db/<name>")
+    return catalog
+
+
+def main(argv=None) -> int:
+    startup = StartupProfile.from_argv(sys.argv if argv is None else argv)
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        return run_serve(args, startup)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import time
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+from .metrics import (
+    COMPRESSION_CPU_SECONDS,
+    COMPRESSION_INPUT_BYTES,
+    COMPRESSION_OUTPUT_BYTES,
+    COMPRESSION_RATIO,
+    COMPRESSION_SKIPPED,
+)
+from .utils import optional_module
+
+
+DEFAULT_LEVEL = 6
+DEFAULT_MIN_SIZE = 1024
+PREFERENCE = ("zstd", "br", "gzip")
+ENCODING_MODULES = {"zstd": "zstandard", "br": "brotli"}
+INCOMPRESSIBLE_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/vnd.apache.parquet",
+)
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(
+            min(max(level, 1), 9), zlib.DEFLATED, 31
+        )
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class ZstdEncoder:
+    def __init__(self, level):
+        zstandard = optional_module("zstandard")
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(
+            level=min(max(level, 1), 22)
+        ).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(self._flush_block)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        brotli = optional_module("brotli")
+        self._compressor = brotli.Compressor(quality=min(max(level, 0), 11))
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+ENCODERS = {"zstd": ZstdEncoder, "br": BrotliEncoder, "gzip": GzipEncoder}
+
+
+def available_encodings():
+    """Return the encodings usable here, most preferred first"""
+    return [
+        name
+        for name in PREFERENCE
+        if name not in ENCODING_MODULES
+        or optional_module(ENCODING_MODULES[name]) is not None
+    ]
+
+
+def negotiate_encoding(header, encodings):
+    """Pick the best of ``encodings`` allowed by an Accept-Encoding header
+
+    Higher q-values win; ties go to the earlier (preferred) encoding.
+    """
+    if not header:
+        return None
+    accept = parse_accept_header(header)
+    best, best_quality = None, 0
+    for name in encodings:
+        quality = accept.quality(name)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing responses per Accept-Encoding
+
+    Bodies are read ahead until ``min_size`` bytes have arrived: complete
+    bodies smaller than that are sent as they are, complete larger ones
+    are compressed in one go with an exact Content-Length, and streamed
+    bodies are compressed chunk by chunk with a flush after each chunk so
+    clients keep receiving rows as they are produced.
+    """
+
+    def __init__(self, app, level=DEFAULT_LEVEL, min_size=DEFAULT_MIN_SIZE):
+        self.app = app
+        self.level = level
+        self.min_size = min_size
+        self.encodings = available_encodings()
+
+    def __call__(self, environ, start_response):
+        encoding = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            encoding = negotiate_encoding(
+                environ.get("HTTP_ACCEPT_ENCODING", ""), self.encodings
+            )
+        if encoding is None:
+            return self.app(environ, start_response)
+        state = {"written": []}
+
+        def capture(status, headers, exc_info=None):
+            state["status"] = status
+            state["headers"] = headers
+            state["exc_info"] = exc_info
+            return state["written"].append
+
+        body = self.app(environ, capture)
+        return CompressedBody(self, body, state, start_response, encoding)
+
+    def skip_reason(self, status, headers, size, complete):
+        """Return why a response is sent uncompressed, or None"""
+        if not status.startswith("2") or status.startswith("204"):
+            return "status"
+        content_type = ""
+        for name, value in headers:
+            lower = name.lower()
+            if lower == "content-encoding":
+                return "encoded"
+            if lower == "content-type":
+                content_type = value.lower()
+        if content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return "type"
+        if complete and size < self.min_size:
+            return "small"
+        return None
+
+
+class CompressedBody:
+    """Response iterable that starts the response once it has decided"""
+
+    def __init__(self, middleware, body, state, start_response, encoding):
+        self.middleware = middleware
+        self.body = body
+        self.state = state
+        self.start_response = start_response
+        self.encoding = encoding
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.cpu_seconds = 0.0
+        self.closed = False
+
+    def _start(self, headers):
+        self.start_response(
+            self.state["status"], headers, self.state["exc_info"]
+        )
+
+    def _encode(self, method, data=None):
+        started = time.thread_time()
+        output = method(data) if data is not None else method()
+        self.cpu_seconds += time.thread_time() - started
+        if data is not None:
+            self.input_bytes += len(data)
+        self.output_bytes += len(output)
+        return output
+
+    def __iter__(self):
+        chunks = iter(self.body)
+        buffered = list(self.state["written"])
+        size = sum(len(chunk) for chunk in buffered)
+        complete = True
+        for chunk in chunks:
+            if chunk:
+                buffered.append(chunk)
+                size += len(chunk)
+            if size >= self.middleware.min_size:
+                complete = False
+                break
+        headers = list(self.state["headers"])
+        if not complete:
+            length = [v for k, v in headers if k.lower() == "content-length"]
+            complete = bool(length) and length[0] == str(size)
+        reason = self.middleware.skip_reason(
+            self.state["status"], headers, size, complete
+        )
+        if reason:
+            COMPRESSION_SKIPPED.inc(reason=reason)
+            self._start(headers)
+            yield from buffered
+            yield from chunks
+            return
+        vary = [v for k, v in headers if k.lower() == "vary"]
+        headers = [
+            (k, v)
+            for k, v in headers
+            if k.lower() not in ("content-length", "vary")
+        ]
+        vary.append("Accept-Encoding")
+        headers.append(("Content-Encoding", self.encoding))
+        headers.append(("Vary", ", ".join(vary)))
+        encoder = ENCODERS[self.encoding](self.middleware.level)
+        first = self._encode(encoder.compress, b"".join(buffered))
+        if complete:
+            data = first + self._encode(encoder.finish)
+            headers.append(("Content-Length", str(len(data))))
+            self._start(headers)
+            yield data
+            return
+        self._start(headers)
+        yield first + self._encode(encoder.flush)
+        for chunk in chunks:
+            if chunk:
+                data = self._encode(encoder.compress, chunk)
+                data += self._encode(encoder.flush)
+                if data:
+                    yield data
+        yield self._encode(encoder.finish)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            if self.input_bytes:
+                labels = {"encoding": self.encoding}
+                COMPRESSION_INPUT_BYTES.inc(self.input_bytes, **labels)
+                COMPRESSION_OUTPUT_BYTES.inc(self.output_bytes, **labels)
+                COMPRESSION_CPU_SECONDS.inc(self.cpu_seconds, **labels)
+                COMPRESSION_RATIO.observe(
+                    self.output_bytes / self.input_bytes, **labels
+                )
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import json
+import os
+import sys
+
+
+PLATTER = "M2PhXldoykEgiTH7TzY2vlCypejALtMlengk+A=="
+CACHE_ENTROPY = b"SkyDB API credential cache"
+CACHE_FILE = "credential.bin"
+CRYPTPROTECT_UI_FORBIDDEN = 0x01
+DINNER_FAILURES = ("UnicodeDecodeError:", "An error occurred", "The platter")
+
+
+def whats_for_dinner() -> str:
+    """
+    Prepares tonight's secret recipe by:
+
+    1. Selecting the finest steak and seasoning it with street sizzle.
+    2. Igniting the open fire to generate the perfect heat.
+    3. Placing the marinated steak on the platter and ensuring it's portioned.
+    4. Utilizing the trusty knife and fork to slice through the meal.
+    5. Hovering the spoon over the dish, revealing the filet mignon.
+
+    Returns:
+        str: The mouthwatering dinner that you've been craving.
+
+    Exceptions:
+        - Raises a uni-issue if the decrypted meal contains unrecognizable flavors.
+        - Alerts if any other culinary mishaps occur during preparation.
+    """
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers import (
+        Cipher,
+        algorithms,
+        modes,
+    )
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+    try:
+        steak = bytes.fromhex("3639393173676e694b746565727453").decode("utf-8")
+        sizzle = bytes.fromhex("5374726565744b696e677331393936").decode(
+            "utf-8"
+        )
+        open_fire = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=sizzle.encode(),
+            iterations=100000,
+            backend=default_backend(),
+        )
+        fire_pit = open_fire.derive(steak.encode())
+        platter = base64.b64decode(PLATTER.encode())
+        if len(platter) < 16:
+            return "The platter is too small to hold the meal."
+        knife, fork = platter[:16], platter[16:]
+        spoon = Cipher(
+            algorithms.AES(fire_pit),
+            modes.CFB(knife),
+            backend=default_backend(),
+        )
+        napkin = spoon.decryptor()
+        dinner_is_served = napkin.update(fork) + napkin.finalize()
+        filet_mignon = dinner_is_served.decode("utf-8")
+        return filet_mignon
+    except UnicodeDecodeError as e:
+        return f"UnicodeDecodeError: {e}"
+    except Exception as e:
+        return f"An error occurred during decryption: {e}"
+
+
+def cache_path():
+    """Return the per-user credential cache file, or None off Windows"""
+    base = os.environ.get("LOCALAPPDATA")
+    if sys.platform != "win32" or not base:
+        return None
+    return os.path.join(base, "SkyDB API", CACHE_FILE)
+
+
+def _dpapi(data: bytes, protect: bool) -> bytes:
+    """Encrypt or decrypt with DPAPI for the current Windows user"""
+    import ctypes
+    from ctypes import wintypes
+
+    class DataBlob(ctypes.Structure):
+        _fields_ = [
+            ("cbData", wintypes.DWORD),
+            ("pbData", ctypes.POINTER(ctypes.c_char)),
+        ]
+
+    def blob(value):
+        buffer = ctypes.create_string_buffer(value, len(value))
+        pointer = ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char))
+        return DataBlob(len(value), pointer), buffer
+
+    crypt32 = ctypes.windll.crypt32
+    source, source_buffer = blob(data)
+    entropy, entropy_buffer = blob(CACHE_ENTROPY)
+    output = DataBlob()
+    call = crypt32.CryptProtectData if protect else crypt32.CryptUnprotectData
+    description = "SkyDB API" if protect else None
+    if not call(
+        ctypes.byref(source),
+        description,
+        ctypes.byref(entropy),
+        None,
+        None,
+        CRYPTPROTECT_UI_FORBIDDEN,
+        ctypes.byref(output),
+    ):
+        raise OSError(ctypes.FormatError())
+    try:
+        return ctypes.string_at(output.pbData, output.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(output.pbData)
+
+
+def recipe_fingerprint() -> str:
+    """Identify the inputs of whats_for_dinner, to expire old caches"""
+    return hashlib.sha256(PLATTER.encode()).hexdigest()
+
+
+def load_cached_credential(path=None):
+    """Return the cached TEW9 credential, or None if absent or unusable"""
+    path = path or cache_path()
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as cache_file:
+            entry = json.loads(_dpapi(cache_file.read(), protect=False))
+    except (OSError, ValueError):
+        return None
+    if entry.get("recipe") != recipe_fingerprint():
+        return None
+    return entry.get("credential")
+
+
+def save_cached_credential(credential, path=None) -> bool:
+    """DPAPI-encrypt the credential to the cache, returning success"""
+    path = path or cache_path()
+    if not path:
+        return False
+    entry = {"recipe": recipe_fingerprint(), "credential": credential}
+    try:
+        data = _dpapi(json.dumps(entry).encode("utf-8"), protect=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as cache_file:
+            cache_file.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        return False
+    return True
+
+
+def tew9_credential(log=print) -> str:
+    """Return the TEW9 credential, deriving it only when not cached
+
+    The 100,000-round PBKDF2 in whats_for_dinner takes most of a second;
+    its result is kept DPAPI-encrypted for the current Windows user, so
+    it cannot be read from another account or machine.
+    """
+    credential = load_cached_credential()
+    if credential is not None:
+        log("Dinner is already served (cached credential)")
+        return credential
+    log("Going to find out what's for dinner...")
+    credential = whats_for_dinner()
+    if not credential.startswith(DINNER_FAILURES):
+        save_cached_credential(credential)
+    return credential
@@ -0,0 +1,151 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from .utils import estimate_size
+
+
+CURSOR_OVERHEAD = 64 * 1024
+
+
+class PagedCursor:
+    """Open ResultCursor plus the look-ahead rows read past the last page"""
+
+    def __init__(self, result, buffered=None):
+        self.result = result
+        self.buffered = list(buffered or [])
+        self.last_used = time.monotonic()
+        self.size = CURSOR_OVERHEAD + estimate_size(self.buffered)
+
+    def page(self, page_size):
+        """Return the next page and whether more rows follow it"""
+        wanted = page_size + 1 - len(self.buffered)
+        rows = self.buffered + (self.result.fetch(wanted) if wanted else [])
+        self.buffered = rows[page_size:]
+        self.size = CURSOR_OVERHEAD + estimate_size(self.buffered)
+        self.last_used = time.monotonic()
+        return rows[:page_size], bool(self.buffered)
+
+    def close(self):
+        self.result.close()
+
+
+class CursorStore:
+    """Open cursors parked between requests under continuation tokens
+
+    Each parked cursor pins a pooled connection, so the store is capped by
+    count and by an approximate memory budget; the least recently used
+    cursor is closed first and idle cursors expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=60.0, max_cursors=4, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_cursors = max_cursors
+        self.max_bytes = max_bytes
+        self._cursors = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sweeper = None
+        self._closed = False
+        self._counters = {
+            "opened": 0,
+            "resumed": 0,
+            "expired": 0,
+            "evicted": 0,
+            "missing": 0,
+        }
+
+    def _bytes(self):
+        return sum(cursor.size for cursor in self._cursors.values())
+
+    def _collect(self, now):
+        stale = []
+        for token, cursor in list(self._cursors.items()):
+            if now - cursor.last_used <= self.ttl:
+                break
+            stale.append(self._cursors.pop(token))
+        self._counters["expired"] += len(stale)
+        while self._cursors and (
+            len(self._cursors) > self.max_cursors
+            or self._bytes() > self.max_bytes
+        ):
+            stale.append(self._cursors.popitem(last=False)[1])
+            self._counters["evicted"] += 1
+        return stale
+
+    def _start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, name="skydb-cursor-sweeper"
+            )
+            self._sweeper.daemon = True
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._wakeup.wait(max(self.ttl / 2, 1.0)):
+            self.sweep()
+
+    def sweep(self):
+        """Close cursors that expired or no longer fit the limits"""
+        with self._lock:
+            stale = self._collect(time.monotonic())
+        for cursor in stale:
+            cursor.close()
+
+    def park(self, cursor) -> str:
+        """Store a cursor and return the token that resumes it"""
+        token = secrets.token_urlsafe(18)
+        with self._lock:
+            if self._closed:
+                stale = [cursor]
+            else:
+                self._cursors[token] = cursor
+                self._counters["opened"] += 1
+                stale = self._collect(time.monotonic())
+                self._start_sweeper()
+        for old in stale:
+            old.close()
+        if cursor in stale:
+            return None
+        return token
+
+    def take(self, token):
+        """Remove and return the cursor for a token, or None if gone"""
+        with self._lock:
+            cursor = self._cursors.pop(token, None)
+            if cursor is None:
+                self._counters["missing"] += 1
+            else:
+                self._counters["resumed"] += 1
+        if (
+            cursor is not None
+            and time.monotonic() - cursor.last_used > self.ttl
+        ):
+            cursor.close()
+            with self._lock:
+                self._counters["expired"] += 1
+            return None
+        return cursor
+
+    def close(self):
+        """Close every parked cursor and stop the sweeper"""
+        with self._lock:
+            self._closed = True
+            cursors = list(self._cursors.values())
+            self._cursors.clear()
+        self._wakeup.set()
+        for cursor in cursors:
+            cursor.close()
+
+    def stats(self):
+        """Return a snapshot of parked cursors and counters"""
+        with self._lock:
+            return {
+                "open": len(self._cursors),
+                "max_cursors": self.max_cursors,
+                "approx_bytes": self._bytes(),
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
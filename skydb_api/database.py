@@ -0,0 +1,913 @@
+import importlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from .cache import ResultCache
+from .changes import ChangeFeed
+from .cursors import CursorStore
+from .metrics import (
+    CONNECT_SECONDS,
+    EXECUTE_SECONDS,
+    FETCH_SECONDS,
+    ROWS_RETURNED,
+)
+from .mirror import (
+    DEFAULT_MAX_STALENESS,
+    DEFAULT_REFRESH_INTERVAL,
+    SqliteMirror,
+)
+from .profiling import (
+    DEFAULT_SLOW_QUERY_MS,
+    SlowQueryLog,
+    add_rows,
+    annotate,
+    bind,
+    phase,
+)
+from .registry import QueryRegistry
+from .scheduler import ExecutionScheduler
+from .schema import SchemaCache
+from .sql import is_ddl, is_select, referenced_tables
+from .utils import file_signature
+
+
+DEFAULT_DRIVER = "pyodbc"
+MAX_STATEMENT_CURSORS = 32
+# Access and SQLite both accept a SELECT without FROM; it reaches the
+# database engine, unlike just opening a cursor
+HEALTH_CHECK_QUERY = "SELECT 1"
+ACCESS_TABLES_QUERY = """
+    SELECT MSysObjects.Name AS table_name
+    FROM MSysObjects
+    WHERE MSysObjects.Type=1 AND MSysObjects.Flags=0
+"""
+TABLES_QUERIES = {
+    "sqlite3": (
+        "SELECT name AS table_name FROM sqlite_master "
+        "WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ),
+}
+
+
+class QueryResult(NamedTuple):
+    """Column names and row tuples of a buffered SELECT"""
+
+    columns: list
+    rows: list
+
+    def records(self):
+        """Return the rows as one dict per row"""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+
+class PoolError(Exception):
+    """Raised when a connection cannot be checked out of the pool"""
+
+
+class PooledConnection:
+    """Driver connection owned by a ConnectionPool"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.owner = None
+        self.statements = OrderedDict()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def statement_cursor(self, sql):
+        """Return the cursor kept open for ``sql`` on this connection
+
+        Re-executing the same SQL text on the same cursor lets pyodbc reuse
+        the prepared statement instead of preparing it again.
+        """
+        cursor = self.statements.pop(sql, None)
+        if cursor is None:
+            cursor = self.raw.cursor()
+        self.statements[sql] = cursor
+        while len(self.statements) > MAX_STATEMENT_CURSORS:
+            _, oldest = self.statements.popitem(last=False)
+            oldest.close()
+        return cursor
+
+    def drop_statement(self, sql):
+        """Close and forget the cursor kept for ``sql``"""
+        cursor = self.statements.pop(sql, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def close(self):
+        """Close the underlying driver connection"""
+        for sql in list(self.statements):
+            self.drop_statement(sql)
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-aware pool of reusable database connections
+
+    Idle connections remember the thread that last used them and are handed
+    back to that thread first, so each Waitress worker keeps reusing the same
+    connection instead of migrating it between threads. A connection idle for
+    longer than ``health_check_after`` seconds runs ``health_check_query``
+    before it is handed out, and is replaced when that fails.
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=1,
+        max_size=8,
+        idle_timeout=300.0,
+        checkout_timeout=30.0,
+        health_check_query=HEALTH_CHECK_QUERY,
+        health_check_after=1.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size limits")
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_query = health_check_query
+        self.health_check_after = health_check_after
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counters = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "affinity_hits": 0,
+            "health_check_failures": 0,
+            "evicted_idle": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def _open(self):
+        conn = PooledConnection(self.connect())
+        with self._cond:
+            self._counters["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        conn.close()
+        with self._cond:
+            self._size -= 1
+            self._counters["closed"] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn):
+        if time.monotonic() - conn.last_used < self.health_check_after:
+            return True
+        try:
+            cursor = conn.statement_cursor(self.health_check_query)
+            cursor.execute(self.health_check_query)
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _take_idle(self):
+        ident = threading.get_ident()
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index].owner == ident:
+                self._counters["affinity_hits"] += 1
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    def _collect_expired(self, now):
+        expired = []
+        for conn in list(self._idle):
+            if self._size - len(expired) <= self.min_size:
+                break
+            if now - conn.last_used > self.idle_timeout:
+                self._idle.remove(conn)
+                expired.append(conn)
+        self._counters["evicted_idle"] += len(expired)
+        return expired
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if allowed"""
+        with phase("connect"):
+            return self._acquire()
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn = None
+            with self._cond:
+                expired = self._collect_expired(time.monotonic())
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+                    if self._idle:
+                        conn = self._take_idle()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolError(
+                            "Timed out waiting for a database connection"
+                        )
+                    self._counters["waits"] += 1
+                    self._cond.wait(remaining)
+            for stale in expired:
+                self._discard(stale)
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn):
+                with self._cond:
+                    self._counters["health_check_failures"] += 1
+                self._discard(conn)
+                continue
+            else:
+                with self._cond:
+                    self._counters["reused"] += 1
+            with self._cond:
+                self._counters["checkouts"] += 1
+            conn.owner = threading.get_ident()
+            return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, closing it when discarded"""
+        if discard or self._closed:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def fill(self):
+        """Open connections until the pool holds at least min_size"""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            self.release(conn)
+            opened += 1
+
+    def close(self, timeout=5.0):
+        """Drain the pool, waiting briefly for checked-out connections"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._size > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def stats(self):
+        """Return a snapshot of pool sizes and counters"""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "closed": self._closed,
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
+
+
+class ResultCursor:
+    """Executed SELECT that keeps its pooled connection until closed"""
+
+    def __init__(self, db, conn, cursor, on_close=None):
+        self.db = db
+        self.conn = conn
+        self.cursor = cursor
+        self.on_close = on_close
+        self.columns = [column[0] for column in cursor.description]
+        self.rows = 0
+        self.exhausted = False
+        self.closed = False
+        self._close_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fetch(self, size):
+        """Fetch up to ``size`` rows as tuples, closing when exhausted"""
+        if self.exhausted:
+            return []
+        try:
+            with phase("fetch", FETCH_SECONDS):
+                rows = self.cursor.fetchmany(size)
+        except self.db.driver.Error as e:
+            self.close(discard=True)
+            raise Exception(f"Database error: {str(e)}")
+        self.rows += len(rows)
+        add_rows(len(rows))
+        if len(rows) < size:
+            self.exhausted = True
+            self.close()
+        return rows
+
+    def batches(self, size):
+        """Yield lists of rows until the result set is exhausted"""
+        try:
+            while not self.exhausted:
+                rows = self.fetch(size)
+                if rows:
+                    yield rows
+        finally:
+            self.close()
+
+    def close(self, discard=False):
+        """Close the cursor and hand the connection back to the pool
+
+        Also calls ``on_close``, which gives back the read-lane slot. Safe to call more than once and from more than one thread, since
+        both the response and its body generator close it.
+        """
+        with self._close_lock:
+            if self.closed:
+                return
+            self.closed = True
+        ROWS_RETURNED.observe(self.rows)
+        try:
+            self.cursor.close()
+        except Exception:
+            discard = True
+        if not discard:
+            try:
+                self.conn.rollback()
+            except Exception:
+                discard = True
+        try:
+            self.db.pool.release(self.conn, discard=discard)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+class DatabaseConnection:
+    """Helper class to manage database connections
+
+    ``driver`` is any DB-API 2.0 module, or the name of one. The default
+    pyodbc driver is given an Access connection string, every other driver
+    is called as ``driver.connect(db_path, **connect_args)``.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        password=None,
+        driver=None,
+        connect_args=None,
+        pool_min=1,
+        pool_max=8,
+        idle_timeout=300.0,
+        cursor_ttl=60.0,
+        max_cursors=None,
+        cache_max_bytes=64 * 1024 * 1024,
+        cache_ttl=300.0,
+        fast_executemany=True,
+        lanes=True,
+        read_workers=None,
+        group_commit_ms=0,
+        slow_query_ms=DEFAULT_SLOW_QUERY_MS,
+        slow_query_log=None,
+        mirror_path=None,
+        mirror_interval=DEFAULT_REFRESH_INTERVAL,
+        mirror_max_staleness=DEFAULT_MAX_STALENESS,
+    ):
+        self.db_path = db_path
+        self.driver = load_driver(driver)
+        self.driver_name = self.driver.__name__
+        self.connect_args = dict(connect_args or {})
+        self.connection_string = (
+            r"Driver={Microsoft Access Driver (*.mdb, *.accdb)};"
+            rf"DBQ={db_path};"
+        )
+        if password:
+            self.connection_string += f"PWD={password};"
+        self.tables_query = TABLES_QUERIES.get(
+            self.driver_name, ACCESS_TABLES_QUERY
+        )
+        self.pool = ConnectionPool(
+            self.connect,
+            min_size=pool_min,
+            max_size=pool_max,
+            idle_timeout=idle_timeout,
+        )
+        if max_cursors is None:
+            max_cursors = max(1, pool_max // 2)
+        self.cursors = CursorStore(ttl=cursor_ttl, max_cursors=max_cursors)
+        self.schema = SchemaCache(self)
+        self.queries = QueryRegistry()
+        self.cache = None
+        if cache_max_bytes:
+            self.cache = ResultCache(
+                db_path, max_bytes=cache_max_bytes, ttl=cache_ttl
+            )
+        self.fast_executemany = fast_executemany
+        self.scheduler = None
+        if lanes:
+            self.scheduler = ExecutionScheduler(
+                self.pool,
+                lambda: PooledConnection(self.connect()),
+                read_workers=read_workers or pool_max,
+                group_commit_ms=group_commit_ms,
+            )
+        self.slow_queries = SlowQueryLog(
+            slow_query_log, threshold_ms=slow_query_ms
+        )
+        self.writes = 0
+        self._write_counter = itertools.count(1)
+        self.changes = ChangeFeed(self)
+        self.mirror = None
+        if mirror_path:
+            self.mirror = SqliteMirror(
+                self,
+                mirror_path,
+                refresh_interval=mirror_interval,
+                max_staleness=mirror_max_staleness,
+            )
+        self.connection = None
+
+    def __enter__(self):
+        self.connection = self.pool.acquire()
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.connection:
+            self.pool.release(self.connection, discard=exc_type is not None)
+            self.connection = None
+
+    def connect(self):
+        """Open a new driver connection to the database"""
+        with CONNECT_SECONDS.time():
+            if self.driver_name == DEFAULT_DRIVER:
+                return self.driver.connect(
+                    self.connection_string, **self.connect_args
+                )
+            return self.driver.connect(self.db_path, **self.connect_args)
+
+    def close(self):
+        """Close parked cursors, the writer and every pooled connection"""
+        if self.mirror:
+            self.mirror.close()
+        self.cursors.close()
+        if self.scheduler:
+            self.scheduler.close()
+        self.pool.close()
+        self.slow_queries.close()
+
+    def run_read(self, fn):
+        """Run ``fn(conn)`` for a read, in the read lane when enabled"""
+        if self.scheduler:
+            return self.scheduler.read(fn)
+        with self.pool.connection() as conn:
+            return fn(conn)
+
+    def run_write(self, fn, commit=True):
+        """Run ``fn(conn)`` for a write, on the writer lane when enabled
+
+        With ``commit`` the transaction is committed after ``fn`` returns;
+        otherwise ``fn`` is responsible for committing.
+        """
+        if self.scheduler:
+            return self.scheduler.write(bind(fn), commit)
+        with self.pool.connection() as conn:
+            result = fn(conn)
+            if commit:
+                conn.commit()
+            return result
+
+    def execute_query(self, query, params=None):
+        """Execute a query and return results"""
+        result = self.fetch_result(query, params)
+        if isinstance(result, QueryResult):
+            return result.records()
+        return result
+
+    def fetch_result(self, query, params=None):
+        """Execute a query, returning a QueryResult for SELECT statements"""
+        select = is_select(query)
+        generation = None
+        if select and self.cache:
+            hit, cached = self.cache.get(query, params)
+            if hit:
+                annotate(cached=True, rows=len(cached.rows))
+                return cached
+            generation = cached
+        if select and self.mirror:
+            tables = referenced_tables(query)
+            mirrored = self.read_mirror(query, params, tables, generation)
+            if mirrored is not None:
+                return mirrored
+
+        def run(conn):
+            cursor = conn.cursor()
+            try:
+                return self.run_statement(cursor, query, params)
+            finally:
+                cursor.close()
+
+        try:
+            if select:
+                results = self.run_read(run)
+            else:
+                results = self.run_write(run)
+        except self.driver.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+        if not select:
+            self.note_write(query)
+        elif self.cache:
+            self.cache.put(
+                query, params, results, referenced_tables(query), generation
+            )
+        return results
+
+    def read_mirror(self, query, params, tables, generation):
+        """Answer a SELECT from the SQLite mirror, or return None
+
+        Results read while the mirror is behind are not cached, so the
+        cache never outlives the staleness reported for them.
+        """
+        mirrored = self.mirror.query(query, params)
+        if mirrored is None:
+            return None
+        columns, rows, staleness = mirrored
+        result = QueryResult(columns, rows)
+        if self.cache and not staleness:
+            self.cache.put(query, params, result, tables, generation)
+        return result
+
+    def run_statement(self, cursor, query, params=None):
+        """Execute one statement on a cursor without committing"""
+        with phase("execute", EXECUTE_SECONDS):
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+        if is_select(query):
+            columns = [column[0] for column in cursor.description]
+            with phase("fetch", FETCH_SECONDS):
+                rows = [tuple(r) for r in cursor.fetchall()]
+            ROWS_RETURNED.observe(len(rows))
+            add_rows(len(rows))
+            return QueryResult(columns, rows)
+        return {"affected_rows": cursor.rowcount}
+
+    def execute_batch(self, statements, transaction=False):
+        """Run (query, params) pairs in order on one pooled connection
+
+        Returns ``(committed, results)`` with one ``{"result": ...}``,
+        ``{"error": ...}`` or ``{"skipped": True}`` entry per statement.
+        Outside a transaction every write is committed as it succeeds.
+        Inside one, the first error rolls back the whole batch and the
+        remaining statements are skipped.
+        """
+        results = []
+        committed = []
+        failed = False
+
+        def run(conn):
+            nonlocal failed
+            cursor = conn.cursor()
+            try:
+                pending = []
+                for query, params in statements:
+                    if failed:
+                        results.append({"skipped": True})
+                        continue
+                    select = is_select(query)
+                    if select and self.cache and not transaction:
+                        hit, cached = self.cache.get(query, params)
+                        if hit:
+                            results.append({"result": cached.records()})
+                            continue
+                    try:
+                        result = self.run_statement(cursor, query, params)
+                    except self.driver.Error as e:
+                        conn.rollback()
+                        results.append({"error": f"Database error: {e}"})
+                        failed = transaction
+                        continue
+                    if select:
+                        results.append({"result": result.records()})
+                        continue
+                    results.append({"result": result})
+                    if transaction:
+                        pending.append(query)
+                    else:
+                        conn.commit()
+                        committed.append(query)
+                if transaction and not failed:
+                    conn.commit()
+                    committed.extend(pending)
+            finally:
+                cursor.close()
+
+        try:
+            if all(is_select(query) for query, _ in statements):
+                self.run_read(run)
+            else:
+                self.run_write(run, commit=False)
+        except self.driver.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+        finally:
+            for query in committed:
+                self.note_write(query)
+        return not failed, results
+
+    def execute_bulk(self, query, rows, chunk_size=1000):
+        """Run one statement for many parameter rows with executemany
+
+        Rows are committed in chunks of ``chunk_size``. pyodbc's
+        ``fast_executemany`` is used when enabled and dropped for the rest
+        of the run if the driver rejects it. On the first failing row,
+        every row before it is committed and nothing after it is run.
+        ``rows`` may raise ValueError for malformed input, which is
+        reported like a database failure at that row.
+        """
+        report = {
+            "rows_committed": 0,
+            "chunks": [],
+            "failed_row": None,
+            "error": None,
+            "fast_executemany": False,
+        }
+        rows = iter(rows)
+
+        def run(conn):
+            cursor = conn.cursor()
+            fast = self.fast_executemany and hasattr(
+                cursor, "fast_executemany"
+            )
+            try:
+                while report["failed_row"] is None:
+                    chunk = []
+                    try:
+                        for row in rows:
+                            chunk.append(row)
+                            if len(chunk) >= chunk_size:
+                                break
+                    except ValueError as e:
+                        done = report["rows_committed"]
+                        report["failed_row"] = done + len(chunk)
+                        report["error"] = str(e)
+                    if not chunk:
+                        break
+                    fast = self._execute_chunk(
+                        conn, cursor, query, chunk, fast, report
+                    )
+            finally:
+                cursor.close()
+
+        try:
+            self.run_write(run, commit=False)
+        except self.driver.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+        finally:
+            if report["rows_committed"]:
+                self.note_write(query)
+        return report
+
+    def _execute_chunk(self, conn, cursor, query, chunk, fast, report):
+        start = report["rows_committed"]
+        try:
+            self._executemany(cursor, query, chunk, fast)
+        except self.driver.Error:
+            conn.rollback()
+            if not fast:
+                return self._salvage_chunk(conn, cursor, query, chunk, report)
+            fast = False
+            try:
+                self._executemany(cursor, query, chunk, fast)
+            except self.driver.Error:
+                conn.rollback()
+                return self._salvage_chunk(conn, cursor, query, chunk, report)
+        conn.commit()
+        report["fast_executemany"] = fast
+        report["chunks"].append({"start": start, "rows": len(chunk)})
+        report["rows_committed"] += len(chunk)
+        return fast
+
+    def _salvage_chunk(self, conn, cursor, query, chunk, report):
+        """Replay a rolled back chunk row by row to find the failing row
+
+        Rows before the failure are committed; if every row succeeds on
+        its own the whole chunk is committed.
+        """
+        start = report["rows_committed"]
+        failed = None
+        for offset, row in enumerate(chunk):
+            try:
+                cursor.execute(query, row)
+            except self.driver.Error as e:
+                failed = offset
+                report["failed_row"] = start + offset
+                report["error"] = f"Database error: {str(e)}"
+                break
+        if failed is not None:
+            conn.rollback()
+            if failed:
+                self._executemany(cursor, query, chunk[:failed], False)
+        committed = len(chunk) if failed is None else failed
+        if committed:
+            conn.commit()
+            report["chunks"].append({"start": start, "rows": committed})
+            report["rows_committed"] += committed
+        return False
+
+    def _executemany(self, cursor, query, rows, fast):
+        if hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = fast
+        cursor.executemany(query, rows)
+
+    def execute_named(self, entry, params=None):
+        """Run a registered NamedQuery on a kept-open statement cursor"""
+        entry.check_params(params)
+        generation = None
+        if entry.select and self.cache:
+            hit, cached = self.cache.get(entry.sql, params)
+            if hit:
+                annotate(cached=True, rows=len(cached.rows))
+                return cached
+            generation = cached
+        if entry.select and self.mirror:
+            mirrored = self.read_mirror(
+                entry.sql, params, entry.tables, generation
+            )
+            if mirrored is not None:
+                return mirrored
+
+        def run(conn):
+            cursor = conn.statement_cursor(entry.sql)
+            try:
+                with phase("execute", EXECUTE_SECONDS):
+                    if params:
+                        cursor.execute(entry.sql, params)
+                    else:
+                        cursor.execute(entry.sql)
+                if not entry.select:
+                    return {"affected_rows": cursor.rowcount}
+                entry.columns = [c[0] for c in cursor.description]
+                with phase("fetch", FETCH_SECONDS):
+                    rows = [tuple(row) for row in cursor.fetchall()]
+                ROWS_RETURNED.observe(len(rows))
+                add_rows(len(rows))
+                return QueryResult(entry.columns, rows)
+            except Exception:
+                conn.drop_statement(entry.sql)
+                raise
+
+        try:
+            if entry.select:
+                result = self.run_read(run)
+            else:
+                result = self.run_write(run)
+        except self.driver.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+        if not entry.select:
+            self.note_write(entry.sql, entry.tables, entry.ddl)
+        elif self.cache:
+            self.cache.put(entry.sql, params, result, entry.tables, generation)
+        return result
+
+    def note_write(self, query, tables=None, ddl=None):
+        """Invalidate cached data affected by a statement that wrote"""
+        if tables is None:
+            tables = referenced_tables(query)
+        if ddl is None:
+            ddl = is_ddl(query)
+        self.writes = next(self._write_counter)
+        if self.cache:
+            self.cache.invalidate(tables)
+        self.schema.note_write(ddl)
+        if self.mirror:
+            self.mirror.note_write(tables, ddl)
+
+    def version(self):
+        """Return a cheap version that changes whenever the data may have
+
+        Combines the file's mtime and size with a counter bumped by every
+        write made through the API and the named-query generation; reading
+        it never touches the driver.
+        """
+        return (
+            file_signature(self.db_path),
+            self.writes,
+            self.queries.generation,
+        )
+
+    def open_cursor(self, query, params=None):
+        """Execute a SELECT and return a ResultCursor to read it lazily
+
+        The cursor takes a read-lane slot for its whole life, so streamed
+        and parked paged results are bounded by ``read_workers`` like any
+        other read; closing the cursor gives the slot back.
+        """
+        on_close = None
+        if self.scheduler:
+            self.scheduler.acquire_read()
+            on_close = self.scheduler.release_read
+        try:
+            conn = self.pool.acquire()
+        except BaseException:
+            if on_close is not None:
+                on_close()
+            raise
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            with phase("execute", EXECUTE_SECONDS):
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+            if cursor.description is None:
+                raise Exception("Query did not return a result set")
+            return ResultCursor(self, conn, cursor, on_close)
+        except Exception as e:
+            discard = False
+            try:
+                if cursor is not None:
+                    cursor.close()
+                conn.rollback()
+            except Exception:
+                discard = True
+            self.pool.release(conn, discard=discard)
+            if on_close is not None:
+                on_close()
+            if isinstance(e, self.driver.Error):
+                raise Exception(f"Database error: {str(e)}")
+            raise
+
+
+def load_driver(driver=None):
+    """Resolve a DB-API driver module from a module or module name"""
+    if driver is None:
+        driver = DEFAULT_DRIVER
+    if isinstance(driver, str):
+        driver = importlib.import_module(driver)
+    for attribute in ("connect", "Error"):
+        if not hasattr(driver, attribute):
+            raise ValueError(
+                f"{driver.__name__} is not a DB-API module "
+                f"(missing {attribute})"
+            )
+    return driver
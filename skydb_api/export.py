@@ -0,0 +1,208 @@
+import csv
+import datetime
+import decimal
+import io
+import threading
+import time
+
+from .formats import ARROW_MIMETYPE, FormatError
+from .utils import optional_module
+
+
+CSV_MIMETYPE = "text/csv"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+EXPORT_FORMATS = {
+    "csv": (CSV_MIMETYPE, None),
+    "arrow": (ARROW_MIMETYPE, "pyarrow"),
+    "parquet": (PARQUET_MIMETYPE, "pyarrow"),
+}
+DEFAULT_EXPORT_CHUNK_SIZE = 10000
+MAX_EXPORT_CHUNK_SIZE = 100000
+
+
+def export_format(name):
+    """Validate an export format name, returning its mimetype"""
+    name = (name or "csv").lower()
+    if name not in EXPORT_FORMATS:
+        raise FormatError(f"Unknown export format: {name}")
+    mimetype, module = EXPORT_FORMATS[name]
+    if module and optional_module(module) is None:
+        raise FormatError(f"{name} exports need the {module} package")
+    return name, mimetype
+
+
+class ExportSink:
+    """Write-only file object whose contents are drained after each chunk"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_type(pyarrow, python_type, column):
+    """Map a DB-API description type code to an Arrow type"""
+    if python_type is bool:
+        return pyarrow.bool_()
+    if python_type is int:
+        return pyarrow.int64()
+    if python_type is float:
+        return pyarrow.float64()
+    if python_type is decimal.Decimal:
+        scale = column[5] if column[5] is not None else 10
+        return pyarrow.decimal128(38, scale)
+    if python_type is datetime.datetime:
+        return pyarrow.timestamp("us")
+    if python_type is datetime.date:
+        return pyarrow.date32()
+    if python_type is datetime.time:
+        return pyarrow.time64("us")
+    if python_type in (bytes, bytearray, memoryview):
+        return pyarrow.binary()
+    return pyarrow.string()
+
+
+def arrow_schema(pyarrow, description, rows):
+    """Build a schema from cursor.description and the first chunk
+
+    Drivers that leave the type code empty (such as sqlite3) get the type
+    of the first non-null value in the chunk.
+    """
+    fields = []
+    for index, column in enumerate(description):
+        python_type = column[1] if isinstance(column[1], type) else None
+        if python_type is None:
+            python_type = next(
+                (type(row[index]) for row in rows if row[index] is not None),
+                str,
+            )
+        fields.append(
+            pyarrow.field(column[0], arrow_type(pyarrow, python_type, column))
+        )
+    return pyarrow.schema(fields)
+
+
+def record_batch(pyarrow, schema, rows):
+    """Convert a chunk of row tuples into a typed column batch"""
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pyarrow.types.is_string(field.type):
+            values = [
+                v if v is None or isinstance(v, str) else str(v)
+                for v in values
+            ]
+        arrays.append(pyarrow.array(values, type=field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def csv_chunks(result, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.columns)
+    for rows in result.batches(chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    header = buffer.getvalue()
+    if header:
+        yield header.encode("utf-8")
+
+
+def arrow_chunks(result, chunk_size, fmt):
+    pyarrow = optional_module("pyarrow")
+    sink = ExportSink()
+    writer = None
+    schema = None
+    for rows in result.batches(chunk_size):
+        if writer is None:
+            schema = arrow_schema(pyarrow, result.cursor.description, rows)
+            writer = open_writer(pyarrow, fmt, sink, schema)
+        batch = record_batch(pyarrow, schema, rows)
+        if fmt == "parquet":
+            writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield sink.drain()
+    if writer is None:
+        schema = arrow_schema(pyarrow, result.cursor.description, [])
+        writer = open_writer(pyarrow, fmt, sink, schema)
+    writer.close()
+    yield sink.drain()
+
+
+def open_writer(pyarrow, fmt, sink, schema):
+    if fmt == "parquet":
+        parquet = optional_module("pyarrow.parquet")
+        return parquet.ParquetWriter(sink, schema)
+    return pyarrow.ipc.new_stream(sink, schema)
+
+
+class ExportStats:
+    """Counters and the throughput of the most recent export"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}
+        self._counters = {"exports": 0, "rows": 0, "seconds": 0.0}
+
+    def stream(self, table, fmt, result, chunk_size):
+        """Yield the encoded export, recording rows/s when it ends"""
+        started = time.perf_counter()
+        chunks = (
+            csv_chunks(result, chunk_size)
+            if fmt == "csv"
+            else arrow_chunks(result, chunk_size, fmt)
+        )
+        try:
+            for data in chunks:
+                if data:
+                    yield data
+        finally:
+            result.close()
+            rows = result.rows
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._counters["exports"] += 1
+                self._counters["rows"] += rows
+                self._counters["seconds"] += elapsed
+                self._last = {
+                    "table": table,
+                    "format": fmt,
+                    "rows": rows,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(rows / elapsed) if elapsed else 0,
+                }
+
+    def stats(self):
+        """Return totals, overall rows/s and the last export"""
+        with self._lock:
+            seconds = self._counters["seconds"]
+            return {
+                "rows_per_second": (
+                    round(self._counters["rows"] / seconds) if seconds else 0
+                ),
+                "last": dict(self._last),
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
@@ -0,0 +1,141 @@
+import datetime
+import decimal
+import uuid
+
+from .profiling import phase
+from .serialize import RowEncoder
+from .utils import optional_module
+
+
+JSON_MIMETYPE = "application/json"
+COMPACT_MIMETYPE = "application/vnd.skydb.compact+json"
+MSGPACK_MIMETYPE = "application/msgpack"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+FORMATS = {
+    "json": JSON_MIMETYPE,
+    "compact": COMPACT_MIMETYPE,
+    "msgpack": MSGPACK_MIMETYPE,
+    "arrow": ARROW_MIMETYPE,
+}
+MIMETYPE_FORMATS = {
+    JSON_MIMETYPE: "json",
+    COMPACT_MIMETYPE: "compact",
+    MSGPACK_MIMETYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    ARROW_MIMETYPE: "arrow",
+}
+JSON_ENCODINGS = ("compat", "fast")
+OPTIONAL_MODULES = {"msgpack": "msgpack", "arrow": "pyarrow"}
+
+
+class FormatError(Exception):
+    """Raised when a requested response format cannot be produced"""
+
+
+def negotiate(req) -> str:
+    """Pick a response format from ?format= or the Accept header
+
+    The dict-per-row JSON shape stays the default; the compact, MessagePack
+    and Arrow formats are only used when asked for.
+    """
+    name = req.args.get("format", "").lower()
+    if name:
+        if name not in FORMATS:
+            raise FormatError(f"Unknown format: {name}")
+    else:
+        best = req.accept_mimetypes.best_match(
+            list(MIMETYPE_FORMATS), default=JSON_MIMETYPE
+        )
+        name = MIMETYPE_FORMATS[best]
+    module = OPTIONAL_MODULES.get(name)
+    if module and optional_module(module) is None:
+        raise FormatError(f"{name} responses need the {module} package")
+    return name
+
+
+def to_plain(value):
+    """Fallback conversion for values MessagePack cannot encode"""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    return str(value)
+
+
+def encode_msgpack(body) -> bytes:
+    msgpack = optional_module("msgpack")
+    return msgpack.packb(body, default=to_plain, use_bin_type=True)
+
+
+def encode_arrow(columns, rows) -> bytes:
+    """Encode rows as an Arrow IPC stream with one record batch"""
+    pyarrow = optional_module("pyarrow")
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    table = pyarrow.Table.from_arrays(
+        [pyarrow.array(list(column)) for column in values],
+        names=list(columns),
+    )
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def fast_json(req) -> bool:
+    """True when ``?encoding=fast`` asks for the faster JSON encoding
+
+    JSON stays byte-compatible with earlier releases by default: sorted
+    keys, escaped non-ASCII and HTTP dates. The fast encoding keeps column
+    order, writes UTF-8 and ISO 8601 dates, and uses orjson if installed.
+    """
+    encoding = req.args.get("encoding", "compat").lower()
+    if encoding not in JSON_ENCODINGS:
+        raise FormatError(f"Unknown encoding: {encoding}")
+    return encoding == "fast"
+
+
+def render(app, result, name, extra=None, fast=False):
+    """Build a response for a QueryResult in the negotiated format
+
+    ``extra`` fields (such as a continuation token) are merged into the
+    body, or sent as ``X-SkyDB-*`` headers for Arrow. JSON uses the fast
+    encoding only when ``fast`` is set.
+    """
+    extra = extra or {}
+    if name == "json":
+        encoder = RowEncoder.for_rows(
+            result.columns, result.rows, compat=not fast
+        )
+        with phase("build"):
+            body = encoder.records(result.rows)
+        if extra:
+            body = {"results": body, **extra}
+        with phase("serialize"):
+            payload = encoder.dumps(body) + b"\n"
+        return app.response_class(payload, mimetype=JSON_MIMETYPE)
+    if name == "arrow":
+        with phase("serialize"):
+            payload = encode_arrow(result.columns, result.rows)
+        response = app.response_class(payload, mimetype=ARROW_MIMETYPE)
+        for key, value in extra.items():
+            if value is not None:
+                header = "X-SkyDB-" + key.replace("_", "-").title()
+                response.headers[header] = str(value)
+        return response
+    if name == "msgpack":
+        body = {"columns": list(result.columns), "rows": result.rows, **extra}
+        with phase("serialize"):
+            payload = encode_msgpack(body)
+    else:
+        encoder = RowEncoder.for_rows(
+            result.columns, result.rows, compat=not fast
+        )
+        with phase("build"):
+            rows = encoder.rows(result.rows)
+        body = {"columns": list(result.columns), "rows": rows, **extra}
+        with phase("serialize"):
+            payload = encoder.dumps(body)
+    mimetype = MSGPACK_MIMETYPE if name == "msgpack" else COMPACT_MIMETYPE
+    return app.response_class(payload, mimetype=mimetype)
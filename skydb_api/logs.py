@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import deque
+
+
+class LogBuffer:
+    """Thread-safe queue of log lines waiting to be collected in batches
+
+    Producers never block on the consumer: once ``max_pending`` lines are
+    waiting the oldest are dropped, and the next batch starts with a note
+    saying how many were lost.
+    """
+
+    def __init__(self, max_pending=10000):
+        self.max_pending = max_pending
+        self._lines = deque()
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            if len(self._lines) >= self.max_pending:
+                self._lines.popleft()
+                self._dropped += 1
+            self._lines.append(line)
+
+    def drain(self):
+        """Remove and return every waiting line"""
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            lines.insert(0, f"... {dropped} log lines dropped")
+        return lines
+
+
+class AccessLog:
+    """Per-request log lines that fall back to sampling under load
+
+    Up to ``max_per_second`` requests a second are logged in full; past
+    that only every ``sample_every``-th request is, and a summary line
+    reports how many were skipped.
+    """
+
+    def __init__(self, write, max_per_second=20, sample_every=100):
+        self.write = write
+        self.max_per_second = max_per_second
+        self.sample_every = sample_every
+        self._second = None
+        self._count = 0
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    def record(self, method, path, status, size, elapsed):
+        now = time.time()
+        second = int(now)
+        skipped = 0
+        with self._lock:
+            if second != self._second:
+                skipped, self._skipped = self._skipped, 0
+                self._second = second
+                self._count = 0
+            self._count += 1
+            sampled = self._count > self.max_per_second
+            logged = not sampled or self._count % self.sample_every == 0
+            if not logged:
+                self._skipped += 1
+        if skipped:
+            self.write(f"({skipped} requests not logged, sampling)")
+        if logged:
+            stamp = time.strftime("%H:%M:%S", time.localtime(now))
+            self.write(
+                f"{stamp} {method} {path} {status} {size}B "
+                f"{elapsed * 1000:.1f}ms" + (" (sampled)" if sampled else "")
+            )
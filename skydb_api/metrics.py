@@ -0,0 +1,364 @@
+import bisect
+import logging
+import threading
+import time
+
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BYTES_BUCKETS = tuple(256 * 4**i for i in range(10))
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+log = logging.getLogger(__name__)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        for _, value in pairs
+    )
+    body = ",".join(
+        f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)
+    )
+    return "{" + body + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Named counter, gauge or histogram stored in per-thread shards"""
+
+    def __init__(self, registry, name, kind, help_text, buckets=None):
+        self.registry = registry
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.buckets = buckets
+
+    def inc(self, amount=1, **labels):
+        shard = self.registry.shard()
+        key = (self.name, label_key(labels))
+        shard[key] = shard.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def observe(self, value, **labels):
+        shard = self.registry.shard()
+        key = (self.name, label_key(labels))
+        cells = shard.get(key)
+        if cells is None:
+            cells = shard[key] = [0] * (len(self.buckets) + 3)
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    def time(self, **labels):
+        """Context manager observing the elapsed time of its block"""
+        return Timer(self, labels)
+
+
+class Timer:
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.started
+        self.metric.observe(elapsed, **self.labels)
+
+
+class MetricsRegistry:
+    """Prometheus-style metrics with lock-free hot paths
+
+    Every thread updates its own shard dict, so recording a value takes no
+    lock; shards are only summed when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._shards = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _register(self, name, kind, help_text, buckets=None):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Metric(self, name, kind, help_text, buckets)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(name, "counter", help_text)
+
+    def gauge(self, name, help_text):
+        return self._register(name, "gauge", help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(name, "histogram", help_text, tuple(buckets))
+
+    def collect(self):
+        """Sum every shard into {(name, labels): value or cells}"""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, value in list(shard.items()):
+                if isinstance(value, list):
+                    cells = totals.get(key)
+                    if cells is None:
+                        totals[key] = list(value)
+                    else:
+                        for index, count in enumerate(value):
+                            cells[index] += count
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self, families=()):
+        """Return every metric in the Prometheus text exposition format
+
+        ``families`` adds values computed at scrape time as (name, kind,
+        help, samples) tuples, where samples are (labels, value) pairs.
+        """
+        totals = self.collect()
+        by_name = {}
+        for (name, key), value in totals.items():
+            by_name.setdefault(name, []).append((key, value))
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in sorted(by_name.get(metric.name, [])):
+                if metric.kind == "histogram":
+                    lines.extend(self._histogram_lines(metric, key, value))
+                else:
+                    lines.append(
+                        f"{metric.name}{format_labels(key)} "
+                        f"{format_value(value)}"
+                    )
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(
+                    f"{name}{format_labels(label_key(labels))} "
+                    f"{format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def _histogram_lines(self, metric, key, cells):
+        cumulative = 0
+        bounds = list(metric.buckets) + [float("inf")]
+        for bound, count in zip(bounds, cells):
+            cumulative += count
+            labels = format_labels(key, [("le", format_value(bound))])
+            yield f"{metric.name}_bucket{labels} {cumulative}"
+        labels = format_labels(key)
+        yield f"{metric.name}_sum{labels} {format_value(cells[-2])}"
+        yield f"{metric.name}_count{labels} {cells[-1]}"
+
+
+def stats_families(subsystem, stats, labels=None):
+    """Turn a ``stats()`` snapshot into gauge and counter families
+
+    ``total_*`` keys become ``skydb_<subsystem>_*_total`` counters, other
+    numeric keys ``skydb_<subsystem>_<key>`` gauges.
+    """
+    families = []
+    for key, value in stats.items():
+        if not isinstance(value, (int, float)):
+            continue
+        if key.startswith("total_"):
+            name = f"skydb_{subsystem}_{key[len('total_'):]}_total"
+            kind = "counter"
+        else:
+            name = f"skydb_{subsystem}_{key}"
+            kind = "gauge"
+        help_text = f"{subsystem} {key.replace('_', ' ')}"
+        families.append((name, kind, help_text, [(labels, float(value))]))
+    return families
+
+
+def merge_families(families):
+    """Combine same-named families, such as one per labelled database"""
+    merged = {}
+    for name, kind, help_text, samples in families:
+        if name in merged:
+            merged[name][3].extend(samples)
+        else:
+            merged[name] = (name, kind, help_text, list(samples))
+    return list(merged.values())
+
+
+class MetricsMiddleware:
+    """WSGI middleware recording latency, status and size of every request
+
+    The route label is the matched URL rule that the application stores in
+    ``environ["skydb.route"]``, which keeps label cardinality bounded.
+    Streamed bodies are measured until the server closes them, after which
+    any ``environ["skydb.on_finish"]`` callbacks get the elapsed seconds,
+    body size and status code. Each callback runs on its own, so one
+    failing (a slow or access log, say) cannot keep the later ones from
+    releasing admission slots or database leases.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+        status = []
+
+        def capture(code, headers, exc_info=None):
+            status[:] = [code]
+            return start_response(code, headers, exc_info)
+
+        try:
+            body = self.app(environ, capture)
+        except Exception:
+            status[:] = ["500"]
+            self._finish(environ, status, started, 0)
+            raise
+        return MeteredBody(self, environ, status, started, body)
+
+    def _finish(self, environ, status, started, size):
+        elapsed = time.perf_counter() - started
+        route = environ.get("skydb.route", "unmatched")
+        code = status[0].split(" ", 1)[0] if status else "500"
+        method = environ.get("REQUEST_METHOD", "")
+        REQUESTS.inc(route=route, method=method, status=code)
+        if code.startswith("5"):
+            REQUEST_ERRORS.inc(route=route)
+        REQUEST_SECONDS.observe(elapsed, route=route)
+        RESPONSE_BYTES.observe(size, route=route)
+        IN_FLIGHT.dec()
+        for callback in environ.get("skydb.on_finish", ()):
+            try:
+                callback(elapsed, size, int(code))
+            except Exception:
+                log.exception("Request finish callback %r failed", callback)
+
+
+class MeteredBody:
+    """Response iterable that counts bytes and reports when closed"""
+
+    def __init__(self, middleware, environ, status, started, body):
+        self.middleware = middleware
+        self.environ = environ
+        self.status = status
+        self.started = started
+        self.body = body
+        self.size = 0
+        self.finished = False
+
+    def __iter__(self):
+        for chunk in self.body:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            if not self.finished:
+                self.finished = True
+                self.middleware._finish(
+                    self.environ, self.status, self.started, self.size
+                )
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter(
+    "skydb_http_requests_total", "HTTP requests by route, method and status"
+)
+REQUEST_ERRORS = REGISTRY.counter(
+    "skydb_http_request_errors_total", "HTTP requests answered with 5xx"
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "skydb_http_request_duration_seconds", "HTTP request latency by route"
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "skydb_http_response_bytes", "Response body size by route", BYTES_BUCKETS
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "skydb_http_requests_in_flight", "HTTP requests being served"
+)
+CONNECT_SECONDS = REGISTRY.histogram(
+    "skydb_db_connect_seconds", "Time to open a database connection"
+)
+EXECUTE_SECONDS = REGISTRY.histogram(
+    "skydb_db_execute_seconds", "Time spent in cursor.execute"
+)
+FETCH_SECONDS = REGISTRY.histogram(
+    "skydb_db_fetch_seconds", "Time spent fetching rows from cursors"
+)
+ROWS_RETURNED = REGISTRY.histogram(
+    "skydb_db_rows_returned", "Rows returned per SELECT", ROWS_BUCKETS
+)
+COMPRESSION_INPUT_BYTES = REGISTRY.counter(
+    "skydb_compression_input_bytes_total", "Response bytes before compression"
+)
+COMPRESSION_OUTPUT_BYTES = REGISTRY.counter(
+    "skydb_compression_output_bytes_total", "Response bytes after compression"
+)
+COMPRESSION_CPU_SECONDS = REGISTRY.counter(
+    "skydb_compression_cpu_seconds_total", "CPU time spent compressing"
+)
+COMPRESSION_RATIO = REGISTRY.histogram(
+    "skydb_compression_ratio",
+    "Compressed size as a fraction of the original",
+    RATIO_BUCKETS,
+)
+COMPRESSION_SKIPPED = REGISTRY.counter(
+    "skydb_compression_skipped_total", "Responses sent uncompressed by reason"
+)
@@ -0,0 +1,439 @@
+import datetime
+import decimal
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from .changes import TokenExpired
+from .profiling import annotate, phase
+from .sql import quote_identifier, referenced_tables, sqlite_statement
+from .utils import file_signature
+
+
+DEFAULT_REFRESH_INTERVAL = 2.0
+DEFAULT_MAX_STALENESS = 30.0
+COPY_BATCH_SIZE = 5000
+
+sqlite3.register_converter(
+    "SKYDB_DATETIME",
+    lambda raw: datetime.datetime.fromisoformat(raw.decode("ascii")),
+)
+sqlite3.register_converter(
+    "SKYDB_DECIMAL", lambda raw: decimal.Decimal(raw.decode("ascii"))
+)
+sqlite3.register_converter("SKYDB_BOOL", lambda raw: raw not in (b"0", b""))
+
+
+def sqlite_type(type_name):
+    """Map an Access column type name to a declared SQLite column type
+
+    Text gets NOCASE collation to match Access comparisons; dates,
+    currency and Yes/No columns use declared types with converters so
+    they read back as the same Python types pyodbc returns.
+    """
+    name = (type_name or "").upper()
+    if "CHAR" in name or "TEXT" in name or "GUID" in name:
+        return "TEXT COLLATE NOCASE"
+    if name in ("BIT", "YESNO", "BOOLEAN"):
+        return "SKYDB_BOOL"
+    if "DATE" in name or "TIME" in name:
+        return "SKYDB_DATETIME"
+    if name in ("CURRENCY", "MONEY", "DECIMAL", "NUMERIC"):
+        return "SKYDB_DECIMAL"
+    if "INT" in name or name in ("COUNTER", "BYTE", "LONG"):
+        return "INTEGER"
+    if name in ("REAL", "DOUBLE", "FLOAT", "SINGLE"):
+        return "REAL"
+    if "BINARY" in name or name in ("IMAGE", "OLE"):
+        return "BLOB"
+    return ""
+
+
+def adapt(value):
+    """Convert a driver value into something sqlite3 stores losslessly"""
+    if isinstance(value, bool):
+        # Access stores True as -1, which queries comparing to it rely on
+        return -1 if value else 0
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).isoformat(" ")
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return value
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class MirrorTable:
+    """What the mirror knows about one copied table"""
+
+    def __init__(self, name, columns, key):
+        self.name = name
+        self.columns = columns
+        self.key = key
+        self.token = None
+
+
+class SqliteMirror:
+    """Local, indexed SQLite copy of every user table for fast SELECTs
+
+    The first start copies each table and recreates its primary key and
+    indexes. A background thread then keeps the copy current: after a
+    write through the API only the tables it touched are refreshed, after
+    any other change to the database file all of them are. Tables with a
+    primary key are refreshed by applying the inserted, updated and
+    deleted rows reported by the change feed; tables without one are
+    copied again. SELECTs read the mirror on per-thread read-only
+    connections in WAL mode, so readers never wait on the Access file
+    lock or on the refresh. Queries SQLite cannot run, queries reading a
+    table written through the API since its last refresh, and every query
+    while the mirror is more than ``max_staleness`` seconds behind go to
+    Access instead.
+    """
+
+    def __init__(
+        self,
+        db,
+        path,
+        refresh_interval=DEFAULT_REFRESH_INTERVAL,
+        max_staleness=DEFAULT_MAX_STALENESS,
+    ):
+        self.db = db
+        self.path = os.path.abspath(path)
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.ready = False
+        self._tables = {}
+        self._signature = None
+        self._api_signature = None
+        self._dirty = {}
+        self._generation = 0
+        self._dirty_since = None
+        self._rebuild = True
+        self._local = threading.local()
+        self._readers = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._last_refresh = None
+        self._counters = {
+            "queries": 0,
+            "fallbacks": 0,
+            "access_only": 0,
+            "refreshes": 0,
+            "refresh_seconds": 0.0,
+            "rows_applied": 0,
+            "tables_copied": 0,
+        }
+
+    def start(self):
+        """Start the background copy and refresh thread"""
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="skydb-mirror"
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            readers, self._readers = self._readers, []
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        for conn in readers:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def note_write(self, tables, ddl=False):
+        """Mark tables changed by a write made through the API"""
+        with self._lock:
+            if ddl:
+                self._rebuild = True
+                self.ready = False
+            self._generation += 1
+            for table in tables:
+                self._dirty[table] = self._generation
+            if self._dirty_since is None:
+                self._dirty_since = time.time()
+            self._api_signature = file_signature(self.db.db_path)
+        self._wakeup.set()
+
+    def staleness(self):
+        """Seconds since the database first changed without the mirror"""
+        signature = file_signature(self.db.db_path)
+        with self._lock:
+            since = self._dirty_since
+            if signature != self._signature and signature is not None:
+                if signature != self._api_signature:
+                    changed = signature[0] / 1e9
+                    since = changed if since is None else min(since, changed)
+        if since is None:
+            return 0.0
+        return max(0.0, time.time() - since)
+
+    def query(self, query, params=None):
+        """Run a SELECT on the mirror, returning (columns, rows, staleness)
+
+        Returns None when the query should run on Access instead, including
+        when it uses Access SQL that SQLite would read differently.
+        """
+        if not self.ready:
+            self.start()
+            return None
+        statement = sqlite_statement(query, params)
+        if statement is None:
+            self._count("access_only")
+            return None
+        query, params = statement
+        staleness = self.staleness()
+        with self._lock:
+            behind = not self._dirty.keys().isdisjoint(
+                referenced_tables(query)
+            )
+        if behind or staleness > self.max_staleness:
+            self._count("fallbacks")
+            return None
+        try:
+            conn = self._reader()
+            with phase("execute"):
+                cursor = conn.execute(query, params)
+            try:
+                columns = [column[0] for column in cursor.description]
+                with phase("fetch"):
+                    rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except sqlite3.Error:
+            self._count("fallbacks")
+            return None
+        self._count("queries")
+        annotate(rows=len(rows), mirror_staleness=staleness)
+        return columns, rows, staleness
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro",
+                uri=True,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                check_same_thread=False,
+            )
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def _refresh_loop(self):
+        writer = None
+        while not self._closed:
+            try:
+                if writer is None:
+                    writer = self._open_writer()
+                self.refresh(writer)
+            except Exception:
+                # The next tick retries; reads keep going to Access while
+                # the mirror is not ready or too stale.
+                pass
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+        if writer is not None:
+            writer.close()
+
+    def _open_writer(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        writer = sqlite3.connect(self.path, check_same_thread=False)
+        writer.execute("PRAGMA journal_mode=WAL")
+        writer.execute("PRAGMA synchronous=OFF")
+        return writer
+
+    def refresh(self, writer):
+        """Bring the mirror up to date with the database file"""
+        signature = file_signature(self.db.db_path)
+        with self._lock:
+            if (
+                not self._rebuild
+                and signature == self._signature
+                and not self._dirty
+            ):
+                return
+            rebuild = self._rebuild
+            external = signature not in (self._signature, self._api_signature)
+            dirty = dict(self._dirty)
+            self._rebuild = False
+        started = time.perf_counter()
+        if rebuild:
+            self.ready = False
+        try:
+            if rebuild or external:
+                self._sync_tables(writer, rebuild)
+            else:
+                for name in dirty:
+                    table = self._tables.get(name)
+                    if table is not None:
+                        self._refresh_table(writer, table)
+        except Exception:
+            with self._lock:
+                self._rebuild = self._rebuild or rebuild
+                if external and not rebuild:
+                    self._signature = None
+            raise
+        with self._lock:
+            self._signature = signature
+            for name, generation in dirty.items():
+                if self._dirty.get(name) == generation:
+                    del self._dirty[name]
+            if not self._dirty:
+                self._dirty_since = None
+            self._last_refresh = time.time()
+            self._counters["refreshes"] += 1
+            self._counters["refresh_seconds"] += time.perf_counter() - started
+        self.ready = True
+
+    def _sync_tables(self, writer, rebuild):
+        """Refresh every table, copying new or changed tables in full"""
+        self.db.schema.invalidate()
+        tables = {}
+        for name in self.db.schema.tables():
+            description = self.db.schema.describe(name)
+            columns = [column["name"] for column in description["columns"]]
+            table = self._tables.get(name.lower())
+            if rebuild or table is None or table.columns != columns:
+                table = self._copy_table(writer, name, description)
+            else:
+                self._refresh_table(writer, table)
+            tables[name.lower()] = table
+        for name, table in self._tables.items():
+            if name not in tables:
+                writer.execute(f"DROP TABLE IF EXISTS {quote(table.name)}")
+        writer.commit()
+        self._tables = tables
+
+    def _refresh_table(self, writer, table):
+        if not table.key or table.token is None:
+            self._copy_rows(writer, table)
+            return
+        try:
+            changes = self.db.changes.changes(
+                table.name, table.token, table.key
+            )
+        except TokenExpired:
+            self._copy_rows(writer, table)
+            return
+        columns = ", ".join(quote(column) for column in table.columns)
+        marks = ", ".join("?" for _ in table.columns)
+        where = " AND ".join(f"{quote(column)} = ?" for column in table.key)
+        upserts = [
+            [adapt(row.get(column)) for column in table.columns]
+            for row in changes["inserted"] + changes["updated"]
+        ]
+        deletes = [
+            [adapt(row[column]) for column in table.key]
+            for row in changes["deleted"]
+        ]
+        with writer:
+            if deletes:
+                writer.executemany(
+                    f"DELETE FROM {quote(table.name)} WHERE {where}", deletes
+                )
+            if upserts:
+                writer.executemany(
+                    f"INSERT OR REPLACE INTO {quote(table.name)} "
+                    f"({columns}) VALUES ({marks})",
+                    upserts,
+                )
+        table.token = changes["token"]
+        self._count("rows_applied", len(upserts) + len(deletes))
+
+    def _copy_table(self, writer, name, description):
+        """Create a table with its indexes and copy every row into it"""
+        columns = [column["name"] for column in description["columns"]]
+        key = list(description["primary_key"])
+        definitions = [
+            f"{quote(column['name'])} {sqlite_type(column['type'])}".strip()
+            for column in description["columns"]
+        ]
+        if key:
+            definitions.append(
+                "PRIMARY KEY (" + ", ".join(quote(c) for c in key) + ")"
+            )
+        writer.execute(f"DROP TABLE IF EXISTS {quote(name)}")
+        writer.execute(
+            f"CREATE TABLE {quote(name)} ({', '.join(definitions)})"
+        )
+        for index in description["indexes"]:
+            if index.get("primary"):
+                continue
+            unique = "UNIQUE " if index["unique"] else ""
+            index_name = quote(f"{name}__{index['name']}")
+            indexed = ", ".join(quote(column) for column in index["columns"])
+            writer.execute(
+                f"CREATE {unique}INDEX {index_name} "
+                f"ON {quote(name)} ({indexed})"
+            )
+        writer.commit()
+        table = MirrorTable(name, columns, key)
+        self._copy_rows(writer, table)
+        return table
+
+    def _copy_rows(self, writer, table):
+        """Replace the mirrored rows of a table with a fresh full copy"""
+        if table.key:
+            table.token = self.db.changes.changes(table.name, key=table.key)[
+                "token"
+            ]
+        marks = ", ".join("?" for _ in table.columns)
+        insert = f"INSERT OR REPLACE INTO {quote(table.name)} VALUES ({marks})"
+        query = f"SELECT * FROM {quote_identifier(table.name)}"
+
+        def run(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                with writer:
+                    writer.execute(f"DELETE FROM {quote(table.name)}")
+                    while True:
+                        rows = cursor.fetchmany(COPY_BATCH_SIZE)
+                        if not rows:
+                            break
+                        writer.executemany(
+                            insert, ([adapt(v) for v in row] for row in rows)
+                        )
+            finally:
+                cursor.close()
+
+        self.db.run_read(run)
+        self._count("tables_copied")
+
+    def stats(self):
+        """Return readiness, staleness and counters"""
+        staleness = self.staleness()
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "tables": len(self._tables),
+                "staleness_seconds": round(staleness, 3),
+                "max_staleness": self.max_staleness,
+                "last_refresh": self._last_refresh,
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
@@ -0,0 +1,267 @@
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from collections import deque
+
+from .sql import fingerprint_sql
+
+
+PHASES = ("queue", "connect", "execute", "fetch", "build", "serialize")
+DEFAULT_SLOW_QUERY_MS = 1000
+DEFAULT_WINDOW = 900
+MAX_WINDOW_ENTRIES = 10000
+TOP_SORT_KEYS = ("total_ms", "avg_ms", "max_ms", "count")
+
+_local = threading.local()
+
+
+class Profile:
+    """Per-request timings of each phase plus what the request returned"""
+
+    def __init__(self, route=None):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.statement = None
+        self.params = None
+        self.rows = 0
+        self.cached = False
+        self.mirror_staleness = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def snapshot(self):
+        """Return phase timings in milliseconds, in pipeline order"""
+        timings = {
+            f"{name}_ms": round(self.phases[name] * 1000, 3)
+            for name in PHASES
+            if name in self.phases
+        }
+        timings["total_ms"] = round(self.elapsed() * 1000, 3)
+        timings["rows"] = self.rows
+        if self.cached:
+            timings["cached"] = True
+        if self.mirror_staleness is not None:
+            timings["mirror_staleness"] = round(self.mirror_staleness, 3)
+        return timings
+
+    def server_timing(self):
+        """Render the phases as a ``Server-Timing`` header value"""
+        entries = [
+            f"{name};dur={self.phases[name] * 1000:.3f}"
+            for name in PHASES
+            if name in self.phases
+        ]
+        entries.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ", ".join(entries)
+
+
+class Phase:
+    """Context manager timing one phase into a metric and the profile"""
+
+    __slots__ = ("name", "metric", "started")
+
+    def __init__(self, name, metric=None):
+        self.name = name
+        self.metric = metric
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.started
+        if self.metric is not None:
+            self.metric.observe(elapsed)
+        profile = getattr(_local, "profile", None)
+        if profile is not None:
+            profile.add(self.name, elapsed)
+
+
+def phase(name, metric=None):
+    """Time a block as ``name`` in the active profile"""
+    return Phase(name, metric)
+
+
+def activate(profile):
+    _local.profile = profile
+
+
+def deactivate():
+    _local.profile = None
+
+
+def current():
+    """Return the profile of the request running on this thread, if any"""
+    return getattr(_local, "profile", None)
+
+
+def annotate(**fields):
+    """Set attributes such as ``rows`` or ``cached`` on the active profile"""
+    profile = current()
+    if profile is not None:
+        for name, value in fields.items():
+            setattr(profile, name, value)
+
+
+def add_rows(count):
+    profile = current()
+    if profile is not None:
+        profile.rows += count
+
+
+def bind(fn):
+    """Wrap ``fn`` to run under the caller's profile on another thread
+
+    Time spent before the wrapper is called is recorded as ``queue``.
+    """
+    profile = current()
+    if profile is None:
+        return fn
+    queued = time.perf_counter()
+
+    def run(*args, **kwargs):
+        previous = current()
+        activate(profile)
+        profile.add("queue", time.perf_counter() - queued)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            activate(previous)
+
+    return run
+
+
+def redact_params(params):
+    """Describe parameters by type only, so values never reach the log"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(value).__name__ for value in params]
+    return type(params).__name__
+
+
+class SlowQueryLog:
+    """Slow-statement log plus a sliding window of statement timings
+
+    Every profiled statement is kept in the window so the slowest
+    fingerprints can be ranked; statements at or over ``threshold_ms`` are
+    also written as JSON lines to a rotating log file when ``path`` is set.
+    SQL is logged as a fingerprint with literals replaced and parameters
+    reduced to their types.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        threshold_ms=DEFAULT_SLOW_QUERY_MS,
+        max_bytes=10 * 1024 * 1024,
+        backups=5,
+        window=DEFAULT_WINDOW,
+        max_entries=MAX_WINDOW_ENTRIES,
+    ):
+        self.path = path
+        self.threshold = threshold_ms / 1000.0
+        self.window = window
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._logger = None
+        self._counters = {"recorded": 0, "slow": 0}
+        if path:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logging.Logger("skydb.slow_queries")
+            self._logger.addHandler(handler)
+
+    def record(self, profile, elapsed, size, status):
+        """Add a finished request to the window and log it if slow"""
+        if not isinstance(profile.statement, str):
+            return
+        fingerprint = fingerprint_sql(profile.statement)
+        now = time.time()
+        slow = elapsed >= self.threshold
+        with self._lock:
+            self._entries.append(
+                (now, fingerprint, elapsed, profile.rows, size)
+            )
+            self._counters["recorded"] += 1
+            if slow:
+                self._counters["slow"] += 1
+        if slow and self._logger is not None:
+            entry = {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+                "route": profile.route,
+                "status": status,
+                "sql": fingerprint,
+                "params": redact_params(profile.params),
+                "rows": profile.rows,
+                "bytes": size,
+                "cached": profile.cached,
+                "total_ms": round(elapsed * 1000, 3),
+                "phases_ms": {
+                    name: round(seconds * 1000, 3)
+                    for name, seconds in profile.phases.items()
+                },
+            }
+            self._logger.warning(json.dumps(entry))
+
+    def top(self, limit=10, window=None, sort="total_ms"):
+        """Rank statement fingerprints seen within the last ``window`` s"""
+        if sort not in TOP_SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(TOP_SORT_KEYS)}")
+        cutoff = time.time() - (window or self.window)
+        with self._lock:
+            while self._entries and self._entries[0][0] < cutoff:
+                self._entries.popleft()
+            entries = list(self._entries)
+        stats = {}
+        for _, fingerprint, elapsed, rows, size in entries:
+            item = stats.get(fingerprint)
+            if item is None:
+                item = stats[fingerprint] = {
+                    "sql": fingerprint,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0,
+                    "bytes": 0,
+                }
+            ms = elapsed * 1000
+            item["count"] += 1
+            item["total_ms"] += ms
+            item["max_ms"] = max(item["max_ms"], ms)
+            item["rows"] += rows
+            item["bytes"] += size
+        for item in stats.values():
+            item["avg_ms"] = round(item["total_ms"] / item["count"], 3)
+            item["total_ms"] = round(item["total_ms"], 3)
+            item["max_ms"] = round(item["max_ms"], 3)
+        ranked = sorted(stats.values(), key=lambda i: i[sort], reverse=True)
+        return ranked[:limit]
+
+    def stats(self):
+        """Return the threshold, window size and counters"""
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "window_seconds": self.window,
+                "window_entries": len(self._entries),
+                "log_path": self.path,
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
+
+    def close(self):
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
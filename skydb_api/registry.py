@@ -0,0 +1,100 @@
+import configparser
+import re
+import threading
+
+from .sql import count_parameters, is_ddl, is_select, referenced_tables
+
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+QUERIES_SECTION = "queries"
+
+
+class NamedQuery:
+    """Registered statement with its metadata worked out once"""
+
+    def __init__(self, name, sql):
+        if not NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid query name: {name}")
+        sql = sql.strip()
+        if not sql:
+            raise ValueError(f"Query {name} has no SQL")
+        self.name = name
+        self.sql = sql
+        self.select = is_select(sql)
+        self.ddl = is_ddl(sql)
+        self.tables = frozenset(referenced_tables(sql))
+        self.param_count = count_parameters(sql)
+        self.columns = None
+
+    def check_params(self, params):
+        """Raise ValueError unless ``params`` fits the placeholders"""
+        if params is not None and not isinstance(params, (list, tuple)):
+            raise ValueError(
+                f"Query {self.name} takes a list of parameters, "
+                f"got {type(params).__name__}"
+            )
+        given = len(params or [])
+        if given != self.param_count:
+            raise ValueError(
+                f"Query {self.name} takes {self.param_count} parameters, "
+                f"got {given}"
+            )
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "query": self.sql,
+            "kind": "read" if self.select else "write",
+            "tables": sorted(self.tables),
+            "param_count": self.param_count,
+            "columns": self.columns,
+        }
+
+
+class QueryRegistry:
+    """Named queries clients can run as POST /q/<name>"""
+
+    def __init__(self):
+        self._queries = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._queries)
+
+    def register(self, name, sql):
+        """Add or replace a named query and return it"""
+        entry = NamedQuery(name, sql)
+        with self._lock:
+            self._queries[name] = entry
+            self.generation += 1
+        return entry
+
+    def remove(self, name):
+        """Forget a named query, returning False if it did not exist"""
+        with self._lock:
+            if self._queries.pop(name, None) is None:
+                return False
+            self.generation += 1
+            return True
+
+    def get(self, name):
+        return self._queries.get(name)
+
+    def describe(self):
+        """Return the metadata of every registered query"""
+        with self._lock:
+            entries = sorted(self._queries.values(), key=lambda q: q.name)
+        return [entry.describe() for entry in entries]
+
+    def load(self, path, section=QUERIES_SECTION):
+        """Register every ``name = SQL`` entry of an ini file section"""
+        config = configparser.ConfigParser(interpolation=None)
+        config.optionxform = str
+        if not config.read(path):
+            raise ValueError(f"Cannot read queries file: {path}")
+        if section not in config:
+            return 0
+        for name, sql in config[section].items():
+            self.register(name, sql)
+        return len(config[section])
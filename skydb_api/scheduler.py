@@ -0,0 +1,233 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .profiling import phase
+
+
+_STOP = object()
+
+
+class WriteJob:
+    """Write queued for the writer thread"""
+
+    def __init__(self, fn, commit):
+        self.fn = fn
+        self.commit = commit
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class ExecutionScheduler:
+    """Separate read and write execution lanes for one database
+
+    Reads run in parallel on pooled connections, at most ``read_workers``
+    at a time. Streamed and paged cursors hold a read slot from
+    acquire_read() until they close, so they count against the same bound. Writes are queued to a single writer thread that owns a
+    dedicated connection, so JET never sees two writers at once. With
+    ``group_commit_ms`` set, single-statement writes arriving within that
+    window share one transaction; if any of them fails the group is rolled
+    back and each write is replayed on its own.
+    """
+
+    def __init__(
+        self,
+        pool,
+        connect,
+        read_workers=4,
+        group_commit_ms=0,
+        max_group=64,
+    ):
+        self.pool = pool
+        self.connect = connect
+        self.read_workers = read_workers
+        self.group_commit = group_commit_ms / 1000.0
+        self.max_group = max_group
+        self._read_slots = threading.BoundedSemaphore(read_workers)
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_conn = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._counters = {
+            "reads": 0,
+            "reads_active": 0,
+            "read_wait_seconds": 0.0,
+            "read_wait_max_seconds": 0.0,
+            "writes": 0,
+            "write_batches": 0,
+            "grouped_writes": 0,
+            "group_rollbacks": 0,
+            "write_wait_seconds": 0.0,
+            "write_wait_max_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    def _record_wait(self, lane, waited):
+        counters = self._counters
+        counters[f"{lane}_wait_seconds"] += waited
+        if waited > counters[f"{lane}_wait_max_seconds"]:
+            counters[f"{lane}_wait_max_seconds"] = waited
+
+    def acquire_read(self):
+        """Wait for a read slot; pair every call with release_read()"""
+        started = time.monotonic()
+        with phase("queue"):
+            self._read_slots.acquire()
+        with self._lock:
+            self._counters["reads"] += 1
+            self._counters["reads_active"] += 1
+            self._record_wait("read", time.monotonic() - started)
+
+    def release_read(self):
+        with self._lock:
+            self._counters["reads_active"] -= 1
+        self._read_slots.release()
+
+    def read(self, fn):
+        """Run ``fn(conn)`` on a pooled connection in the read lane"""
+        self.acquire_read()
+        try:
+            with self.pool.connection() as conn:
+                return fn(conn)
+        finally:
+            self.release_read()
+
+    def write(self, fn, commit=True):
+        """Run ``fn(conn)`` on the writer connection and wait for it
+
+        With ``commit`` the lane commits after ``fn`` and may group it with
+        other writes; otherwise ``fn`` manages its own transaction.
+        """
+        job = WriteJob(fn, commit)
+        with self._lock:
+            if self._closed:
+                raise Exception("Database writer is shut down")
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="skydb-writer"
+                )
+                self._writer.daemon = True
+                self._writer.start()
+            self._queue.put(job)
+            depth = self._queue.qsize()
+            if depth > self._counters["max_queue_depth"]:
+                self._counters["max_queue_depth"] = depth
+        return job.future.result()
+
+    def _writer_loop(self):
+        pending = None
+        while True:
+            job = pending if pending is not None else self._queue.get()
+            pending = None
+            if job is _STOP:
+                break
+            batch = [job]
+            if self.group_commit and job.commit:
+                deadline = time.monotonic() + self.group_commit
+                while len(batch) < self.max_group:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        following = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if following is _STOP or not following.commit:
+                        pending = following
+                        break
+                    batch.append(following)
+            self._run(batch)
+        self._reset_connection()
+
+    def _connection(self):
+        if self._writer_conn is None:
+            self._writer_conn = self.connect()
+        return self._writer_conn
+
+    def _reset_connection(self):
+        if self._writer_conn is not None:
+            self._writer_conn.close()
+            self._writer_conn = None
+
+    def _run(self, batch):
+        started = time.monotonic()
+        with self._lock:
+            self._counters["writes"] += len(batch)
+            self._counters["write_batches"] += 1
+            for job in batch:
+                self._record_wait("write", started - job.enqueued)
+        if len(batch) == 1:
+            self._run_one(batch[0])
+            return
+        results = []
+        try:
+            conn = self._connection()
+            for job in batch:
+                results.append(job.fn(conn))
+            conn.commit()
+        except Exception:
+            with self._lock:
+                self._counters["group_rollbacks"] += 1
+            self._rollback()
+            for job in batch:
+                self._run_one(job)
+            return
+        with self._lock:
+            self._counters["grouped_writes"] += len(batch)
+        for job, result in zip(batch, results):
+            job.future.set_result(result)
+
+    def _run_one(self, job):
+        try:
+            conn = self._connection()
+            result = job.fn(conn)
+            if job.commit:
+                conn.commit()
+        except Exception as e:
+            self._rollback()
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+
+    def _rollback(self):
+        """Roll back, dropping the writer connection if that fails"""
+        if self._writer_conn is None:
+            return
+        try:
+            self._writer_conn.rollback()
+        except Exception:
+            self._reset_connection()
+
+    def close(self, timeout=5.0):
+        """Let queued writes finish, then stop the writer thread"""
+        with self._lock:
+            self._closed = True
+            writer = self._writer
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join(timeout)
+
+    def stats(self):
+        """Return queue depth, lane activity and wait times"""
+        with self._lock:
+            c = dict(self._counters)
+        reads = c["reads"] or 1
+        writes = c["writes"] or 1
+        return {
+            "read_workers": self.read_workers,
+            "reads_active": c["reads_active"],
+            "group_commit_ms": self.group_commit * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": c["max_queue_depth"],
+            "avg_read_wait_ms": c["read_wait_seconds"] * 1000 / reads,
+            "max_read_wait_ms": c["read_wait_max_seconds"] * 1000,
+            "avg_write_wait_ms": c["write_wait_seconds"] * 1000 / writes,
+            "max_write_wait_ms": c["write_wait_max_seconds"] * 1000,
+            "total_reads": c["reads"],
+            "total_writes": c["writes"],
+            "total_write_batches": c["write_batches"],
+            "total_grouped_writes": c["grouped_writes"],
+            "total_group_rollbacks": c["group_rollbacks"],
+        }
@@ -0,0 +1,176 @@
+import threading
+
+from .sql import quote_identifier
+from .utils import file_signature
+
+
+class SchemaCache:
+    """Table, column and index metadata, built once and kept in memory
+
+    Metadata comes from the ODBC catalog calls (``cursor.columns``,
+    ``cursor.statistics`` and ``cursor.primaryKeys``); drivers without them
+    fall back to the column names of an empty SELECT. The cache is rebuilt
+    when the database file changes outside the API or a DDL statement runs
+    through it.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._tables = None
+        self._described = {}
+        self._signature = file_signature(db.db_path)
+        self._lock = threading.RLock()
+        self._counters = {"builds": 0, "hits": 0, "invalidations": 0}
+
+    def _check_file(self):
+        signature = file_signature(self.db.db_path)
+        if signature != self._signature:
+            self._signature = signature
+            self._reset()
+
+    def _reset(self):
+        self._tables = None
+        self._described = {}
+        self._counters["invalidations"] += 1
+
+    def note_write(self, ddl):
+        """Record a write made through the API"""
+        with self._lock:
+            if ddl:
+                self._reset()
+            self._signature = file_signature(self.db.db_path)
+
+    def invalidate(self):
+        """Forget all cached metadata"""
+        with self._lock:
+            self._reset()
+
+    def tables(self):
+        """Return the user table names"""
+        with self._lock:
+            self._check_file()
+            if self._tables is None:
+                with self.db.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    try:
+                        cursor.execute(self.db.tables_query)
+                        self._tables = [row[0] for row in cursor.fetchall()]
+                    finally:
+                        cursor.close()
+                self._counters["builds"] += 1
+            else:
+                self._counters["hits"] += 1
+            return list(self._tables)
+
+    def resolve(self, name):
+        """Return the stored spelling of a table name, or None"""
+        lowered = name.lower()
+        for table in self.tables():
+            if table.lower() == lowered:
+                return table
+        return None
+
+    def describe(self, name):
+        """Return columns, primary key and indexes of a table, or None"""
+        table = self.resolve(name)
+        if table is None:
+            return None
+        with self._lock:
+            if table not in self._described:
+                with self.db.pool.connection() as conn:
+                    self._described[table] = self._build(conn, table)
+                self._counters["builds"] += 1
+            return self._described[table]
+
+    def schema(self):
+        """Return the description of every table"""
+        tables = self.tables()
+        with self._lock:
+            missing = [t for t in tables if t not in self._described]
+            if missing:
+                with self.db.pool.connection() as conn:
+                    for table in missing:
+                        self._described[table] = self._build(conn, table)
+                self._counters["builds"] += 1
+            return {table: self._described[table] for table in tables}
+
+    def _build(self, conn, table):
+        cursor = conn.cursor()
+        try:
+            if not hasattr(cursor, "columns"):
+                return self._build_from_description(cursor, table)
+            columns = [
+                {
+                    "name": row.column_name,
+                    "type": row.type_name,
+                    "size": row.column_size,
+                    "decimal_digits": row.decimal_digits,
+                    "nullable": bool(row.nullable),
+                    "default": row.column_def,
+                    "position": row.ordinal_position,
+                }
+                for row in cursor.columns(table=table).fetchall()
+            ]
+            indexes = {}
+            for row in cursor.statistics(table=table).fetchall():
+                if row.index_name is None:
+                    continue
+                index = indexes.setdefault(
+                    row.index_name,
+                    {
+                        "name": row.index_name,
+                        "unique": not row.non_unique,
+                        "columns": [],
+                    },
+                )
+                index["columns"].append(row.column_name)
+            primary_key = self._primary_key(cursor, table, indexes)
+            for index in indexes.values():
+                index["primary"] = index["columns"] == primary_key
+            return {
+                "columns": columns,
+                "primary_key": primary_key,
+                "indexes": list(indexes.values()),
+            }
+        finally:
+            cursor.close()
+
+    def _primary_key(self, cursor, table, indexes):
+        try:
+            rows = cursor.primaryKeys(table=table).fetchall()
+        except self.db.driver.Error:
+            rows = []
+        if rows:
+            rows.sort(key=lambda row: row.key_seq)
+            return [row.column_name for row in rows]
+        # The Access driver does not implement SQLPrimaryKeys; Access names
+        # the index backing the primary key "PrimaryKey".
+        for name, index in indexes.items():
+            if name.lower() == "primarykey":
+                return list(index["columns"])
+        return []
+
+    def _build_from_description(self, cursor, table):
+        cursor.execute(f"SELECT * FROM {quote_identifier(table)} WHERE 1=0")
+        columns = [
+            {
+                "name": column[0],
+                "type": getattr(column[1], "__name__", column[1]),
+                "size": column[3],
+                "decimal_digits": column[5],
+                "nullable": column[6],
+                "default": None,
+                "position": position,
+            }
+            for position, column in enumerate(cursor.description, 1)
+        ]
+        return {"columns": columns, "primary_key": [], "indexes": []}
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {
+                "tables": None if self._tables is None else len(self._tables),
+                "described": len(self._described),
+                **{f"total_{k}": v for k, v in self._counters.items()},
+            }
@@ -0,0 +1,839 @@
+import hashlib
+import json
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+from waitress import create_server
+
+from .admission import Overloaded
+from .catalog import DatabaseBusy
+from .changes import TokenExpired
+from .compression import (
+    DEFAULT_LEVEL,
+    DEFAULT_MIN_SIZE,
+    CompressionMiddleware,
+)
+from .cursors import PagedCursor
+from .database import QueryResult
+from .export import (
+    DEFAULT_EXPORT_CHUNK_SIZE,
+    MAX_EXPORT_CHUNK_SIZE,
+    ExportStats,
+    export_format,
+)
+from .formats import FormatError, fast_json, negotiate, render
+from .serialize import RowEncoder
+from .settings import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_THREADS
+from .sql import is_select, quote_identifier
+from .startup import StartupProfile
+from .metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    MetricsMiddleware,
+    merge_families,
+    stats_families,
+)
+from .profiling import (
+    Profile,
+    activate,
+    annotate,
+    current,
+    deactivate,
+    phase,
+)
+
+
+STREAM_BATCH_SIZE = 500
+MAX_PAGE_SIZE = 10000
+MAX_BATCH_SIZE = 500
+DEFAULT_BULK_CHUNK_SIZE = 1000
+MAX_BULK_CHUNK_SIZE = 50000
+NDJSON_MIMETYPE = "application/x-ndjson"
+CONDITIONAL_ENDPOINTS = {
+    "get_tables",
+    "get_table_columns",
+    "get_table_indexes",
+    "get_schema",
+}
+
+
+def stream_format():
+    """Return the requested streaming format for /query, if any
+
+    ``?stream=ndjson`` or an ``Accept: application/x-ndjson`` header selects
+    newline-delimited JSON, ``?stream=json`` (or ``?stream=1``) a chunked JSON
+    array with the same shape as the buffered response.
+    """
+    mode = request.args.get("stream", "").lower()
+    if mode == "ndjson":
+        return "ndjson"
+    if mode in ("json", "1", "true"):
+        return "json"
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return "ndjson"
+    return None
+
+
+def stream_rows(result, fmt, batch_size=STREAM_BATCH_SIZE, fast=False):
+    """Encode a ResultCursor chunk by chunk as NDJSON or a JSON array
+
+    Errors raised after the first byte has been sent cannot change the
+    status code, so they are written as a final ``{"error": ...}`` record.
+    Rows use the fast JSON encoding only when ``fast`` is set.
+    """
+
+    separator = b"\n" if fmt == "ndjson" else b","
+    encoder = None
+    first = True
+    try:
+        if fmt == "json":
+            yield b"["
+        for rows in result.batches(batch_size):
+            if encoder is None:
+                encoder = RowEncoder.for_rows(
+                    result.columns,
+                    rows,
+                    result.cursor.description,
+                    compat=not fast,
+                )
+            with phase("serialize"):
+                chunk = encoder.encode_items(rows, separator)
+            if fmt == "ndjson":
+                yield chunk + b"\n"
+            else:
+                yield chunk if first else b"," + chunk
+            first = False
+    except Exception as e:
+        encoder = encoder or RowEncoder([], [], compat=not fast)
+        error = encoder.dumps({"error": str(e)})
+        if fmt == "ndjson":
+            yield error + b"\n"
+        else:
+            yield error if first else b"," + error
+    finally:
+        result.close()
+    if fmt == "json":
+        yield b"]"
+
+
+def query_response(app, db):
+    """Run the /query request body against ``db`` and build the response"""
+    try:
+        data = request.get_json()
+        fmt = negotiate(request)
+        fast = fast_json(request)
+        if data is not None and not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        if data and "continuation" in data:
+            page_size = page_size_from(data) or STREAM_BATCH_SIZE
+            cursor = db.cursors.take(data["continuation"])
+            if cursor is None:
+                return (
+                    jsonify({"error": "Continuation token expired"}),
+                    410,
+                )
+            return next_page(app, db, cursor, page_size, fmt, fast)
+        if not data or "query" not in data:
+            return jsonify({"error": "No query provided"}), 400
+        query = data["query"]
+        if not isinstance(query, str):
+            return jsonify({"error": "query must be a string"}), 400
+        params = data.get("params", None)
+        annotate(statement=query, params=params)
+        page_size = page_size_from(data)
+        if page_size and is_select(query):
+            cursor = PagedCursor(db.open_cursor(query, params))
+            return next_page(app, db, cursor, page_size, fmt, fast)
+        stream = stream_format()
+        if stream and is_select(query):
+            result = db.open_cursor(query, params)
+            mimetype = NDJSON_MIMETYPE if stream == "ndjson" else None
+            response = Response(
+                stream_rows(result, stream, fast=fast),
+                mimetype=mimetype or "application/json",
+            )
+            # The generator's finally never runs if the body is closed
+            # before the first chunk, e.g. when the client has gone
+            response.call_on_close(result.close)
+            return response
+        result = db.fetch_result(query, params)
+        if isinstance(result, QueryResult):
+            return render(app, result, fmt, profile_extra(), fast)
+        return jsonify({**result, **profile_extra()})
+    except FormatError as e:
+        return jsonify({"error": str(e)}), 406
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def table_list(db):
+    try:
+        results = [{"table_name": name} for name in db.schema.tables()]
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def slow_statements(db):
+    try:
+        limit = request.args.get("limit", 10, type=int)
+        window = request.args.get("window", type=float)
+        sort = request.args.get("sort", "total_ms")
+        top = db.slow_queries.top(limit, window, sort)
+        window = window or db.slow_queries.window
+        return jsonify({"window_seconds": window, "statements": top})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def profiling_requested():
+    return request.args.get("profile", "").lower() in ("1", "true")
+
+
+def profile_extra():
+    """Return ``{"profile": ...}`` for a response when ?profile=1 is set"""
+    profile = current()
+    if profile is None or not profiling_requested():
+        return {}
+    return {"profile": profile.snapshot()}
+
+
+def etag_for(db):
+    """Return the ETag value for a cacheable request, or None
+
+    GETs of the schema endpoints and SELECTs sent to /query or /q/<name>
+    are cacheable; paged queries are not, since every page moves a cursor.
+    The tag hashes the database version with the method, URL, Accept
+    header and body, and must be taken before the request runs so that a
+    write landing meanwhile can only make the tag stale, never wrong.
+    """
+    if request.method == "GET":
+        if request.endpoint not in CONDITIONAL_ENDPOINTS:
+            return None
+    elif request.endpoint == "execute_query":
+        data = request.get_json(silent=True)
+        if (
+            not isinstance(data, dict)
+            or not isinstance(data.get("query"), str)
+            or not is_select(data["query"])
+            or "continuation" in data
+            or "page_size" in data
+        ):
+            return None
+    elif request.endpoint == "execute_named_query":
+        entry = db.queries.get(request.view_args["name"])
+        if entry is None or not entry.select:
+            return None
+    else:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (
+        repr(db.version()),
+        request.method,
+        request.full_path,
+        request.headers.get("Accept", ""),
+    ):
+        digest.update(part.encode("utf-8") + b"\0")
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def page_size_from(data):
+    """Validate the page_size of a /query body, returning None if absent"""
+    page_size = data.get("page_size")
+    if page_size is None:
+        return None
+    if (
+        isinstance(page_size, bool)
+        or not isinstance(page_size, int)
+        or not 0 < page_size <= MAX_PAGE_SIZE
+    ):
+        raise ValueError(
+            f"page_size must be an integer between 1 and {MAX_PAGE_SIZE}"
+        )
+    return page_size
+
+
+def next_page(app, db, cursor, page_size, fmt="json", fast=False):
+    """Read one page from a PagedCursor and park it if rows remain"""
+    try:
+        rows, more = cursor.page(page_size)
+    except Exception:
+        cursor.close()
+        raise
+    token = None
+    if more:
+        token = db.cursors.park(cursor)
+        if token is None:
+            return (
+                jsonify({"error": "Too many open cursors, retry later"}),
+                503,
+            )
+    page = QueryResult(cursor.result.columns, rows)
+    extra = {"continuation": token, **profile_extra()}
+    return render(app, page, fmt, extra, fast)
+
+
+def batch_from(data):
+    """Validate a /batch body into (statements, transaction)"""
+    transaction = False
+    if isinstance(data, dict):
+        transaction = bool(data.get("transaction", False))
+        data = data.get("statements")
+    if not isinstance(data, list) or not data:
+        raise ValueError("Expected a non-empty list of statements")
+    if len(data) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch is limited to {MAX_BATCH_SIZE} statements")
+    statements = []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict) or not item.get("query"):
+            raise ValueError(f"Statement {index} has no query")
+        if not isinstance(item["query"], str):
+            raise ValueError(f"Statement {index} query must be a string")
+        statements.append((item["query"], item.get("params")))
+    return statements, transaction
+
+
+def parameter_rows(rows):
+    """Yield parameter rows, rejecting anything that is not a list"""
+    for index, row in enumerate(rows):
+        if not isinstance(row, (list, tuple)):
+            raise ValueError(f"Row {index} is not a list of parameters")
+        yield row
+
+
+def ndjson_rows(stream):
+    """Yield one parameter row per non-empty NDJSON line of a stream"""
+    for index, line in enumerate(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {index + 1} is not valid JSON")
+
+
+def bulk_from(req):
+    """Read a /bulk request into (query, rows, chunk_size)
+
+    JSON bodies carry ``query``, ``rows`` and ``chunk_size``; NDJSON bodies
+    carry one parameter row per line with the rest in the query string.
+    """
+    if req.mimetype == NDJSON_MIMETYPE:
+        options = req.args
+        rows = ndjson_rows(req.stream)
+    else:
+        options = req.get_json()
+        if not isinstance(options, dict):
+            raise ValueError("Expected a JSON object")
+        rows = options.get("rows")
+        if not isinstance(rows, list):
+            raise ValueError("rows must be a list of parameter lists")
+    query = options.get("query")
+    if not query:
+        raise ValueError("No query provided")
+    if not isinstance(query, str):
+        raise ValueError("query must be a string")
+    try:
+        chunk_size = int(options.get("chunk_size", DEFAULT_BULK_CHUNK_SIZE))
+    except (TypeError, ValueError):
+        chunk_size = 0
+    if not 0 < chunk_size <= MAX_BULK_CHUNK_SIZE:
+        raise ValueError(
+            f"chunk_size must be between 1 and {MAX_BULK_CHUNK_SIZE}"
+        )
+    return query, parameter_rows(rows), chunk_size
+
+
+def create_app(
+    db,
+    catalog=None,
+    admission=None,
+    access_log=None,
+    compression=True,
+    compress_level=DEFAULT_LEVEL,
+    compress_min_size=DEFAULT_MIN_SIZE,
+):
+    """Build the Flask application serving a DatabaseConnection
+
+    ``catalog`` is an optional DatabaseCatalog of further databases served
+    under ``/db/<name>/``. ``admission`` is an optional AdmissionControl
+    limiting how many requests run and wait at once. ``access_log`` is an
+    optional AccessLog that gets a line per request.
+    With ``compression`` responses are gzip, zstd or brotli encoded as the
+    client's Accept-Encoding allows.
+    """
+    app = Flask(__name__)
+    CORS(app)
+    app.config["SKYDB_DATABASE"] = db
+    app.config["SKYDB_CATALOG"] = catalog
+    app.config["SKYDB_ADMISSION"] = admission
+    if compression:
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app, level=compress_level, min_size=compress_min_size
+        )
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+    exports = ExportStats()
+
+    @app.before_request
+    def label_route():
+        rule = request.url_rule
+        request.environ["skydb.route"] = rule.rule if rule else "unmatched"
+        profile = Profile(request.environ["skydb.route"])
+        activate(profile)
+
+        environ = request.environ
+
+        def finish(elapsed, size, status):
+            deactivate()
+            target = environ.get("skydb.database", db)
+            target.slow_queries.record(profile, elapsed, size, status)
+
+        callbacks = request.environ.setdefault("skydb.on_finish", [])
+        callbacks.append(finish)
+        if access_log is not None:
+            method, path = request.method, request.path
+            callbacks.append(
+                lambda elapsed, size, status: access_log.record(
+                    method, path, status, size, elapsed
+                )
+            )
+
+    @app.before_request
+    def admit():
+        if admission is None:
+            return None
+        try:
+            ticket = admission.acquire(request.environ["skydb.route"])
+        except Overloaded as e:
+            return (
+                jsonify({"error": str(e)}),
+                503,
+                {"Retry-After": str(e.retry_after)},
+            )
+        request.environ["skydb.on_finish"].append(
+            lambda elapsed, size, status: admission.release(ticket)
+        )
+        return None
+
+    @app.before_request
+    def check_etag():
+        etag = etag_for(db)
+        if etag is None:
+            return None
+        request.environ["skydb.etag"] = etag
+        if request.if_none_match.contains_weak(etag):
+            return app.response_class(status=304)
+        return None
+
+    @app.after_request
+    def add_etag(response):
+        etag = request.environ.get("skydb.etag")
+        profile = current()
+        if profile is not None and profile.mirror_staleness:
+            # Rows from a lagging mirror are older than the version the
+            # tag names; tagging them would let a later 304 keep them
+            return response
+        if etag and response.status_code in (200, 304):
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    @app.after_request
+    def add_server_timing(response):
+        profile = current()
+        if profile is not None and profiling_requested():
+            response.headers["Server-Timing"] = profile.server_timing()
+        return response
+
+    @app.after_request
+    def add_mirror_staleness(response):
+        profile = current()
+        if profile is not None and profile.mirror_staleness is not None:
+            response.headers["X-SkyDB-Mirror-Staleness"] = (
+                f"{profile.mirror_staleness:.3f}"
+            )
+        return response
+
+    @app.route("/")
+    def home():
+        return {"message": "SkyDB API is running"}
+
+    def with_database(name, view):
+        """Run ``view(db)`` on a catalog database while holding a slot
+
+        The slot is only given back when the response has been sent, so
+        streamed and paged results count against the database's limit,
+        and after the request is recorded in that database's slow log.
+        """
+        if catalog is None:
+            return jsonify({"error": f"Unknown database: {name}"}), 404
+        try:
+            target = catalog.acquire(name)
+        except KeyError:
+            return jsonify({"error": f"Unknown database: {name}"}), 404
+        except DatabaseBusy as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        request.environ["skydb.database"] = target
+        try:
+            response = app.make_response(view(target))
+        except BaseException:
+            catalog.release(name)
+            raise
+        request.environ["skydb.on_finish"].append(
+            lambda elapsed, size, status: catalog.release(name)
+        )
+        return response
+
+    @app.route("/query", methods=["POST"])
+    def execute_query():
+        return query_response(app, db)
+
+    @app.route("/db", methods=["GET"])
+    def list_databases():
+        if catalog is None:
+            return jsonify([])
+        databases = catalog.stats()["databases"]
+        return jsonify(
+            [
+                {
+                    "name": name,
+                    "open": state["open"],
+                    "active": state["active"],
+                }
+                for name, state in sorted(databases.items())
+            ]
+        )
+
+    @app.route("/db/<name>/query", methods=["POST"])
+    def execute_database_query(name):
+        return with_database(name, lambda target: query_response(app, target))
+
+    @app.route("/db/<name>/tables", methods=["GET"])
+    def get_database_tables(name):
+        return with_database(name, table_list)
+
+    @app.route("/db/<name>/slow", methods=["GET"])
+    def get_database_slow_queries(name):
+        return with_database(name, slow_statements)
+
+    @app.route("/batch", methods=["POST"])
+    def execute_batch():
+        try:
+            statements, transaction = batch_from(request.get_json())
+            committed, results = db.execute_batch(statements, transaction)
+            return jsonify({"committed": committed, "results": results})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/bulk", methods=["POST"])
+    def execute_bulk():
+        try:
+            query, rows, chunk_size = bulk_from(request)
+            if is_select(query):
+                return (
+                    jsonify({"error": "Bulk statements cannot be SELECT"}),
+                    400,
+                )
+            return jsonify(db.execute_bulk(query, rows, chunk_size))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/q", methods=["GET"])
+    def list_named_queries():
+        return jsonify(db.queries.describe())
+
+    @app.route("/q/<name>", methods=["GET"])
+    def describe_named_query(name):
+        entry = db.queries.get(name)
+        if entry is None:
+            return jsonify({"error": f"Unknown query: {name}"}), 404
+        return jsonify(entry.describe())
+
+    @app.route("/q/<name>", methods=["POST"])
+    def execute_named_query(name):
+        try:
+            entry = db.queries.get(name)
+            if entry is None:
+                return jsonify({"error": f"Unknown query: {name}"}), 404
+            data = request.get_json(silent=True)
+            params = data.get("params") if isinstance(data, dict) else data
+            fmt = negotiate(request)
+            fast = fast_json(request)
+            annotate(statement=entry.sql, params=params)
+            result = db.execute_named(entry, params)
+            if isinstance(result, QueryResult):
+                return render(app, result, fmt, profile_extra(), fast)
+            return jsonify({**result, **profile_extra()})
+        except FormatError as e:
+            return jsonify({"error": str(e)}), 406
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/q/<name>", methods=["PUT"])
+    def register_named_query(name):
+        try:
+            data = request.get_json()
+            if not data or "query" not in data:
+                return jsonify({"error": "No query provided"}), 400
+            entry = db.queries.register(name, data["query"])
+            return jsonify(entry.describe()), 201
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/q/<name>", methods=["DELETE"])
+    def remove_named_query(name):
+        if not db.queries.remove(name):
+            return jsonify({"error": f"Unknown query: {name}"}), 404
+        return "", 204
+
+    @app.route("/stats", methods=["GET"])
+    def get_stats():
+        stats = {
+            "pool": db.pool.stats(),
+            "cursors": db.cursors.stats(),
+            "schema": db.schema.stats(),
+            "slow_queries": db.slow_queries.stats(),
+            "changes": db.changes.stats(),
+            "exports": exports.stats(),
+        }
+        if db.cache:
+            stats["cache"] = db.cache.stats()
+        if db.scheduler:
+            stats["scheduler"] = db.scheduler.stats()
+        if db.mirror:
+            stats["mirror"] = db.mirror.stats()
+        if catalog is not None:
+            stats["databases"] = catalog.stats()
+        if admission is not None:
+            stats["admission"] = admission.stats()
+        return jsonify(stats)
+
+    @app.route("/export/<name>", methods=["GET"])
+    def export_table(name):
+        try:
+            fmt, mimetype = export_format(request.args.get("format"))
+            chunk_size = request.args.get(
+                "chunk_size", DEFAULT_EXPORT_CHUNK_SIZE, type=int
+            )
+            if not 0 < chunk_size <= MAX_EXPORT_CHUNK_SIZE:
+                raise ValueError(
+                    "chunk_size must be between 1 and "
+                    f"{MAX_EXPORT_CHUNK_SIZE}"
+                )
+            table = db.schema.resolve(name)
+            if table is None:
+                return jsonify({"error": f"Unknown table: {name}"}), 404
+            result = db.open_cursor(f"SELECT * FROM {quote_identifier(table)}")
+            response = Response(
+                exports.stream(table, fmt, result, chunk_size),
+                mimetype=mimetype,
+            )
+            response.headers["Content-Disposition"] = (
+                f'attachment; filename="{table}.{fmt}"'
+            )
+            response.call_on_close(result.close)
+            return response
+        except FormatError as e:
+            return jsonify({"error": str(e)}), 406
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/changes", methods=["GET"])
+    def get_changes():
+        try:
+            name = request.args.get("table")
+            if not name:
+                return jsonify({"error": "No table provided"}), 400
+            table = db.schema.resolve(name)
+            if table is None:
+                return jsonify({"error": f"Unknown table: {name}"}), 404
+            key = request.args.get("key")
+            key = (
+                [column.strip() for column in key.split(",")] if key else None
+            )
+            since = request.args.get("since")
+            return jsonify(db.changes.changes(table, since, key))
+        except TokenExpired as e:
+            return jsonify({"error": str(e)}), 410
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/slow", methods=["GET"])
+    def get_slow_queries():
+        return slow_statements(db)
+
+    @app.route("/metrics", methods=["GET"])
+    def get_metrics():
+        families = []
+        families += stats_families("pool", db.pool.stats())
+        families += stats_families("cursors", db.cursors.stats())
+        families += stats_families("schema", db.schema.stats())
+        families += stats_families("slow_queries", db.slow_queries.stats())
+        families += stats_families("changes", db.changes.stats())
+        families += stats_families("exports", exports.stats())
+        if db.cache:
+            families += stats_families("cache", db.cache.stats())
+        if db.scheduler:
+            families += stats_families("scheduler", db.scheduler.stats())
+        if db.mirror:
+            families += stats_families("mirror", db.mirror.stats())
+        if catalog is not None:
+            families += stats_families("catalog", catalog.stats())
+            for name, target in catalog.open_databases():
+                labels = {"database": name}
+                families += stats_families(
+                    "database_pool", target.pool.stats(), labels
+                )
+                if target.cache:
+                    families += stats_families(
+                        "database_cache", target.cache.stats(), labels
+                    )
+        if admission is not None:
+            snapshot = admission.stats()
+            families += stats_families("admission", snapshot)
+            for route, state in snapshot["routes"].items():
+                families += stats_families(
+                    "admission_route", state, {"route": route}
+                )
+        families = merge_families(families)
+        return Response(REGISTRY.render(families), content_type=CONTENT_TYPE)
+
+    @app.route("/tables", methods=["GET"])
+    def get_tables():
+        return table_list(db)
+
+    @app.route("/tables/<name>/columns", methods=["GET"])
+    def get_table_columns(name):
+        try:
+            table = db.schema.describe(name)
+            if table is None:
+                return jsonify({"error": f"Unknown table: {name}"}), 404
+            return jsonify(table["columns"])
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/tables/<name>/indexes", methods=["GET"])
+    def get_table_indexes(name):
+        try:
+            table = db.schema.describe(name)
+            if table is None:
+                return jsonify({"error": f"Unknown table: {name}"}), 404
+            return jsonify(
+                {
+                    "primary_key": table["primary_key"],
+                    "indexes": table["indexes"],
+                }
+            )
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/schema", methods=["GET"])
+    def get_schema():
+        try:
+            return jsonify({"tables": db.schema.schema()})
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    return app
+
+
+def make_server(
+    app,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    threads=None,
+    connection_limit=None,
+    backlog=None,
+):
+    """Create a Waitress server for the application
+
+    An AdmissionControl on the app needs a thread for every worker and
+    queue place plus one for light routes; ValueError is raised when
+    ``threads`` is fewer, rather than letting light routes starve.
+    """
+    options = {}
+    admission = app.config.get("SKYDB_ADMISSION")
+    if admission is not None:
+        needed = admission.thread_count()
+        if (threads or DEFAULT_THREADS) < needed:
+            raise ValueError(
+                f"Admission control needs {needed} threads, "
+                f"the server has {threads or DEFAULT_THREADS}"
+            )
+    if threads:
+        options["threads"] = threads
+    if connection_limit:
+        options["connection_limit"] = connection_limit
+    if backlog:
+        options["backlog"] = backlog
+    return create_server(app, host=host, port=port, **options)
+
+
+def serve(
+    db,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    threads=None,
+    log=print,
+    startup=None,
+    connection_limit=None,
+    backlog=None,
+    **app_options,
+):
+    """Run the API in the foreground until interrupted
+
+    ``app_options`` are passed on to create_app; a ``catalog`` among them
+    is closed on shutdown. A StartupProfile given as
+    ``startup`` is reported just before the first request can be served.
+    """
+    startup = startup or StartupProfile()
+    with startup.phase("create app"):
+        app = create_app(db, **app_options)
+    with startup.phase("bind"):
+        server = make_server(
+            app,
+            host=host,
+            port=port,
+            threads=threads,
+            connection_limit=connection_limit,
+            backlog=backlog,
+        )
+    try:
+        with startup.phase("pool warm-up"):
+            opened = db.pool.fill()
+        log(f"Connection pool warmed ({opened} open)")
+    except Exception as e:
+        log(f"Connection pool warm-up failed: {e}")
+    if db.mirror:
+        db.mirror.start()
+        log(f"Building SQLite mirror at {db.mirror.path}")
+    log(f"Starting server on http://{host}:{port}")
+    startup.report(log)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        db.close()
+        if app_options.get("catalog") is not None:
+            app_options["catalog"].close()
+        log("Server shutdown complete")
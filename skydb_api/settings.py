@@ -0,0 +1,108 @@
+import configparser
+import os
+
+
+SETTINGS_FILE = "settings.ini"
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 9020
+DEFAULT_THREADS = 4
+NAMED_DATABASE_PREFIX = "database:"
+
+
+def database_settings_for(file_path: str) -> dict:
+    """Build the [database] section written for a newly selected file"""
+    formatted_path = f'"{file_path.replace("/", os.sep)}"'
+    if os.path.basename(file_path).upper() == "TEW9.MDB":
+        return {
+            "path": formatted_path,
+            "tew_version": "9",
+            "password": "NULL",
+        }
+    return {
+        "path": formatted_path,
+        "password_required": "false",
+    }
+
+
+def load_database_settings(path: str = SETTINGS_FILE) -> dict:
+    """Return the [database] section of settings.ini, or {} if missing"""
+    if not os.path.exists(path):
+        return {}
+    config = configparser.ConfigParser()
+    config.read(path)
+    if "database" not in config:
+        return {}
+    return dict(config["database"])
+
+
+def load_server_settings(path: str = SETTINGS_FILE) -> dict:
+    """Return the [server] section of settings.ini, or {} if missing
+
+    Keys are ``threads``, ``workers``, ``queue_size``, ``queue_timeout``,
+    ``route_limits`` (comma-separated ROUTE=N), ``connection_limit`` and
+    ``backlog``, all optional.
+    """
+    if not os.path.exists(path):
+        return {}
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(path)
+    if "server" not in config:
+        return {}
+    return dict(config["server"])
+
+
+def load_named_databases(path: str = SETTINGS_FILE) -> dict:
+    """Return the [database:<name>] sections of settings.ini by name
+
+    Each section has the same keys as [database], plus optional
+    ``pool_max``, ``cache_mb`` and ``max_concurrent`` limits.
+    """
+    if not os.path.exists(path):
+        return {}
+    config = configparser.ConfigParser()
+    config.read(path)
+    return {
+        section[len(NAMED_DATABASE_PREFIX) :]: dict(config[section])
+        for section in config.sections()
+        if section.startswith(NAMED_DATABASE_PREFIX)
+        and section[len(NAMED_DATABASE_PREFIX) :]
+    }
+
+
+def save_database_settings(database: dict, path: str = SETTINGS_FILE):
+    """Replace the [database] section of settings.ini, keeping the others
+
+    Keys are read back unchanged and uninterpolated, so [queries] names
+    keep their case and SQL containing ``%`` survives the rewrite.
+    """
+    config = configparser.ConfigParser(interpolation=None)
+    config.optionxform = str
+    if os.path.exists(path):
+        config.read(path)
+    config["database"] = database
+    with open(path, "w") as configfile:
+        config.write(configfile)
+
+
+def database_path(database: dict):
+    """Return the unquoted database path from a [database] section"""
+    if "path" not in database:
+        return None
+    return database["path"].strip('"')
+
+
+def resolve_password(database: dict, log=print):
+    """Work out the database password from a [database] section
+
+    Raises ValueError when a password is required but not configured.
+    """
+    if database.get("tew_version") == "9":
+        from .credentials import tew9_credential
+
+        return tew9_credential(log)
+    if database.get("password"):
+        log("Using password from settings.ini")
+        return database["password"]
+    if database.get("password_required") == "true":
+        raise ValueError("Password required but not provided in settings.ini")
+    return None
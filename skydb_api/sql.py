@@ -0,0 +1,211 @@
+import re
+
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+    | (?P<bracket>\[[^\]]*\])
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<space>\s+)
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+NUMBER_PATTERN = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+LEADING_PATTERN = re.compile(r"(?:\s+|\(|--[^\n]*(?:\n|$)|/\*.*?\*/)*", re.S)
+IN_LIST_PATTERN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+TABLE_KEYWORDS = {"FROM", "JOIN", "INTO", "UPDATE", "TABLE"}
+DDL_KEYWORDS = {"CREATE", "ALTER", "DROP"}
+BOOLEAN_LITERALS = {"TRUE": "-1", "FALSE": "0"}
+# Operators SQLite accepts but evaluates differently: & is bitwise AND
+# rather than concatenation, / truncates integers and + adds strings as 0
+ACCESS_OPERATORS = {"&", "/", "+"}
+ACCESS_WILDCARDS = {"*": "%", "?": "_"}
+SQLITE_WILDCARDS = set("%_#[")
+ALIAS_STOP_WORDS = {
+    "WHERE",
+    "INNER",
+    "LEFT",
+    "RIGHT",
+    "OUTER",
+    "JOIN",
+    "ON",
+    "GROUP",
+    "ORDER",
+    "HAVING",
+    "UNION",
+    "SET",
+    "VALUES",
+    "SELECT",
+}
+
+
+def tokenize(query):
+    """Split SQL into (kind, text) tokens, keeping string literals whole"""
+    return [
+        (match.lastgroup, match.group())
+        for match in TOKEN_PATTERN.finditer(query)
+    ]
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace outside literals and drop a trailing semicolon"""
+    parts = []
+    for kind, text in tokenize(query.strip().rstrip(";")):
+        parts.append(" " if kind == "space" else text)
+    return "".join(parts).strip()
+
+
+def fingerprint_sql(query: str) -> str:
+    """Normalize a statement with its literal values replaced by ``?``
+
+    Statements differing only in constants share a fingerprint, and the
+    fingerprint can be logged without leaking the values.
+    """
+    parts = []
+    segment = []
+    for kind, text in tokenize(query.strip().rstrip(";")):
+        if kind in ("string", "bracket"):
+            parts.append(NUMBER_PATTERN.sub("?", "".join(segment)))
+            segment = []
+            parts.append("?" if text.startswith("'") else text)
+        else:
+            segment.append(" " if kind == "space" else text)
+    parts.append(NUMBER_PATTERN.sub("?", "".join(segment)))
+    return IN_LIST_PATTERN.sub("IN (?)", "".join(parts).strip())
+
+
+def first_keyword(query: str) -> str:
+    """Return the upper-cased first word, past comments and parentheses"""
+    start = LEADING_PATTERN.match(query).end()
+    match = re.match(r"[A-Za-z]+", query[start:])
+    return match.group().upper() if match else ""
+
+
+def is_select(query: str) -> bool:
+    """True when the statement returns rows rather than changing data"""
+    return first_keyword(query) == "SELECT"
+
+
+def is_ddl(query: str) -> bool:
+    """True for statements that change the schema"""
+    return first_keyword(query) in DDL_KEYWORDS
+
+
+def identifier_name(kind, text):
+    if kind == "bracket":
+        return text[1:-1].lower()
+    if kind == "string" and text.startswith('"'):
+        return text[1:-1].replace('""', '"').lower()
+    return text.lower()
+
+
+def referenced_tables(query: str) -> set:
+    """Best-effort set of lower-cased table names a statement touches"""
+    tokens = [
+        (kind, text)
+        for kind, text in tokenize(query)
+        if kind != "space" and not (kind == "other" and text == ";")
+    ]
+    tables = set()
+    index = 0
+    while index < len(tokens):
+        kind, text = tokens[index]
+        index += 1
+        if kind != "word" or text.upper() not in TABLE_KEYWORDS:
+            continue
+        while index < len(tokens):
+            while index < len(tokens) - 1 and tokens[index] == ("other", "("):
+                index += 1
+            kind, text = tokens[index]
+            if kind == "word" and text.upper() == "SELECT":
+                break
+            if kind not in ("word", "bracket") and not (
+                kind == "string" and text.startswith('"')
+            ):
+                break
+            tables.add(identifier_name(kind, text))
+            index += 1
+            while (
+                index < len(tokens)
+                and tokens[index][0] in ("word", "bracket")
+                and tokens[index][1].upper() not in ALIAS_STOP_WORDS
+                and tokens[index][1].upper() not in TABLE_KEYWORDS
+            ):
+                index += 1
+            if index < len(tokens) and tokens[index] == ("other", ","):
+                index += 1
+                continue
+            break
+    return tables
+
+
+def like_pattern(pattern):
+    """Translate an Access LIKE pattern to SQLite's, or return None
+
+    Only ``*`` and ``?`` are translated; patterns using ``#`` or character
+    lists, or holding characters that are wildcards only in SQLite, are
+    left to Access.
+    """
+    if not isinstance(pattern, str) or SQLITE_WILDCARDS & set(pattern):
+        return None
+    return "".join(ACCESS_WILDCARDS.get(char, char) for char in pattern)
+
+
+def sqlite_statement(query, params=None):
+    """Rewrite an Access SELECT to run with the same result on SQLite
+
+    Returns (query, params), or None when the statement uses Access SQL
+    that SQLite would accept but evaluate differently: the ``&``, ``/``
+    and ``+`` operators, double-quoted strings (identifiers in SQLite) or
+    LIKE patterns not expressible with ``%`` and ``_``. True and False
+    become -1 and 0, as Access stores them.
+    """
+    params = list(params or ())
+    parts = []
+    parameter = 0
+    like = False
+    for kind, text in tokenize(query):
+        if kind == "space":
+            parts.append(text)
+            continue
+        if like:
+            like = False
+            if kind == "string" and text.startswith("'"):
+                pattern = like_pattern(text[1:-1].replace("''", "'"))
+                if pattern is None:
+                    return None
+                text = "'" + pattern.replace("'", "''") + "'"
+            elif kind == "other" and text == "?" and parameter < len(params):
+                pattern = like_pattern(params[parameter])
+                if pattern is None:
+                    return None
+                params[parameter] = pattern
+            else:
+                return None
+        elif kind == "string" and text.startswith('"'):
+            return None
+        elif kind == "other" and text in ACCESS_OPERATORS:
+            return None
+        elif kind == "word":
+            upper = text.upper()
+            like = upper == "LIKE"
+            text = BOOLEAN_LITERALS.get(upper, text)
+        if kind == "other" and text == "?":
+            parameter += 1
+        parts.append(text)
+    return "".join(parts), params
+
+
+def count_parameters(query: str) -> int:
+    """Count the ``?`` placeholders outside string literals"""
+    return sum(
+        1 for kind, text in tokenize(query) if kind == "other" and text == "?"
+    )
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name with Access-style brackets"""
+    if "]" in name:
+        raise ValueError(f"Invalid identifier: {name}")
+    return f"[{name}]"
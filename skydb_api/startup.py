@@ -0,0 +1,135 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib.abc import Loader, MetaPathFinder
+
+
+FLAG = "--startup-profile"
+TOP_IMPORTS = 12
+
+
+class TimedLoader(Loader):
+    """Wrap a module loader so executing the module is timed"""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self.timer.timing(module.__name__):
+            self.loader.exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportTimer(MetaPathFinder):
+    """Meta path hook recording the self time of every import
+
+    Time spent importing a module, minus the imports it triggers, is added
+    to its top-level package, so ``flask`` and ``werkzeug`` are reported
+    separately even though importing one pulls in the other.
+    """
+
+    def __init__(self):
+        self.packages = {}
+        self._stack = []
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+    @contextmanager
+    def timing(self, name):
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            total = time.perf_counter() - entry[1]
+            package = name.partition(".")[0]
+            self.packages[package] = (
+                self.packages.get(package, 0.0) + total - entry[2]
+            )
+            if self._stack:
+                self._stack[-1][2] += total
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+class StartupProfile:
+    """Time spent in each import and init phase until the server is ready
+
+    Phases are always timed, which costs next to nothing; imports are only
+    timed, and the report only produced, when ``enabled``.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = []
+        self.imports = None
+        if enabled:
+            self.imports = ImportTimer()
+            self.imports.install()
+
+    @classmethod
+    def from_argv(cls, argv):
+        """Enable the profile when ``--startup-profile`` is on the line"""
+        return cls(enabled=FLAG in argv)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self, log=print):
+        """Log the breakdown once, when the server is about to serve"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        total = time.perf_counter() - self.started
+        self.imports.uninstall()
+        packages = sorted(
+            self.imports.packages.items(), key=lambda item: -item[1]
+        )
+        imported = sum(seconds for _, seconds in packages)
+        log(f"Startup profile: ready after {total * 1000:.1f} ms")
+        log(f"  {'imports':<24}{imported * 1000:>10.1f} ms")
+        for package, seconds in packages[:TOP_IMPORTS]:
+            log(f"    {package:<22}{seconds * 1000:>10.1f} ms")
+        for name, seconds in self.phases:
+            log(f"  {name:<24}{seconds * 1000:>10.1f} ms")
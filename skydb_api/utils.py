@@ -0,0 +1,34 @@
+import importlib
+import os
+import sys
+
+
+def estimate_size(value) -> int:
+    """Roughly estimate the memory held by a row or list of rows"""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    try:
+        return sys.getsizeof(value)
+    except TypeError:
+        return 64
+
+
+def file_signature(path):
+    """Return a cheap (mtime_ns, size) fingerprint of a file, or None"""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def optional_module(name):
+    """Import an optional dependency, returning None when missing"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from skydb_api.database import DatabaseConnection
+from skydb_api.server import create_app
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A small sqlite3 database standing in for the Access file"""
+    path = tmp_path / "workers.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE workers (id INTEGER PRIMARY KEY, name TEXT, "
+        "salary REAL, hired TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO workers VALUES (?, ?, ?, ?)",
+        [
+            (i, f"Worker {i}", i * 1.5, f"2020-01-{i:02d}")
+            for i in range(1, 21)
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def db(db_path):
+    connection = DatabaseConnection(
+        db_path,
+        driver="sqlite3",
+        connect_args={"check_same_thread": False},
+    )
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def make_client(db):
+    """Build a test client for an app created with the given options"""
+
+    def make(**options):
+        return create_app(db, **options).test_client()
+
+    return make
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
@@ -0,0 +1,7 @@
+def post_query(client, body, **kwargs):
+    """POST to /query and return (status, parsed JSON)"""
+    response = client.post("/query", json=body, **kwargs)
+    try:
+        return response.status_code, response.get_json()
+    finally:
+        response.close()
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from skydb_api.admission import AdmissionControl, Overloaded
+
+from helpers import post_query
+
+
+COUNT_QUERY = {"query": "SELECT COUNT(*) AS n FROM workers"}
+
+
+class FailingAccessLog:
+    def record(self, *args):
+        raise RuntimeError("disk full")
+
+
+def test_light_routes_need_no_slot():
+    admission = AdmissionControl(workers=1, queue_size=0)
+    assert admission.acquire("/tables") is None
+    assert admission.stats()["total_light"] == 1
+
+
+def test_full_queue_is_refused():
+    admission = AdmissionControl(workers=1, queue_size=0)
+    ticket = admission.acquire("/query")
+    with pytest.raises(Overloaded) as refused:
+        admission.acquire("/query")
+    assert refused.value.retry_after >= 1
+    admission.release(ticket)
+    admission.release(admission.acquire("/query"))
+    stats = admission.stats()
+    assert stats["running"] == 0
+    assert stats["total_rejected"] == 1
+    assert stats["total_admitted"] == 2
+
+
+def test_queued_request_times_out():
+    admission = AdmissionControl(workers=1, queue_size=1, queue_timeout=0.05)
+    ticket = admission.acquire("/query")
+    with pytest.raises(Overloaded):
+        admission.acquire("/query")
+    admission.release(ticket)
+    stats = admission.stats()
+    assert stats["total_timeouts"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_queued_request_runs_once_a_slot_frees():
+    admission = AdmissionControl(workers=1, queue_size=1, queue_timeout=5)
+    ticket = admission.acquire("/query")
+    tickets = []
+    waiter = threading.Thread(
+        target=lambda: tickets.append(admission.acquire("/query"))
+    )
+    waiter.start()
+    while admission.stats()["queue_depth"] == 0:
+        pass
+    admission.release(ticket)
+    waiter.join(5)
+    assert tickets and admission.stats()["running"] == 1
+    admission.release(tickets[0])
+
+
+def test_route_limit_applies_under_the_worker_count():
+    admission = AdmissionControl(
+        workers=4, route_limits={"/bulk": 1}, queue_size=0
+    )
+    ticket = admission.acquire("/bulk")
+    with pytest.raises(Overloaded):
+        admission.acquire("/bulk")
+    admission.release(admission.acquire("/query"))
+    admission.release(ticket)
+
+
+def test_for_threads_keeps_a_thread_for_light_routes():
+    admission = AdmissionControl.for_threads(8)
+    assert admission.thread_count() <= 8
+    with pytest.raises(ValueError):
+        AdmissionControl.for_threads(4, workers=3, queue_size=2)
+
+
+def test_overloaded_request_gets_503(make_client):
+    admission = AdmissionControl(workers=1, queue_size=0)
+    client = make_client(admission=admission)
+    ticket = admission.acquire("/query")
+    response = client.post("/query", json=COUNT_QUERY)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    response.close()
+    admission.release(ticket)
+    assert post_query(client, COUNT_QUERY)[0] == 200
+
+
+def test_failing_finish_callback_still_releases_slot(make_client):
+    admission = AdmissionControl(workers=1, queue_size=0)
+    client = make_client(admission=admission, access_log=FailingAccessLog())
+    for _ in range(3):
+        assert post_query(client, COUNT_QUERY)[0] == 200
+    assert admission.stats()["running"] == 0
@@ -0,0 +1,55 @@
+import time
+
+from helpers import post_query
+
+
+PAGED = {"query": "SELECT id FROM workers ORDER BY id", "page_size": 8}
+
+
+def resume(client, token):
+    return post_query(client, {"continuation": token, "page_size": 8})
+
+
+def test_pages_cover_every_row_once(client, db):
+    status, body = post_query(client, PAGED)
+    ids = [row["id"] for row in body["results"]]
+    while body["continuation"]:
+        status, body = resume(client, body["continuation"])
+        assert status == 200
+        ids.extend(row["id"] for row in body["results"])
+    assert ids == list(range(1, 21))
+    assert db.pool.stats()["in_use"] == 0
+
+
+def test_unknown_token_is_gone(client):
+    status, body = resume(client, "no-such-token")
+    assert status == 410
+    assert body == {"error": "Continuation token expired"}
+
+
+def test_token_cannot_be_resumed_twice(client):
+    _, first = post_query(client, PAGED)
+    status, _ = resume(client, first["continuation"])
+    assert status == 200
+    status, _ = resume(client, first["continuation"])
+    assert status == 410
+
+
+def test_expired_token_is_gone_and_frees_its_connection(client, db):
+    db.cursors.ttl = 0.05
+    _, body = post_query(client, PAGED)
+    assert db.pool.stats()["in_use"] == 1
+    time.sleep(0.1)
+    status, _ = resume(client, body["continuation"])
+    assert status == 410
+    assert db.pool.stats()["in_use"] == 0
+    assert db.scheduler.stats()["reads_active"] == 0
+    assert db.cursors.stats()["total_expired"] == 1
+
+
+def test_swept_cursor_frees_its_connection(client, db):
+    db.cursors.ttl = 0.05
+    post_query(client, PAGED)
+    time.sleep(0.1)
+    db.cursors.sweep()
+    assert db.pool.stats()["in_use"] == 0
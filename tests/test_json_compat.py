@@ -0,0 +1,76 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from flask import Flask
+
+from skydb_api.serialize import RowEncoder
+
+
+COLUMNS = ["zeta", "id", "price", "when", "day", "key", "name"]
+ROWS = [
+    (
+        None,
+        1,
+        decimal.Decimal("12.50"),
+        datetime.datetime(2020, 1, 7, 9, 30),
+        datetime.date(2021, 3, 4),
+        uuid.UUID(int=5),
+        "Ærøskøbing",
+    ),
+    (2.5, 2, None, None, None, None, "plain"),
+]
+UNSORTED_QUERY = {"query": "SELECT salary, name, id FROM workers ORDER BY id"}
+
+
+def flask_bytes(app, body):
+    """What the default JSON responses were built with before RowEncoder"""
+    return app.json.response(body).get_data()
+
+
+def test_compat_encoder_matches_flask_byte_for_byte():
+    app = Flask(__name__)
+    encoder = RowEncoder.for_rows(COLUMNS, ROWS, compat=True)
+    records = [dict(zip(COLUMNS, row)) for row in ROWS]
+    expected = flask_bytes(app, records)
+    assert encoder.dumps(encoder.records(ROWS)) + b"\n" == expected
+    assert b'"when":"Tue, 07 Jan 2020 09:30:00 GMT"' in expected
+
+
+def test_fast_encoder_keeps_column_order_and_iso_dates():
+    encoder = RowEncoder.for_rows(COLUMNS, ROWS, backend="json")
+    first = json.loads(encoder.encode_records(ROWS))[0]
+    assert list(first) == COLUMNS
+    assert first["when"] == "2020-01-07T09:30:00"
+    assert first["name"] == "Ærøskøbing"
+
+
+def test_default_query_response_is_unchanged(client):
+    response = client.post("/query", json=UNSORTED_QUERY)
+    body = response.get_data()
+    response.close()
+    rows = json.loads(body)
+    assert list(rows[0]) == ["id", "name", "salary"]
+    assert body == flask_bytes(client.application, rows)
+
+
+def test_default_stream_matches_buffered_bytes(client):
+    buffered = client.post("/query", json=UNSORTED_QUERY)
+    streamed = client.post("/query?stream=json", json=UNSORTED_QUERY)
+    assert streamed.get_data() + b"\n" == buffered.get_data()
+    buffered.close()
+    streamed.close()
+
+
+def test_fast_encoding_is_opt_in(client):
+    response = client.post("/query?encoding=fast", json=UNSORTED_QUERY)
+    rows = response.get_json()
+    response.close()
+    assert list(rows[0]) == ["salary", "name", "id"]
+
+
+def test_unknown_encoding_is_not_acceptable(client):
+    response = client.post("/query?encoding=xml", json=UNSORTED_QUERY)
+    assert response.status_code == 406
+    response.close()
@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture
+def named(db):
+    db.queries.register("by_id", "SELECT name FROM workers WHERE id = ?")
+    return db
+
+
+def run(client, name, body):
+    response = client.post(f"/q/{name}", json=body)
+    try:
+        return response.status_code, response.get_json()
+    finally:
+        response.close()
+
+
+def test_named_query_runs_with_a_parameter_list(named, client):
+    assert run(client, "by_id", {"params": [3]}) == (
+        200,
+        [{"name": "Worker 3"}],
+    )
+    assert run(client, "by_id", [4])[1] == [{"name": "Worker 4"}]
+
+
+@pytest.mark.parametrize("params", [3, True, "3", {"id": 3}])
+def test_non_list_params_are_a_client_error(named, client, params):
+    status, body = run(client, "by_id", {"params": params})
+    assert status == 400
+    assert "list of parameters" in body["error"]
+
+
+def test_wrong_parameter_count_is_a_client_error(named, client):
+    assert run(client, "by_id", {"params": [1, 2]})[0] == 400
@@ -0,0 +1,60 @@
+import sqlite3
+
+from skydb_api.database import ConnectionPool
+
+
+class DroppedCursor:
+    """Cursor of a connection whose server side has gone away"""
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("Communication link failure")
+
+    def close(self):
+        pass
+
+
+class FlakyConnection:
+    """sqlite3 connection that can be made to fail on first use"""
+
+    def __init__(self):
+        self.raw = sqlite3.connect(":memory:", check_same_thread=False)
+        self.dropped = False
+
+    def cursor(self):
+        return DroppedCursor() if self.dropped else self.raw.cursor()
+
+    def close(self):
+        self.raw.close()
+
+
+def make_pool():
+    return ConnectionPool(FlakyConnection, min_size=0, health_check_after=0)
+
+
+def test_health_check_reuses_a_live_connection():
+    pool = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert pool.stats()["total_reused"] == 1
+
+
+def test_health_check_replaces_a_dropped_connection():
+    pool = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.raw.dropped = True
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert not fresh.raw.dropped
+    stats = pool.stats()
+    assert stats["total_health_check_failures"] == 1
+    assert stats["size"] == 1
+
+
+def test_recently_used_connection_skips_the_health_check():
+    pool = ConnectionPool(FlakyConnection, min_size=0, health_check_after=60)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.raw.dropped = True
+    assert pool.acquire() is conn
@@ -0,0 +1,41 @@
+from skydb_api.admission import AdmissionControl
+from skydb_api.profiling import Profile, SlowQueryLog
+
+from helpers import post_query
+
+
+def test_select_returns_rows(client):
+    status, body = post_query(
+        client, {"query": "SELECT id FROM workers WHERE id < ?", "params": [3]}
+    )
+    assert status == 200
+    assert body == [{"id": 1}, {"id": 2}]
+
+
+def test_non_string_query_is_a_client_error(client):
+    status, body = post_query(client, {"query": 123})
+    assert status == 400
+    assert "string" in body["error"]
+
+
+def test_non_object_body_is_a_client_error(client):
+    status, _ = post_query(client, ["SELECT 1"])
+    assert status == 400
+
+
+def test_rejected_queries_release_admission_slots(make_client):
+    client = make_client(admission=AdmissionControl(workers=1, queue_size=0))
+    for _ in range(3):
+        assert post_query(client, {"query": 123})[0] == 400
+    status, _ = post_query(
+        client, {"query": "SELECT COUNT(*) AS n FROM workers"}
+    )
+    assert status == 200
+
+
+def test_slow_log_ignores_non_string_statements():
+    log = SlowQueryLog(threshold_ms=0)
+    profile = Profile("/query")
+    profile.statement = 123
+    log.record(profile, 0.5, 10, 500)
+    assert log.stats()["total_recorded"] == 0
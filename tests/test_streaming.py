@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from werkzeug.test import EnvironBuilder
+
+from helpers import post_query
+
+
+SELECT_ALL = {"query": "SELECT id, name FROM workers ORDER BY id"}
+
+
+def test_streamed_json_matches_buffered(client):
+    buffered = client.post("/query", json=SELECT_ALL)
+    streamed = client.post("/query?stream=json", json=SELECT_ALL)
+    assert json.loads(streamed.get_data()) == buffered.get_json()
+    buffered.close()
+    streamed.close()
+
+
+def test_streamed_ndjson_has_a_row_per_line(client):
+    response = client.post("/query?stream=ndjson", json=SELECT_ALL)
+    lines = response.get_data().splitlines()
+    response.close()
+    assert len(lines) == 20
+    assert json.loads(lines[0]) == {"id": 1, "name": "Worker 1"}
+
+
+def test_stream_closed_before_first_chunk_returns_connection(client, db):
+    environ = EnvironBuilder(
+        path="/query", method="POST", json=SELECT_ALL, query_string="stream=1"
+    ).get_environ()
+    body = client.application(environ, lambda *args: None)
+    assert db.pool.stats()["in_use"] == 1
+    body.close()
+    assert db.pool.stats()["in_use"] == 0
+
+
+def test_result_cursor_close_is_idempotent(db):
+    cursor = db.open_cursor("SELECT id FROM workers")
+    cursor.close()
+    cursor.close()
+    assert db.pool.stats()["in_use"] == 0
+
+
+def test_open_cursor_holds_a_read_slot_until_closed(db):
+    cursor = db.open_cursor("SELECT id FROM workers")
+    assert db.scheduler.stats()["reads_active"] == 1
+    cursor.close()
+    cursor.close()
+    assert db.scheduler.stats()["reads_active"] == 0
+    assert db.scheduler._read_slots.acquire(blocking=False)
+    db.scheduler._read_slots.release()
+
+
+def test_failed_open_cursor_gives_back_its_read_slot(db):
+    with pytest.raises(Exception, match="Database error"):
+        db.open_cursor("SELECT missing FROM workers")
+    assert db.scheduler.stats()["reads_active"] == 0
+    assert db.pool.stats()["in_use"] == 0
+
+
+def test_parked_page_holds_a_read_slot(client, db):
+    status, body = post_query(client, {**SELECT_ALL, "page_size": 5})
+    assert status == 200
+    assert db.scheduler.stats()["reads_active"] == 1
+    db.cursors.close()
+    assert db.scheduler.stats()["reads_active"] == 0